@@ -1,22 +1,23 @@
 import logging
 from typing import Literal
-from asyncio import gather
 
 import discord
 from discord.ext.commands import Cog
 
 from yandex_music.exceptions import UnauthorizedError
-from yandex_music import ClientAsync as YMClient
 
 from MusicBot.ui import ListenView
 from MusicBot.database import BaseUsersDatabase
 from MusicBot.cogs.utils import BaseBot, generate_item_embed
+from MusicBot.cogs.utils.autocomplete import normalize_query
 
 users_db = BaseUsersDatabase()
 
 def setup(bot):
     bot.add_cog(General(bot))
 
+SEARCH_TYPES = {'Трек': 'track', 'Альбом': 'album', 'Артист': 'artist', 'Плейлист': 'playlist'}
+
 async def get_search_suggestions(ctx: discord.AutocompleteContext) -> list[str]:
     if not ctx.interaction.user or not ctx.value or not (100 > len(ctx.value) > 2):
         return []
@@ -26,35 +27,38 @@ async def get_search_suggestions(ctx: discord.AutocompleteContext) -> list[str]:
         logging.info(f"[GENERAL] User {uid} has no token")
         return []
 
-    try:
-        client = await YMClient(token).init()
-    except UnauthorizedError:
-        logging.info(f"[GENERAL] User {uid} provided invalid token")
-        return []
-
-    if not (search := await client.search(ctx.value)):
-        logging.warning(f"[GENERAL] Failed to search for '{ctx.value}' for user {uid}")
-        return []
-
-    logging.debug(f"[GENERAL] Searching for '{ctx.value}' for user {uid}")
-
-    if (content_type := ctx.options['тип']) not in ('Трек', 'Альбом', 'Артист', 'Плейлист'):
+    if (content_type := ctx.options['тип']) not in SEARCH_TYPES:
         logging.error(f"[GENERAL] Invalid content type '{content_type}' for user {uid}")
         return []
 
-    if content_type == 'Трек' and search.tracks is not None:
-        res = [f"{item.title} {f"({item.version})" if item.version else ''} - {", ".join(item.artists_name())}" for item in search.tracks.results]
-    elif content_type == 'Альбом' and search.albums is not None:
-        res = [f"{item.title} - {", ".join(item.artists_name())}" for item in search.albums.results]
-    elif content_type == 'Артист' and search.artists is not None:
-        res = [f"{item.name}" for item in search.artists.results]
-    elif content_type == 'Плейлист' and search.playlists is not None:
-        res = [f"{item.title}" for item in search.playlists.results]
-    else:
-        logging.info(f"[GENERAL] Failed to get content type '{content_type}' with name '{ctx.value}' for user {uid}")
-        return []
+    async def fetch(query: str) -> list[str] | None:
+        try:
+            client = await BaseBot._ym_clients.client(token)
+        except UnauthorizedError:
+            logging.info(f"[GENERAL] User {uid} provided invalid token")
+            return None
+
+        logging.debug(f"[GENERAL] Searching for '{query}' for user {uid}")
+
+        if not (search := await client.search(query, type_=SEARCH_TYPES[content_type])):
+            logging.warning(f"[GENERAL] Failed to search for '{query}' for user {uid}")
+            return None
+
+        if content_type == 'Трек' and search.tracks is not None:
+            res = [f"{item.title} {f"({item.version})" if item.version else ''} - {", ".join(item.artists_name())}" for item in search.tracks.results]
+        elif content_type == 'Альбом' and search.albums is not None:
+            res = [f"{item.title} - {", ".join(item.artists_name())}" for item in search.albums.results]
+        elif content_type == 'Артист' and search.artists is not None:
+            res = [f"{item.name}" for item in search.artists.results]
+        elif content_type == 'Плейлист' and search.playlists is not None:
+            res = [f"{item.title}" for item in search.playlists.results]
+        else:
+            logging.info(f"[GENERAL] Failed to get content type '{content_type}' with name '{query}' for user {uid}")
+            return []
 
-    return res[:100]
+        return res[:100]
+
+    return await BaseBot._autocomplete.complete(uid, content_type, ctx.value, fetch, limit=100)
 
 async def get_user_playlists_suggestions(ctx: discord.AutocompleteContext) -> list[str]:
     if not ctx.interaction.user or not ctx.value or not (100 > len(ctx.value) > 2):
@@ -66,19 +70,14 @@ async def get_user_playlists_suggestions(ctx: discord.AutocompleteContext) -> li
         return []
 
     try:
-        client = await YMClient(token).init()
-    except UnauthorizedError:
-        logging.info(f"[GENERAL] User {uid} provided invalid token")
-        return []
-
-    logging.debug(f"[GENERAL] Searching for '{ctx.value}' for user {uid}")
-    try:
-        playlists_list = await client.users_playlists_list()
+        client = await BaseBot._ym_clients.client(token)
+        playlists_list = await BaseBot._catalog.playlists(client)
     except Exception as e:
         logging.error(f"[GENERAL] Failed to get playlists for user {uid}: {e}")
         return []
 
-    return [playlist.title for playlist in playlists_list if playlist.title and ctx.value in playlist.title][:100]
+    query = normalize_query(ctx.value)
+    return [playlist.title for playlist in playlists_list if playlist.title and query in normalize_query(playlist.title)][:100]
 
 class General(Cog, BaseBot):
 
@@ -173,7 +172,7 @@ class General(Cog, BaseBot):
         logging.info(f"[GENERAL] Login command invoked by user {ctx.author.id} in guild {ctx.guild_id}")
 
         try:
-            client = await YMClient(token).init()
+            client = await self._ym_clients.create(token).init()
         except UnauthorizedError:
             logging.info(f"[GENERAL] Invalid token provided by user {ctx.author.id}")
             await self.respond(ctx, "error", "Недействительный токен.", delete_after=15, ephemeral=True)
@@ -185,9 +184,10 @@ class General(Cog, BaseBot):
             return
 
         await self.users_db.update(ctx.author.id, {'ym_token': token})
+        self.invalidate_ym_token(uid=ctx.author.id)
         await self.respond(ctx, "success", f"Привет, {client.me.account.first_name}!", delete_after=15, ephemeral=True)
 
-        self._ym_clients[token] = client
+        self._ym_clients.add(token, client)
         logging.info(f"[GENERAL] User {ctx.author.id} logged in successfully")
     
     @account.command(description="Удалить токен из базы данных бота.")
@@ -199,10 +199,10 @@ class General(Cog, BaseBot):
             await self.respond(ctx, "error", "Токен не указан.", delete_after=15, ephemeral=True)
             return
 
-        if token in self._ym_clients:
-            del self._ym_clients[token]
+        self._ym_clients.discard(token)
 
         await self.users_db.update(ctx.user.id, {'ym_token': None})
+        self.invalidate_ym_token(uid=ctx.user.id)
         logging.info(f"[GENERAL] Token removed for user {ctx.author.id}")
 
         await self.respond(ctx, "success", "Токен был удалён.", delete_after=15, ephemeral=True)
@@ -234,14 +234,16 @@ class General(Cog, BaseBot):
             logging.info(f"[GENERAL] Failed to fetch likes for user {ctx.user.id}")
             await self.respond(ctx, "error", "Что-то пошло не так. Повторите попытку позже.", delete_after=15, ephemeral=True)
             return
-        elif not likes:
+
+        self._reactions.store(client, 'like', likes)
+
+        if not likes:
             logging.info(f"[GENERAL] Empty likes for user {ctx.user.id}")
             await self.respond(ctx, "error", "У вас нет треков в плейлисте «Мне нравится».", delete_after=15, ephemeral=True)
             return
 
         await ctx.defer()  # Sometimes it takes a while to fetch all tracks, so we defer the response
-        real_tracks = await gather(*[track_short.fetch_track_async() for track_short in likes.tracks], return_exceptions=True)
-        tracks = [track for track in real_tracks if not isinstance(track, BaseException)]  # Can't fetch user tracks
+        tracks = await self._tracks.resolve(client, likes.tracks)  # User uploaded tracks can't be fetched and are skipped
 
         await ctx.respond(embed=await generate_item_embed(tracks), view=ListenView(tracks))
         logging.info(f"[GENERAL] Successfully generated likes message for user {ctx.user.id}")
@@ -307,7 +309,7 @@ class General(Cog, BaseBot):
             return
 
         try:
-            playlists = await client.users_playlists_list()
+            playlists = await self._catalog.playlists(client)
         except UnauthorizedError:
             logging.warning(f"[GENERAL] Unknown token error for user {ctx.user.id}")
             await self.respond(ctx, "error", "Произошла неизвестная ошибка при попытке получения плейлистов. Пожалуйста, сообщите об этом разработчику.", delete_after=15, ephemeral=True)
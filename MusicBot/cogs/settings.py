@@ -97,6 +97,7 @@ class Settings(Cog, BaseBot):
         
         elif vote_type == 'Использовать токен запустившего пользователя для всех':
             await self.db.update(ctx.guild_id, {'use_single_token': not guild['use_single_token']})
+            self.invalidate_ym_token(gid=ctx.guild_id)
             response_message = f"Использование единого токена для прослушивания теперь {'✅ включено' if not guild['use_single_token'] else '❌ выключено'}."
 
         else:
@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable
+
+from MusicBot.cogs.utils.cache import TTLCache
+
+AUTOCOMPLETE_TTL = 300  # Lifetime of cached suggestions in seconds
+AUTOCOMPLETE_DEBOUNCE = 0.3  # Delay before the request is sent, so fast typing doesn't produce a request per keystroke
+MIN_QUERY_LENGTH = 2
+
+def normalize_query(query: str) -> str:
+    return ' '.join(query.casefold().split())
+
+class AutocompleteService:
+    """Suggestions for slash command options with caching and per-user cancellation.
+
+    Results are cached by (kind, scope, normalized query). A query that extends a cached one is answered by filtering
+    the cached suggestions if any of them match, so refining the query doesn't need a request. Only the latest
+    request of each user is completed, older ones are cancelled since Discord ignores their responses anyway.
+
+    Args:
+        ttl (float, optional): Lifetime of cached suggestions in seconds. Defaults to `AUTOCOMPLETE_TTL`.
+        maxsize (int, optional): Maximum amount of cached queries. Defaults to 5000.
+        debounce (float, optional): Delay before fetching in seconds. Defaults to `AUTOCOMPLETE_DEBOUNCE`.
+    """
+
+    def __init__(self, ttl: float = AUTOCOMPLETE_TTL, maxsize: int = 5000, debounce: float = AUTOCOMPLETE_DEBOUNCE) -> None:
+        self.debounce = debounce
+        self._results: TTLCache[tuple[str, Any, str], list[str]] = TTLCache(ttl=ttl, maxsize=maxsize)
+        self._requests: dict[int, asyncio.Task[list[str] | None]] = {}
+
+    async def complete(
+        self,
+        uid: int,
+        kind: str,
+        query: str,
+        fetch: Callable[[str], Awaitable[list[str] | None]],
+        *,
+        scope: Any = None,
+        limit: int = 25
+    ) -> list[str]:
+        """Return suggestions for `query`.
+
+        Args:
+            uid (int): Discord user id. A new request of the user cancels the previous one.
+            kind (str): Kind of suggestions, e.g. search type.
+            query (str): Text typed by the user.
+            fetch (Callable[[str], Awaitable[list[str] | None]]): Fetch suggestions for the query. None means an error and isn't cached.
+            scope (Any, optional): Additional part of the cache key for user specific suggestions. Defaults to None.
+            limit (int, optional): Maximum amount of suggestions. Defaults to 25 (Discord limit).
+
+        Returns:
+            list[str]: Suggestions. Empty if the request was superseded or failed.
+        """
+        normalized = normalize_query(query)
+        if len(normalized) < MIN_QUERY_LENGTH:
+            return []
+
+        if (cached := self._results.get((kind, scope, normalized))) is not None:
+            return cached[:limit]
+
+        if (refined := self._refine(kind, scope, normalized)) is not None:
+            logging.debug(f"[AUTOCOMPLETE] Refined cached {kind} suggestions for '{normalized}'")
+            return refined[:limit]
+
+        if previous := self._requests.get(uid):
+            previous.cancel()
+
+        task = self._requests[uid] = asyncio.create_task(self._fetch(kind, scope, normalized, fetch))
+        task.add_done_callback(lambda done: self._requests.pop(uid, None) if self._requests.get(uid) is done else None)
+
+        try:
+            result = await task
+        except asyncio.CancelledError:
+            if (current := asyncio.current_task()) and current.cancelling():
+                raise
+            logging.debug(f"[AUTOCOMPLETE] Request of user {uid} for '{normalized}' was superseded")
+            return []
+
+        return (result or [])[:limit]
+
+    def _refine(self, kind: str, scope: Any, normalized: str) -> list[str] | None:
+        """Filter suggestions of the longest cached prefix of the query. Return None if nothing matches."""
+        for end in range(len(normalized) - 1, MIN_QUERY_LENGTH - 1, -1):
+            if (cached := self._results.get((kind, scope, normalized[:end]))) is None:
+                continue
+
+            matching = [suggestion for suggestion in cached if normalized in normalize_query(suggestion)]
+            return matching or None
+
+        return None
+
+    async def _fetch(self, kind: str, scope: Any, normalized: str, fetch: Callable[[str], Awaitable[list[str] | None]]) -> list[str] | None:
+        await asyncio.sleep(self.debounce)
+
+        try:
+            result = await fetch(normalized)
+        except Exception as e:
+            logging.warning(f"[AUTOCOMPLETE] Failed to fetch {kind} suggestions for '{normalized}': {e}")
+            return None
+
+        if result is not None:
+            self._results.set((kind, scope, normalized), result)
+        return result
@@ -1,6 +1,6 @@
 import asyncio
 import logging
-from typing import Any, Literal, cast
+from typing import Any, Literal, Mapping, cast
 
 import yandex_music.exceptions
 from yandex_music import ClientAsync as YMClient
@@ -8,12 +8,24 @@ from yandex_music import ClientAsync as YMClient
 import discord
 from discord import Interaction, ApplicationContext, RawReactionActionEvent, MISSING
 
-from MusicBot.database import VoiceGuildsDatabase, BaseUsersDatabase
+from MusicBot.database import VoiceGuildsDatabase, BaseUsersDatabase, change_streams
+from MusicBot.database.cache import changed_fields
+from MusicBot.cogs.utils.cache import TTLCache
+from MusicBot.cogs.utils.reactions import ReactionIndex
+from MusicBot.cogs.utils.autocomplete import AutocompleteService
+from MusicBot.cogs.utils.catalog import Catalog
+from MusicBot.cogs.utils.tracks import TrackResolver
+from MusicBot.cogs.utils.ym_client import YMClientRegistry
 
 class BaseBot:
 
     menu_views: dict[int, Any] = {}  # Store menu views and delete them when needed to prevent memory leaks for after callbacks.
-    _ym_clients: dict[str, YMClient] = {}  # Store YM clients to prevent creating new ones for each command.
+    _ym_clients = YMClientRegistry()  # Store YM clients to prevent creating new ones for each command.
+    _ym_tokens: TTLCache[tuple[int, int], tuple[str | None, int]] = TTLCache(ttl=600, maxsize=10000)  # (guild id, user id) -> (token, token owner id)
+    _reactions = ReactionIndex()  # Liked and disliked track ids by YM account
+    _autocomplete = AutocompleteService()  # Cached suggestions for slash command options
+    _catalog = Catalog()  # Station catalog and user playlists
+    _tracks = TrackResolver()  # Batched track fetching with a shared track cache
     
     def __init__(self, bot: discord.Bot | None) -> None:
         self.bot = bot
@@ -42,23 +54,14 @@ class BaseBot:
             return None
 
         try:
-            if token in self._ym_clients:
-                client = self._ym_clients[token]
-            
-                await client.account_status()
-                return client
-
-            client = await YMClient(token).init()
+            return await self._ym_clients.client(token)
         except yandex_music.exceptions.UnauthorizedError:
-            del self._ym_clients[token]
             await self.respond(ctx, "error", "Недействительный токен Yandex Music.", ephemeral=True, delete_after=15)
             return None
-
-        self._ym_clients[token] = client
-        return client
     
     async def get_ym_token(self, ctx: ApplicationContext | Interaction | RawReactionActionEvent) -> str | None:
-        """Get Yandex Music token from context. It's either individual or single."""
+        """Get Yandex Music token from context. It's either individual or single.
+        Resolved tokens are cached until `invalidate_ym_token` is called for the guild or the token owner."""
         
         uid = ctx.user_id if isinstance(ctx, discord.RawReactionActionEvent) else ctx.user.id if ctx.user else None
 
@@ -66,12 +69,26 @@ class BaseBot:
             logging.info("[VC_EXT] No guild id or user id found")
             return None
 
+        if (cached := self._ym_tokens.get((ctx.guild_id, uid))):
+            return cached[0]
+
         guild = await self.db.get_guild(ctx.guild_id, projection={'single_token_uid': 1})
-        
-        if guild['single_token_uid']:
-            return await self.users_db.get_ym_token(guild['single_token_uid'])
-        else:
-            return await self.users_db.get_ym_token(uid)
+        owner_id = guild['single_token_uid'] or uid
+
+        token = await self.users_db.get_ym_token(owner_id)
+        self._ym_tokens[(ctx.guild_id, uid)] = (token, owner_id)
+        return token
+
+    def invalidate_ym_token(self, *, gid: int | None = None, uid: int | None = None) -> None:
+        """Drop cached tokens used in the guild `gid` and tokens owned by the user `uid`.
+        Must be called whenever user's token or guild's `single_token_uid` changes.
+
+        Args:
+            gid (int | None, optional): Guild ID. Defaults to None.
+            uid (int | None, optional): Token owner ID. Defaults to None.
+        """
+        removed = self._ym_tokens.invalidate(lambda key, value: key[0] == gid or value[1] == uid)
+        logging.debug(f"[BASE_BOT] Invalidated {removed} cached tokens for guild {gid} and user {uid}")
     
     async def respond(
         self,
@@ -241,3 +258,15 @@ class BaseBot:
             return self.bot.loop
         else:
             raise TypeError(f"Invalid context type: '{type(ctx).__name__}'.")
+
+def _on_user_change(uid: int, change: Mapping[str, Any]) -> None:
+    if (fields := changed_fields(change)) is None or 'ym_token' in fields:
+        BaseBot._ym_tokens.invalidate(lambda key, value: value[1] == uid)
+
+def _on_guild_change(gid: int, change: Mapping[str, Any]) -> None:
+    if (fields := changed_fields(change)) is None or fields & {'use_single_token', 'single_token_uid'}:
+        BaseBot._ym_tokens.invalidate(lambda key, value: key[0] == gid)
+
+# Tokens can be changed by other bot processes
+change_streams.add_listener('users', _on_user_change)
+change_streams.add_listener('guilds', _on_guild_change)
@@ -0,0 +1,75 @@
+from time import monotonic
+from collections import OrderedDict
+from typing import Callable, Generic, TypeVar, overload
+
+K = TypeVar('K')
+V = TypeVar('V')
+T = TypeVar('T')
+
+class TTLCache(Generic[K, V]):
+    """In-memory cache with per-entry expiration and an optional LRU size bound.
+
+    Args:
+        ttl (float | None, optional): Default lifetime of the entries in seconds. None means no expiration. Defaults to None.
+        maxsize (int | None, optional): Maximum amount of entries. Least recently used entries are evicted first. Defaults to None.
+    """
+
+    def __init__(self, ttl: float | None = None, maxsize: int | None = None) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict[K, tuple[float | None, V]] = OrderedDict()
+
+    @overload
+    def get(self, key: K) -> V | None: ...
+    @overload
+    def get(self, key: K, default: T) -> V | T: ...
+
+    def get(self, key: K, default: T | None = None) -> V | T | None:
+        """Return the value for `key` and mark it as recently used. Return `default` if missing or expired."""
+        try:
+            expires_at, value = self._data[key]
+        except KeyError:
+            return default
+
+        if expires_at is not None and expires_at <= monotonic():
+            del self._data[key]
+            return default
+
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V, ttl: float | None = None) -> None:
+        """Store `value` for `key`. `ttl` overrides the default lifetime of the cache."""
+        ttl = self.ttl if ttl is None else ttl
+        self._data[key] = (monotonic() + ttl if ttl is not None else None, value)
+        self._data.move_to_end(key)
+
+        if self.maxsize is not None:
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        """Remove `key` and return its value. Return `default` if missing."""
+        entry = self._data.pop(key, None)
+        return entry[1] if entry else default
+
+    def invalidate(self, predicate: Callable[[K, V], bool]) -> int:
+        """Remove all entries matching `predicate`. Return the amount of removed entries."""
+        keys = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __setitem__(self, key: K, value: V) -> None:
+        self.set(key, value)
+
+    def __contains__(self, key: K) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+_MISSING = object()
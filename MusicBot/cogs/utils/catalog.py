@@ -0,0 +1,92 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, TypeVar
+
+from yandex_music import Playlist, StationResult, ClientAsync as YMClient
+
+from MusicBot.cogs.utils.cache import TTLCache
+
+T = TypeVar('T')
+
+STATIONS_TTL = 3600  # Seconds. The station catalog is the same for all users and changes rarely
+PLAYLISTS_TTL = 300  # Seconds. Playlists can be edited outside of the bot
+
+class StationCatalog:
+    """Rotor stations with a precomputed lowercase name index.
+
+    Args:
+        stations (list[StationResult]): Result of `rotor_stations_list`.
+    """
+
+    def __init__(self, stations: list[StationResult]) -> None:
+        self.stations = [station for station in stations if station.station and station.station.name]
+        self._by_name: dict[str, StationResult] = {}
+        for station in self.stations:
+            # The first playable station wins if names repeat
+            name = station.station.name  # type: ignore
+            if name not in self._by_name or not self._by_name[name].ad_params:
+                self._by_name[name] = station
+        self._index = [(name.casefold(), name) for name in self._by_name]
+
+    def get(self, name: str) -> StationResult | None:
+        """Return the station with exactly this name."""
+        return self._by_name.get(name)
+
+    def search(self, query: str, limit: int = 100) -> list[str]:
+        """Return names of the stations containing `query`, case insensitive."""
+        query = query.casefold()
+        return [name for lowered, name in self._index if query in lowered][:limit]
+
+    def __len__(self) -> int:
+        return len(self.stations)
+
+class Catalog:
+    """Rarely changing lists shared by commands, buttons and autocomplete: the station catalog (by language)
+    and playlists of each Yandex Music account. Concurrent misses share a single request.
+
+    Args:
+        stations_ttl (float, optional): Lifetime of the station catalog in seconds. Defaults to `STATIONS_TTL`.
+        playlists_ttl (float, optional): Lifetime of playlist lists in seconds. Defaults to `PLAYLISTS_TTL`.
+        maxsize (int, optional): Maximum amount of cached playlist lists. Defaults to 5000.
+    """
+
+    def __init__(self, stations_ttl: float = STATIONS_TTL, playlists_ttl: float = PLAYLISTS_TTL, maxsize: int = 5000) -> None:
+        self._stations: TTLCache[str, StationCatalog] = TTLCache(ttl=stations_ttl)
+        self._playlists: TTLCache[int | str, list[Playlist]] = TTLCache(ttl=playlists_ttl, maxsize=maxsize)
+        self._pending: dict[tuple[str, Any], asyncio.Task] = {}
+
+    async def stations(self, client: YMClient) -> StationCatalog:
+        """Return the station catalog in the client's language."""
+        if (cached := self._stations.get(client.language)) is not None:
+            return cached
+
+        async def fetch() -> StationCatalog:
+            catalog = StationCatalog(await client.rotor_stations_list())
+            self._stations.set(client.language, catalog)
+            logging.debug(f"[CATALOG] Loaded {len(catalog)} stations")
+            return catalog
+
+        return await self._single_flight(('stations', client.language), fetch)
+
+    async def playlists(self, client: YMClient) -> list[Playlist]:
+        """Return playlists of the client's account. The list must not be modified."""
+        key = client.account_uid or client.token or ''
+        if (cached := self._playlists.get(key)) is not None:
+            return cached
+
+        async def fetch() -> list[Playlist]:
+            playlists = await client.users_playlists_list()
+            self._playlists.set(key, playlists)
+            return playlists
+
+        return await self._single_flight(('playlists', key), fetch)
+
+    def invalidate_playlists(self, client: YMClient) -> None:
+        """Drop cached playlists of the client's account. Must be called after the bot edits them."""
+        self._playlists.pop(client.account_uid or client.token or '')
+
+    async def _single_flight(self, key: tuple[str, Any], fetch: Callable[[], Awaitable[T]]) -> T:
+        if not (task := self._pending.get(key)):
+            task = self._pending[key] = asyncio.create_task(fetch())
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
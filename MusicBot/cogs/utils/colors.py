@@ -0,0 +1,184 @@
+import os
+import asyncio
+import colorsys
+import logging
+from io import BytesIO
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Literal, cast, get_args
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from MusicBot.cogs.utils.cache import TTLCache
+
+if TYPE_CHECKING:
+    from MusicBot.database.backends import Collection
+
+ColorMode = Literal['average', 'dominant', 'vibrant']
+
+SAMPLE_SIZE = 64  # Covers are downsampled to this size before analysis, colors of a 400x400 cover don't need every pixel
+PALETTE_SIZE = 8  # Colors of the quantized palette for the dominant and vibrant modes
+
+def _default_mode() -> ColorMode:
+    mode = os.getenv('EMBED_COLOR_MODE', 'average')
+    if mode not in get_args(ColorMode):
+        logging.warning(f"[COLORS] Unknown EMBED_COLOR_MODE '{mode}', expected one of {', '.join(get_args(ColorMode))}. Using 'average'")
+        return 'average'
+    return cast(ColorMode, mode)
+
+DEFAULT_MODE = _default_mode()
+
+# Pillow releases the GIL while decoding and resizing, so threads are enough to keep images off the event loop
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv('EMBED_COLOR_WORKERS', '2')), thread_name_prefix='colors')
+
+def _to_int(rgb: tuple[int, int, int]) -> int:
+    r, g, b = rgb
+    return (r << 16) + (g << 8) + b
+
+def _palette(img: Image.Image) -> list[tuple[int, tuple[int, int, int]]]:
+    """Return (pixel count, color) of the quantized image, most frequent first."""
+    quantized = img.quantize(colors=PALETTE_SIZE, method=Image.Quantize.MEDIANCUT)
+    palette = quantized.getpalette() or []
+    counts = quantized.getcolors() or []
+    return sorted(
+        ((count, cast(tuple[int, int, int], tuple(palette[index * 3:index * 3 + 3]))) for count, index in counts),  # type: ignore
+        reverse=True
+    )
+
+def _vibrant(img: Image.Image) -> tuple[int, int, int]:
+    """The most saturated color among the common ones, avoiding near black and near white. Falls back to the dominant color."""
+    palette = _palette(img)
+    total = sum(count for count, _ in palette)
+    best, best_score = palette[0][1], 0.0
+
+    for count, rgb in palette:
+        _, lightness, saturation = colorsys.rgb_to_hls(*(channel / 255 for channel in rgb))
+        if count / total < 0.03 or not 0.15 < lightness < 0.85:
+            continue
+
+        score = saturation * (1 - abs(lightness - 0.5)) * (count / total) ** 0.5
+        if score > best_score:
+            best, best_score = rgb, score
+
+    return best
+
+def extract_color(data: bytes, mode: ColorMode = DEFAULT_MODE) -> int:
+    """Return the color of an image for embeds. Blocking, see `extract_color_async`.
+
+    Args:
+        data (bytes): Encoded image.
+        mode (ColorMode, optional): 'average' for the mean color, 'dominant' for the most common color of the quantized
+            image or 'vibrant' for its most saturated common color. Defaults to `EMBED_COLOR_MODE` environment variable or 'average'.
+
+    Returns:
+        int: RGB Hex code.
+
+    Raises:
+        OSError: The image can't be decoded.
+    """
+    with Image.open(BytesIO(data)) as img:
+        # JPEG is decoded at a reduced scale right away
+        img.draft('RGB', (SAMPLE_SIZE, SAMPLE_SIZE))
+        sample = img.convert('RGB')
+
+    sample.thumbnail((SAMPLE_SIZE, SAMPLE_SIZE), Image.Resampling.BOX)
+
+    if mode == 'average':
+        rgb = cast(tuple[int, int, int], sample.resize((1, 1), Image.Resampling.BOX).getpixel((0, 0)))
+    elif mode == 'dominant':
+        rgb = _palette(sample)[0][1]
+    else:
+        rgb = _vibrant(sample)
+
+    return _to_int(rgb)
+
+async def extract_color_async(data: bytes, mode: ColorMode = DEFAULT_MODE) -> int:
+    """Same as `extract_color`, but runs in the color thread pool."""
+    loop = asyncio.get_running_loop()
+    logging.debug(f"[COLORS] Extracting {mode} color from {len(data)} bytes")
+    return await loop.run_in_executor(_executor, extract_color, data, mode)
+
+class ColorCache:
+    """Process-wide cache of cover colors by image url and color mode. Cover urls contain the cover URI and its size,
+    and a URI always points to the same image, so colors never go stale.
+
+    Colors are kept in memory with LRU eviction. With persistence enabled and a collection set with `persist_to`,
+    computed colors are also saved to it (`cover_colors`, expired by a TTL index), so they survive restarts.
+    Concurrent requests for the same cover share a single computation.
+
+    Args:
+        maxsize (int, optional): Maximum amount of colors in memory. Defaults to `COVER_COLOR_CACHE_SIZE` environment variable or 10000.
+        persist (bool, optional): Save colors to the database. Defaults to `COVER_COLOR_CACHE_PERSIST` environment variable or True.
+    """
+
+    def __init__(self, maxsize: int | None = None, persist: bool | None = None) -> None:
+        self.maxsize = maxsize if maxsize is not None else int(os.getenv('COVER_COLOR_CACHE_SIZE', '10000'))
+        self.persist = persist if persist is not None else os.getenv('COVER_COLOR_CACHE_PERSIST', 'True') == 'True'
+        self.hits = 0
+        self.misses = 0
+        self._memory: TTLCache[str, int] = TTLCache(maxsize=self.maxsize)
+        self._pending: dict[str, asyncio.Task[int]] = {}
+        self._collection: 'Collection[Any] | None' = None
+
+    def persist_to(self, collection: 'Collection[Any]') -> None:
+        """Save computed colors to `collection` if persistence is enabled. Set once the database is ready."""
+        self._collection = collection
+
+    async def get(self, url: str, fetch: Callable[[], Awaitable[bytes]], mode: ColorMode = DEFAULT_MODE) -> int:
+        """Return the color of the image at `url`, downloading and analyzing it only if it's not cached.
+
+        Args:
+            url (str): Image url, e.g. a cover of 400x400 size.
+            fetch (Callable[[], Awaitable[bytes]]): Downloads the image.
+            mode (ColorMode, optional): Color mode, see `extract_color`. Defaults to `EMBED_COLOR_MODE` environment variable or 'average'.
+
+        Returns:
+            int: RGB Hex code.
+
+        Raises:
+            Exceptions of `fetch` and `extract_color`. Failures are not cached.
+        """
+        key = f"{mode}:{url}"
+        if (color := self._memory.get(key)) is not None:
+            self.hits += 1
+            return color
+
+        if not (task := self._pending.get(key)):
+            task = self._pending[key] = asyncio.create_task(self._load(key, fetch, mode))
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+        return await asyncio.shield(task)
+
+    def stats(self) -> dict[str, int]:
+        return {'size': len(self._memory), 'hits': self.hits, 'misses': self.misses}
+
+    async def _load(self, key: str, fetch: Callable[[], Awaitable[bytes]], mode: ColorMode) -> int:
+        collection = self._collection if self.persist else None
+
+        if collection is not None:
+            try:
+                document = await collection.find_one({'_id': key})
+            except Exception as e:
+                document = None
+                logging.warning(f"[COLORS] Failed to load cover color: {e}")
+
+            if document is not None:
+                self.hits += 1
+                self._memory.set(key, document['color'])
+                return document['color']
+
+        self.misses += 1
+        color = await extract_color_async(await fetch(), mode)
+        self._memory.set(key, color)
+
+        if collection is not None:
+            try:
+                await collection.update_one(
+                    {'_id': key}, {'$set': {'color': color, 'cached_at': datetime.now(timezone.utc)}}, upsert=True
+                )
+            except Exception as e:
+                logging.warning(f"[COLORS] Failed to persist cover color: {e}")
+
+        return color
+
+# Used by embeds of all guilds
+color_cache = ColorCache()
@@ -4,12 +4,13 @@ from math import ceil
 from os import getenv
 
 import aiohttp
-from io import BytesIO
-from PIL import Image
 
 from yandex_music import Track, Album, Artist, Playlist, Label
 from discord import Embed
 
+from MusicBot.cogs.utils.http import web_session
+from MusicBot.cogs.utils.colors import color_cache
+
 explicit_eid: Final[str | None] = getenv('EXPLICIT_EID')
 if not explicit_eid:
     raise ValueError('You must specify explicit emoji id in your enviroment (EXPLICIT_EID).')
@@ -75,7 +76,7 @@ async def _generate_track_embed(track: Track) -> Embed:
 
     if track.cover_uri:
         cover_url = track.get_cover_url('400x400')
-        color = await _get_average_color_from_url(cover_url)
+        color = await _get_color_from_url(cover_url)
     else:
         cover_url = None
         color = 0x000
@@ -151,7 +152,7 @@ async def _generate_album_embed(album: Album) -> Embed:
     embed = Embed(
         title=title,
         description=album.short_description,
-        color=await _get_average_color_from_url(cover_url)
+        color=await _get_color_from_url(cover_url)
     )
     embed.set_thumbnail(url=cover_url)
     embed.set_author(name=", ".join(album.artists_name()), url=artist_url, icon_url=artist_cover_url)
@@ -184,7 +185,7 @@ async def _generate_artist_embed(artist: Artist) -> Embed:
     embed = Embed(
         title=artist.name,
         description=artist.description.text if artist.description else None,
-        color=await _get_average_color_from_url(cover_url)
+        color=await _get_color_from_url(cover_url)
     )
     embed.set_thumbnail(url=cover_url)
 
@@ -225,7 +226,7 @@ async def _generate_playlist_embed(playlist: Playlist) -> Embed:
             cover_url = None
 
     if cover_url:
-        color = await _get_average_color_from_url(cover_url)
+        color = await _get_color_from_url(cover_url)
     else:
         color = 0x000
 
@@ -256,8 +257,9 @@ async def _generate_playlist_embed(playlist: Playlist) -> Embed:
 
     return embed
 
-async def _get_average_color_from_url(url: str) -> int:
-    """Get image from url and calculate its average color to use in embeds.
+async def _get_color_from_url(url: str) -> int:
+    """Get image from url and calculate its color to use in embeds. The image is processed outside of the event loop.
+    Colors are cached by url, so a known cover is neither downloaded nor decoded again.
 
     Args:
         url (str): Image url.
@@ -266,29 +268,7 @@ async def _get_average_color_from_url(url: str) -> int:
         int: RGB Hex code. 0x000 if failed.
     """
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(url) as response:
-                response.raise_for_status()
-                result = await response.read()
-
-        img_file = Image.open(BytesIO(result))
-        img = img_file.convert('RGB')
-        width, height = img.size
-        r_total, g_total, b_total = 0, 0, 0
-        
-        for y in range(height):
-            for x in range(width):
-                r, g, b = cast(tuple, img.getpixel((x, y)))
-                r_total += r
-                g_total += g
-                b_total += b
-
-        count = width * height
-        r = r_total // count
-        g = g_total // count
-        b = b_total // count
-
-        return (r << 16) + (g << 8) + b
+        return await color_cache.get(url, lambda: web_session.read('GET', url))
     except (aiohttp.ClientError, IOError, ValueError):
         return 0x000
 
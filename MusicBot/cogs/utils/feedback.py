@@ -0,0 +1,222 @@
+import os
+import asyncio
+import logging
+from time import monotonic
+from collections import deque
+from typing import Literal
+
+from yandex_music.exceptions import BadRequestError, NotFoundError, NetworkError, YandexMusicError
+
+from MusicBot.cogs.utils.gateway import CircuitOpenError
+from MusicBot.cogs.utils.ym_client import YMClientRegistry
+
+FeedbackType = Literal['radioStarted', 'trackStarted', 'trackFinished', 'skip']
+
+FEEDBACK_RETRIES = 3  # Attempts after the first failure
+FEEDBACK_BACKOFF = 1  # Delay before the first retry in seconds, doubled after each retry
+
+class FeedbackEvent:
+    """Vibe feedback with everything needed to send it, captured when the event happened.
+
+    Args:
+        gid (int): Guild id. Events of a guild are sent in order.
+        token (str): Yandex Music token of the viber.
+        station (str): Station, e.g. `user:onyourwave`.
+        feedback_type (FeedbackType): Type of the feedback.
+        track_id (str | int): Track id.
+        batch_id (str | None): Vibe batch id.
+        total_played_seconds (int | None): Played seconds for finished and skipped tracks.
+    """
+    __slots__ = ('gid', 'token', 'station', 'feedback_type', 'track_id', 'batch_id', 'total_played_seconds', 'attempt', 'not_before')
+
+    def __init__(
+        self,
+        gid: int,
+        token: str,
+        station: str,
+        feedback_type: FeedbackType,
+        track_id: str | int,
+        batch_id: str | None,
+        total_played_seconds: int | None = None
+    ) -> None:
+        self.gid = gid
+        self.token = token
+        self.station = station
+        self.feedback_type = feedback_type
+        self.track_id = track_id
+        self.batch_id = batch_id
+        self.total_played_seconds = total_played_seconds
+        self.attempt = 0
+        self.not_before = 0.0  # Monotonic time before which a retried event is not sent
+
+    @property
+    def key(self) -> tuple[str, str, str, str]:
+        return (self.token, self.station, self.feedback_type, str(self.track_id))
+
+class FeedbackQueue:
+    """Sends vibe feedback in the background, so playback never waits for Yandex Music.
+
+    Events are sharded between workers by guild id, so events of a guild keep their order. Transient failures
+    (timeouts, network errors) are retried with exponential backoff: the event is put back with a delay and only holds
+    back later events of its guild. While Yandex Music is unavailable (`CircuitOpenError`) events fail without retries.
+    Duplicate pending events, including ones waiting for a retry, are coalesced, and
+    when a shard is full its oldest event is dropped, since the feedback only tunes recommendations.
+
+    Args:
+        clients (YMClientRegistry): Registry used to get clients by token.
+        workers (int, optional): Amount of workers. Defaults to `VIBE_FEEDBACK_WORKERS` environment variable or 4.
+        maxsize (int, optional): Maximum amount of pending events per worker. Defaults to `VIBE_FEEDBACK_QUEUE_SIZE` environment variable or 1000.
+        retries (int, optional): Retries of transient failures. Defaults to `FEEDBACK_RETRIES`.
+        backoff (float, optional): Delay before the first retry in seconds. Defaults to `FEEDBACK_BACKOFF`.
+    """
+
+    def __init__(
+        self,
+        clients: YMClientRegistry,
+        workers: int | None = None,
+        maxsize: int | None = None,
+        retries: int = FEEDBACK_RETRIES,
+        backoff: float = FEEDBACK_BACKOFF
+    ) -> None:
+        self.clients = clients
+        self.workers = workers if workers is not None else int(os.getenv('VIBE_FEEDBACK_WORKERS', '4'))
+        self.maxsize = maxsize if maxsize is not None else int(os.getenv('VIBE_FEEDBACK_QUEUE_SIZE', '1000'))
+        self.retries = retries
+        self.backoff = backoff
+
+        self.sent = 0
+        self.failed = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+        self._shards: list[deque[FeedbackEvent]] = [deque() for _ in range(self.workers)]
+        self._wakeups: list[asyncio.Event] = [asyncio.Event() for _ in range(self.workers)]
+        self._tasks: list[asyncio.Task] = []
+        self._sending = 0
+
+    def submit(self, event: FeedbackEvent) -> None:
+        """Schedule the event. Never blocks."""
+        if not self._tasks:
+            self._start()
+
+        shard = event.gid % self.workers
+        pending = self._shards[shard]
+
+        if any(queued.key == event.key for queued in pending):
+            self.coalesced += 1
+            return
+
+        if len(pending) >= self.maxsize:
+            dropped = pending.popleft()
+            self.dropped += 1
+            logging.warning(f"[FEEDBACK] Queue is full, dropped '{dropped.feedback_type}' feedback in guild {dropped.gid}")
+
+        pending.append(event)
+        self._wakeups[shard].set()
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'pending': sum(len(pending) for pending in self._shards),
+            'sent': self.sent,
+            'failed': self.failed,
+            'dropped': self.dropped,
+            'coalesced': self.coalesced
+        }
+
+    async def close(self, timeout: float = 5) -> None:
+        """Try to send pending events within `timeout` seconds and stop the workers. Must be called on shutdown."""
+        if not self._tasks:
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while (any(self._shards) or self._sending) and loop.time() < deadline:
+            await asyncio.sleep(0.1)
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+        logging.info(f"[FEEDBACK] Feedback queue closed: {self.stats()}")
+
+    def _start(self) -> None:
+        self._tasks = [asyncio.create_task(self._work(shard)) for shard in range(self.workers)]
+
+    def _next_ready(self, pending: deque[FeedbackEvent]) -> tuple[FeedbackEvent | None, float | None]:
+        """Take the first event that can be sent now. Otherwise return seconds until a delayed event is ready,
+        or None if there are no events.
+        """
+        now = monotonic()
+        delayed: set[int] = set()  # Guilds whose later events wait for a retry
+        delay: float | None = None
+
+        for event in pending:
+            if event.gid in delayed:
+                continue
+            if event.not_before <= now:
+                pending.remove(event)
+                return event, None
+
+            delayed.add(event.gid)
+            delay = min(delay, event.not_before - now) if delay is not None else event.not_before - now
+
+        return None, delay
+
+    async def _work(self, shard: int) -> None:
+        pending = self._shards[shard]
+        wakeup = self._wakeups[shard]
+
+        while True:
+            event, delay = self._next_ready(pending)
+            if not event:
+                wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            self._sending += 1
+            try:
+                await self._send(event)
+            except CircuitOpenError:
+                # Rejected without a request, retrying would only back up the queue during the outage
+                self.failed += 1
+                logging.debug(f"[FEEDBACK] Dropped '{event.feedback_type}' feedback in guild {event.gid}, Yandex Music is unavailable")
+            except (BadRequestError, NotFoundError) as e:
+                self.failed += 1
+                logging.error(f"[FEEDBACK] Failed to send '{event.feedback_type}' feedback for track {event.track_id}: {e}")
+            except NetworkError as e:
+                # Timeouts, connection errors and server errors
+                if event.attempt < self.retries:
+                    delay = self.backoff * 2 ** event.attempt
+                    event.attempt += 1
+                    event.not_before = monotonic() + delay
+                    logging.debug(f"[FEEDBACK] Retrying '{event.feedback_type}' feedback in {delay}s: {e}")
+                    # Put back in front to keep the order of the guild's events
+                    pending.appendleft(event)
+                    continue
+
+                self.failed += 1
+                logging.warning(f"[FEEDBACK] Gave up sending '{event.feedback_type}' feedback in guild {event.gid}: {e}")
+            except YandexMusicError as e:
+                self.failed += 1
+                logging.error(f"[FEEDBACK] Failed to send '{event.feedback_type}' feedback for track {event.track_id}: {e}")
+            except Exception as e:
+                self.failed += 1
+                logging.exception(f"[FEEDBACK] Unexpected error while sending feedback: {e}")
+            else:
+                self.sent += 1
+            finally:
+                self._sending -= 1
+
+    async def _send(self, event: FeedbackEvent) -> None:
+        client = await self.clients.client(event.token)
+        result = await client.rotor_station_feedback(
+            event.station,
+            event.feedback_type,
+            track_id=event.track_id,
+            total_played_seconds=event.total_played_seconds,  # type: ignore
+            batch_id=event.batch_id  # type: ignore
+        )
+        logging.debug(f"[FEEDBACK] Sent '{event.feedback_type}' feedback with result: {result}")
@@ -0,0 +1,211 @@
+import os
+import re
+import asyncio
+import logging
+import itertools
+from enum import IntEnum
+from time import monotonic
+from collections import Counter
+from typing import Awaitable, Callable, TypeVar
+from urllib.parse import urlsplit
+
+from yandex_music.exceptions import BadRequestError, NotFoundError, NetworkError
+
+from MusicBot.cogs.utils.cache import TTLCache
+
+T = TypeVar('T')
+
+API_HOST = urlsplit(os.getenv('YM_BASE_URL') or 'https://api.music.yandex.net').hostname
+
+class Priority(IntEnum):
+    CRITICAL = 0  # Needed to start playback
+    NORMAL = 1  # Commands and buttons
+    BACKGROUND = 2  # Cosmetic and background requests
+
+_CRITICAL_PATHS = re.compile(r'/download-info$|/get-file-info$|^/rotor/station/[^/]+/tracks$|^/get-mp3/')
+_BACKGROUND_PATHS = re.compile(r'/lyrics$|/supplement$|^/rotor/station/[^/]+/feedback$|^/rotor/stations/list$|^/account/status$')
+_LIKES_PATHS = re.compile(r'^/users/[^/]+/(likes|dislikes)/tracks$')
+
+def classify(method: str, url: str) -> Priority:
+    """Return priority of the request by its url."""
+    parts = urlsplit(url)
+    if parts.hostname != API_HOST:
+        # Audio files and download info are served by storage hosts
+        return Priority.CRITICAL
+
+    if _CRITICAL_PATHS.search(parts.path):
+        return Priority.CRITICAL
+    if _BACKGROUND_PATHS.search(parts.path) or (method == 'GET' and _LIKES_PATHS.search(parts.path)):
+        return Priority.BACKGROUND
+    return Priority.NORMAL
+
+class CircuitOpenError(NetworkError):
+    """Yandex Music is considered unavailable and the request was not sent."""
+
+class TokenBucket:
+    """Allows `rate` requests per second on average with bursts up to `capacity` requests."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = monotonic()
+
+    def available(self) -> float:
+        now = monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return self.tokens
+
+    def delay(self) -> float:
+        """Seconds until a request is allowed."""
+        return max(0, (1 - self.available()) / self.rate)
+
+    def take(self) -> None:
+        self.tokens -= 1
+
+class CircuitBreaker:
+    """Opens after `threshold` failures in a row and rejects requests for `reset_timeout` seconds.
+    After that a single request is let through, and the breaker closes if it succeeds.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float) -> None:
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self._probing or monotonic() - self.opened_at < self.reset_timeout:
+            return False
+
+        self._probing = True
+        return True
+
+    def success(self) -> None:
+        if self.opened_at is not None:
+            logging.info("[GATEWAY] Yandex Music is available again, circuit closed")
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self._probing or (self.opened_at is None and self.failures >= self.threshold):
+            logging.warning(f"[GATEWAY] {self.failures} failed requests in a row, circuit opened for {self.reset_timeout}s")
+            self.opened_at = monotonic()
+        self._probing = False
+
+    def release(self) -> None:
+        """The request let through ended without a result, e.g. was cancelled."""
+        self._probing = False
+
+class YMGateway:
+    """Rate limiting and failure detection for all Yandex Music requests of the bot.
+
+    Requests take a token from the global bucket and from the bucket of their Yandex Music token. When tokens run out,
+    requests wait, and lower priority requests let the waiting higher priority ones go first (see `classify`).
+    Timeouts, network and server errors are counted by the circuit breaker, and while it's open requests fail
+    immediately with `CircuitOpenError` instead of waiting for their timeouts.
+
+    Args:
+        rate (float, optional): Requests per second for the bot. Defaults to `YM_RATE_LIMIT` environment variable or 50.
+        token_rate (float, optional): Requests per second for a Yandex Music token. Defaults to `YM_RATE_LIMIT_PER_TOKEN` environment variable or 10.
+        failure_threshold (int, optional): Failures in a row that open the circuit. Defaults to `YM_CIRCUIT_THRESHOLD` environment variable or 10.
+        reset_timeout (float, optional): Seconds before the open circuit lets a request through. Defaults to `YM_CIRCUIT_RESET_TIMEOUT` environment variable or 30.
+    """
+
+    def __init__(
+        self,
+        rate: float | None = None,
+        token_rate: float | None = None,
+        failure_threshold: int | None = None,
+        reset_timeout: float | None = None
+    ) -> None:
+        self.rate = rate if rate is not None else float(os.getenv('YM_RATE_LIMIT', '50'))
+        self.token_rate = token_rate if token_rate is not None else float(os.getenv('YM_RATE_LIMIT_PER_TOKEN', '10'))
+        self.breaker = CircuitBreaker(
+            failure_threshold if failure_threshold is not None else int(os.getenv('YM_CIRCUIT_THRESHOLD', '10')),
+            reset_timeout if reset_timeout is not None else float(os.getenv('YM_CIRCUIT_RESET_TIMEOUT', '30'))
+        )
+
+        self.rejected = 0
+        self.throttled = 0
+
+        # Bursts of twice the rate, e.g. loading a playlist right after a command
+        self._global = TokenBucket(self.rate, self.rate * 2)
+        self._buckets: TTLCache[str, TokenBucket] = TTLCache(ttl=600, maxsize=10000)
+        self._waiting: Counter[Priority] = Counter()
+
+    async def call(self, key: str, priority: Priority, send: Callable[[], Awaitable[T]]) -> T:
+        """Send the request if the limits allow it.
+
+        Args:
+            key (str): Key of the per-token bucket, e.g. the authorization header.
+            priority (Priority): Priority of the request.
+            send (Callable[[], Awaitable[T]]): Sends the request.
+
+        Raises:
+            CircuitOpenError: Yandex Music is unavailable.
+        """
+        probe = self.breaker.is_open  # Only the probe request is let through while the circuit is open
+        if not self.breaker.allow():
+            self.rejected += 1
+            raise CircuitOpenError('Yandex Music is temporarily unavailable')
+
+        try:
+            await self._acquire(key, priority)
+            result = await send()
+        except (BadRequestError, NotFoundError):
+            self.breaker.success()  # The API responded
+            raise
+        except NetworkError:
+            self.breaker.failure()
+            raise
+        except BaseException:
+            if probe:
+                self.breaker.release()
+            raise
+
+        self.breaker.success()
+        return result
+
+    def stats(self) -> dict[str, int | bool]:
+        return {
+            'open': self.breaker.is_open,
+            'failures': self.breaker.failures,
+            'rejected': self.rejected,
+            'throttled': self.throttled
+        }
+
+    async def _acquire(self, key: str, priority: Priority) -> None:
+        if (bucket := self._buckets.get(key)) is None:
+            bucket = TokenBucket(self.token_rate, self.token_rate * 2)
+            self._buckets.set(key, bucket)
+
+        self._waiting[priority] += 1
+        try:
+            for attempt in itertools.count():
+                delay = max(self._global.delay(), bucket.delay())
+                ahead = sum(count for waiting, count in self._waiting.items() if waiting < priority)
+
+                if not delay and self._global.available() >= 1 + ahead:
+                    self._global.take()
+                    bucket.take()
+                    return
+
+                if not attempt:
+                    self.throttled += 1
+                await asyncio.sleep(delay or 1 / self.rate)
+        finally:
+            self._waiting[priority] -= 1
+
+# Used by all Yandex Music clients of the bot, see `YMRequest`
+ym_gateway = YMGateway()
@@ -0,0 +1,132 @@
+import os
+import asyncio
+import logging
+from typing import Any
+
+import aiohttp
+
+READ_CHUNK_SIZE = 64 * 1024
+
+class ResponseTooLargeError(aiohttp.ClientError):
+    """Response body exceeds the size limit of the session."""
+
+async def read_limited(response: aiohttp.ClientResponse, max_size: int | None) -> bytes:
+    """Read the response body, failing as soon as it exceeds `max_size` bytes.
+
+    Args:
+        response (aiohttp.ClientResponse): Response to read.
+        max_size (int | None): Maximum size of the body in bytes. None means no limit.
+
+    Returns:
+        bytes: Response body.
+
+    Raises:
+        ResponseTooLargeError: The body is larger than `max_size`.
+    """
+    if max_size is None:
+        return await response.read()
+
+    if response.content_length is not None and response.content_length > max_size:
+        raise ResponseTooLargeError(f"Response of {response.url} is {response.content_length} bytes, limit is {max_size}")
+
+    body = bytearray()
+    async for chunk in response.content.iter_chunked(READ_CHUNK_SIZE):
+        body += chunk
+        if len(body) > max_size:
+            raise ResponseTooLargeError(f"Response of {response.url} exceeds {max_size} bytes")
+    return bytes(body)
+
+class SharedSession:
+    """aiohttp session shared by many users of the same hosts, so TLS connections and DNS lookups are reused.
+    The session is created lazily on the running event loop and recreated after `close`.
+
+    Args:
+        name (str): Name used in logs.
+        limit (int, optional): Maximum amount of simultaneous connections. Defaults to 100.
+        limit_per_host (int, optional): Maximum amount of simultaneous connections to a single host. Defaults to 20.
+        dns_cache_ttl (int, optional): Lifetime of resolved addresses in seconds. Defaults to 300.
+        keepalive_timeout (float, optional): Seconds an idle connection is kept open. Defaults to 60.
+        max_response_size (int | None, optional): Maximum size of bodies read with `read` in bytes. Defaults to None.
+        session_options: Additional arguments for `aiohttp.ClientSession`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 20,
+        dns_cache_ttl: int = 300,
+        keepalive_timeout: float = 60,
+        max_response_size: int | None = None,
+        **session_options: Any
+    ) -> None:
+        self.name = name
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.dns_cache_ttl = dns_cache_ttl
+        self.keepalive_timeout = keepalive_timeout
+        self.max_response_size = max_response_size
+        self.session_options = session_options
+        self._session: aiohttp.ClientSession | None = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> aiohttp.ClientSession:
+        """Return the session, creating it if needed."""
+        if self._session and not self._session.closed:
+            return self._session
+
+        async with self._lock:
+            if not self._session or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    ttl_dns_cache=self.dns_cache_ttl,
+                    keepalive_timeout=self.keepalive_timeout
+                )
+                self._session = aiohttp.ClientSession(connector=connector, **self.session_options)
+                logging.debug(f"[HTTP] Opened '{self.name}' session")
+
+        return self._session
+
+    async def read(self, method: str, url: str, **kwargs: Any) -> bytes:
+        """Send the request and return the response body.
+
+        Args:
+            method (str): HTTP method.
+            url (str): Request url.
+            kwargs: Additional arguments for `aiohttp.ClientSession.request`.
+
+        Returns:
+            bytes: Response body.
+
+        Raises:
+            aiohttp.ClientResponseError: Response status is 400 or higher.
+            ResponseTooLargeError: The body is larger than `max_response_size`.
+        """
+        session = await self.get()
+        async with session.request(method, url, **kwargs) as response:
+            response.raise_for_status()
+            return await read_limited(response, self.max_response_size)
+
+    async def close(self) -> None:
+        if self._session and not self._session.closed:
+            await self._session.close()
+            logging.debug(f"[HTTP] Closed '{self.name}' session")
+        self._session = None
+
+# Used by all Yandex Music clients of the bot, see `YMRequest`
+ym_session = SharedSession(
+    'yandex_music',
+    limit=int(os.getenv('YM_HTTP_LIMIT', '100')),
+    limit_per_host=int(os.getenv('YM_HTTP_LIMIT_PER_HOST', '30'))
+)
+
+# Used for everything else: cover images of embeds and bot list stats
+web_session = SharedSession(
+    'web',
+    limit=int(os.getenv('HTTP_LIMIT', '50')),
+    limit_per_host=int(os.getenv('HTTP_LIMIT_PER_HOST', '10')),
+    max_response_size=int(os.getenv('HTTP_MAX_RESPONSE_SIZE', str(5 * 1024 * 1024))),
+    timeout=aiohttp.ClientTimeout(total=float(os.getenv('HTTP_TIMEOUT', '10')), connect=5)
+)
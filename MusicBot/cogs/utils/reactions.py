@@ -0,0 +1,112 @@
+import asyncio
+import logging
+from time import monotonic
+from typing import Literal
+
+from yandex_music import TracksList, ClientAsync as YMClient
+
+from MusicBot.cogs.utils.cache import TTLCache
+
+ReactionType = Literal['like', 'dislike']
+
+REACTIONS_TTL = 300  # Seconds before the revision of the list is checked again
+
+class ReactionSet:
+    """Ids of liked or disliked tracks of one account."""
+
+    __slots__ = ('ids', 'revision', 'checked_at')
+
+    def __init__(self, ids: set[str], revision: int) -> None:
+        self.ids = ids
+        self.revision = revision
+        self.checked_at = monotonic()
+
+class ReactionIndex:
+    """Liked and disliked track ids by Yandex Music account. Lists are fetched once and then only refreshed
+    after `ttl` seconds with `if_modified_since_revision`, so unchanged lists are not downloaded again.
+    Reactions made by the bot are applied locally with `add` and `discard`.
+
+    Args:
+        ttl (float, optional): Seconds between revision checks. Defaults to `REACTIONS_TTL`.
+        maxsize (int, optional): Maximum amount of cached lists. Defaults to 1000.
+    """
+
+    def __init__(self, ttl: float = REACTIONS_TTL, maxsize: int = 1000) -> None:
+        self.ttl = ttl
+        self._sets: TTLCache[tuple[int | str, ReactionType], ReactionSet] = TTLCache(maxsize=maxsize)
+        self._pending: dict[tuple[int | str, ReactionType], asyncio.Task[ReactionSet | None]] = {}
+
+    @staticmethod
+    def _key(client: YMClient, reaction: ReactionType) -> tuple[int | str, ReactionType]:
+        return (client.account_uid or client.token or '', reaction)
+
+    async def get(self, client: YMClient, reaction: ReactionType) -> set[str] | None:
+        """Return ids of the tracks with `reaction`. Return None if the list can't be fetched.
+
+        Args:
+            client (YMClient): Initialized client of the account.
+            reaction (ReactionType): 'like' or 'dislike'.
+
+        Returns:
+            (set[str] | None): Track ids. Must not be modified.
+        """
+        key = self._key(client, reaction)
+        cached = self._sets.get(key)
+
+        if cached and monotonic() - cached.checked_at < self.ttl:
+            return cached.ids
+
+        # Concurrent menu updates share a single request
+        if not (task := self._pending.get(key)):
+            task = self._pending[key] = asyncio.create_task(self._refresh(client, key, cached))
+            task.add_done_callback(lambda _: self._pending.pop(key, None))
+
+        result = await asyncio.shield(task)
+        return result.ids if result else None
+
+    async def contains(self, client: YMClient, reaction: ReactionType, track_id: int | str) -> bool | None:
+        """Check whether the track has `reaction`. Return None if the list can't be fetched."""
+        ids = await self.get(client, reaction)
+        return None if ids is None else str(track_id) in ids
+
+    def store(self, client: YMClient, reaction: ReactionType, tracks: TracksList) -> None:
+        """Replace the list with `tracks` fetched elsewhere."""
+        self._sets[self._key(client, reaction)] = ReactionSet({str(track.id) for track in tracks.tracks}, tracks.revision)
+
+    def add(self, client: YMClient, reaction: ReactionType, track_id: int | str) -> None:
+        """Apply the reaction added by the bot. The stale revision makes the next check fetch the whole list."""
+        if cached := self._sets.get(self._key(client, reaction)):
+            cached.ids.add(str(track_id))
+
+    def discard(self, client: YMClient, reaction: ReactionType, track_id: int | str) -> None:
+        """Apply the reaction removed by the bot."""
+        if cached := self._sets.get(self._key(client, reaction)):
+            cached.ids.discard(str(track_id))
+
+    def expire(self, client: YMClient, reaction: ReactionType) -> None:
+        """Check the revision on the next access, e.g. when the list could have been changed by the server."""
+        if cached := self._sets.get(self._key(client, reaction)):
+            cached.checked_at = float('-inf')
+
+    async def _refresh(self, client: YMClient, key: tuple[int | str, ReactionType], cached: ReactionSet | None) -> ReactionSet | None:
+        revision = cached.revision if cached else 0
+        fetch = client.users_likes_tracks if key[1] == 'like' else client.users_dislikes_tracks
+
+        try:
+            tracks = await fetch(if_modified_since_revision=revision)
+        except Exception as e:
+            logging.warning(f"[REACTIONS] Failed to fetch {key[1]}s: {e}")
+            return cached  # Stale data is better than no buttons
+
+        if tracks is None:
+            return cached
+
+        if cached and tracks.revision == cached.revision:
+            logging.debug(f"[REACTIONS] {key[1].capitalize()}s are not modified since revision {revision}")
+            cached.checked_at = monotonic()
+            return cached
+
+        result = ReactionSet({str(track.id) for track in tracks.tracks}, tracks.revision)
+        self._sets[key] = result
+        logging.debug(f"[REACTIONS] Loaded {len(result.ids)} {key[1]}s with revision {result.revision}")
+        return result
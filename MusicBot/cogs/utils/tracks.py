@@ -0,0 +1,218 @@
+import os
+import asyncio
+import logging
+from copy import copy
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Iterable, Sequence, cast
+
+from pymongo import UpdateOne
+from yandex_music import Track, TrackShort, ClientAsync as YMClient
+
+from MusicBot.database import backend
+from MusicBot.cogs.utils.cache import TTLCache
+from MusicBot.cogs.utils.ym_client import YM_BASE_URL, YMRequest
+
+TRACKS_BATCH_SIZE = 100  # Track ids per `tracks` request
+TRACKS_CONCURRENCY = 4  # Simultaneous `tracks` requests per resolution
+
+# Tracks deserialized only for their metadata are bound to this client instead of creating a new one each time
+_metadata_client = YMClient(base_url=YM_BASE_URL, request=YMRequest())
+
+class TrackCache:
+    """Process-wide cache of track metadata by track id, shared by all guilds.
+
+    Tracks are kept in memory with LRU eviction and a TTL. Cached tracks are stored bound to the metadata client,
+    so a track fetched with one account's token is never used with it in another guild, and are only handed out
+    as copies bound to the caller's client. With persistence enabled, fetched tracks are also saved
+    to the `tracks_cache` collection (expired by a TTL index), so they survive restarts and are shared between processes.
+
+    Args:
+        ttl (float, optional): Lifetime of the tracks in seconds. Defaults to `TRACK_CACHE_TTL` environment variable or 21600.
+        maxsize (int, optional): Maximum amount of tracks in memory. Defaults to `TRACK_CACHE_SIZE` environment variable or 5000.
+        persist (bool, optional): Save tracks to the database. Defaults to `TRACK_CACHE_PERSIST` environment variable.
+    """
+
+    def __init__(self, ttl: float | None = None, maxsize: int | None = None, persist: bool | None = None) -> None:
+        self.ttl = ttl if ttl is not None else float(os.getenv('TRACK_CACHE_TTL', '21600'))
+        self.maxsize = maxsize if maxsize is not None else int(os.getenv('TRACK_CACHE_SIZE', '5000'))
+        self.persist = persist if persist is not None else os.getenv('TRACK_CACHE_PERSIST') == 'True'
+        self.hits = 0
+        self.misses = 0
+        self._memory: TTLCache[str, Track] = TTLCache(ttl=self.ttl, maxsize=self.maxsize)
+
+    def get(self, track_id: int | str, client: YMClient) -> Track | None:
+        """Return the cached track bound to `client` or None if it's not cached."""
+        if (track := self._get(track_id)) is not None:
+            track = self.bind(track, client)
+        return track
+
+    @staticmethod
+    def bind(track: Track, client: YMClient) -> Track:
+        """Return the track bound to `client`. Tracks bound to another client are copied, so shared instances are never modified.
+
+        Args:
+            track (Track): Track, e.g. a cached one.
+            client (YMClient): Client for requests made by the track, e.g. downloading.
+
+        Returns:
+            Track: Track bound to `client`.
+        """
+        if track.client is not client:
+            # Shallow copy, the metadata is shared with the original
+            track = copy(track)
+            track.client = client
+        return track
+
+    def _get(self, track_id: int | str) -> Track | None:
+        if (track := self._memory.get(str(track_id))) is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return track
+
+    def set(self, track: Track) -> None:
+        """Store the track. Tracks bound to another client are stored as a copy bound to the metadata client,
+        nested objects (albums, artists) included.
+        """
+        if track.client is not _metadata_client:
+            track = cast(Track, Track.de_json(track.to_dict(), client=_metadata_client))  # type: ignore
+        self._memory.set(str(track.id), track)
+
+    def set_many(self, tracks: Iterable[Track]) -> None:
+        for track in tracks:
+            self.set(track)
+
+    def from_dict(self, data: dict[str, Any], client: YMClient) -> Track:
+        """Return the track stored in the database as a dict, deserializing it only if it's not cached.
+
+        Args:
+            data (dict[str, Any]): Track dict, e.g. `current_track`.
+            client (YMClient): Client for requests made by the track, e.g. downloading.
+
+        Returns:
+            Track: Track bound to `client`.
+        """
+        if (track := self._get(data['id'])) is None:
+            track = cast(Track, Track.de_json(data, client=_metadata_client))  # type: ignore
+            self.set(track)
+        return self.bind(track, client)
+
+    async def load(self, track_ids: Iterable[str], client: YMClient) -> dict[str, Track]:
+        """Load tracks missing in memory from the database, bound to `client`. Return an empty dict if persistence is disabled."""
+        return {track_id: self.bind(track, client) for track_id, track in (await self._load(track_ids)).items()}
+
+    async def _load(self, track_ids: Iterable[str]) -> dict[str, Track]:
+        if not self.persist or not (track_ids := list(track_ids)):
+            return {}
+
+        loaded = {}
+        async for document in backend.collection('tracks_cache').find({'_id': {'$in': track_ids}}):
+            track = cast(Track, Track.de_json(document['track'], client=_metadata_client))  # type: ignore
+            loaded[document['_id']] = track
+            self.set(track)
+        return loaded
+
+    async def save(self, tracks: Sequence[Track]) -> None:
+        """Save fetched tracks to the database if persistence is enabled."""
+        if not self.persist or not tracks:
+            return
+
+        now = datetime.now(timezone.utc)
+        try:
+            await backend.collection('tracks_cache').bulk_write([
+                UpdateOne({'_id': str(track.id)}, {'$set': {'track': track.to_dict(), 'cached_at': now}}, upsert=True)
+                for track in tracks
+            ], ordered=False)
+        except Exception as e:
+            logging.warning(f"[TRACKS] Failed to persist {len(tracks)} tracks: {e}")
+
+    def stats(self) -> dict[str, int]:
+        return {'size': len(self._memory), 'hits': self.hits, 'misses': self.misses}
+
+class TrackResolver:
+    """Fetch full tracks for short tracks or ids with the multi-id `tracks` endpoint.
+
+    Ids are requested in batches with bounded concurrency, tracks already known are taken from the cache.
+    Results keep the order of the input, tracks that can't be fetched (e.g. user uploads) are skipped.
+    All resolved tracks are bound to the client used for the resolution.
+
+    Args:
+        batch_size (int, optional): Track ids per request. Defaults to `TRACKS_BATCH_SIZE`.
+        concurrency (int, optional): Maximum amount of simultaneous requests. Defaults to `TRACKS_CONCURRENCY`.
+        cache (TrackCache | None, optional): Track cache. Defaults to a new `TrackCache`.
+    """
+
+    def __init__(self, batch_size: int = TRACKS_BATCH_SIZE, concurrency: int = TRACKS_CONCURRENCY, cache: TrackCache | None = None) -> None:
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.cache = cache if cache is not None else TrackCache()
+
+    async def iter_tracks(
+        self,
+        client: YMClient,
+        items: Sequence[TrackShort | Track | str | int],
+        batch_size: int | None = None
+    ) -> AsyncIterator[list[Track]]:
+        """Yield full tracks in batches as soon as each batch is fetched. Up to `concurrency` batches are fetched ahead.
+
+        Args:
+            client (YMClient): Client used for requests.
+            items (Sequence[TrackShort | Track | str | int]): Short tracks, tracks or track ids (`id` or `id:album_id`).
+            batch_size (int | None, optional): Overrides `batch_size`, e.g. to match the enqueue chunk size. Defaults to None.
+
+        Yields:
+            list[Track]: Fetched tracks of the next batch.
+        """
+        size = batch_size or self.batch_size
+        batches = (items[start:start + size] for start in range(0, len(items), size))
+        pending: deque[asyncio.Task[list[Track]]] = deque()
+
+        try:
+            for batch in batches:
+                pending.append(asyncio.create_task(self._resolve_batch(client, batch)))
+                if len(pending) >= self.concurrency:
+                    yield await pending.popleft()
+
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def resolve(self, client: YMClient, items: Sequence[TrackShort | Track | str | int]) -> list[Track]:
+        """Return full tracks for all `items`. See `iter_tracks`."""
+        return [track async for batch in self.iter_tracks(client, items) for track in batch]
+
+    async def _resolve_batch(self, client: YMClient, batch: Sequence[TrackShort | Track | str | int]) -> list[Track]:
+        resolved: list[Track | None] = []
+        missing: dict[str, str] = {}  # Track id -> id used in the request
+
+        for item in batch:
+            if (track := item if isinstance(item, Track) else item.track if isinstance(item, TrackShort) else None):
+                self.cache.set(track)
+                track = self.cache.bind(track, client)
+            else:
+                track_id = str(item.id) if isinstance(item, TrackShort) else str(item).split(':')[0]
+                if not (track := self.cache.get(track_id, client)):
+                    missing[track_id] = item.track_id if isinstance(item, TrackShort) else str(item)
+
+            resolved.append(track)
+
+        if missing:
+            fetched = await self.cache.load(missing, client)
+            if requested := [request_id for track_id, request_id in missing.items() if track_id not in fetched]:
+                try:
+                    tracks = await client.tracks(requested)
+                except Exception as e:
+                    logging.warning(f"[TRACKS] Failed to fetch {len(requested)} tracks: {e}")
+                    tracks = []
+
+                self.cache.set_many(tracks)
+                await self.cache.save(tracks)
+                fetched.update((str(track.id), track) for track in tracks)
+
+            ids = (item.id if isinstance(item, (Track, TrackShort)) else str(item).split(':')[0] for item in batch)
+            resolved = [track or fetched.get(str(_id)) for track, _id in zip(resolved, ids)]
+
+        return [track for track in resolved if track]
@@ -0,0 +1,120 @@
+import os
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from yandex_music import Track
+
+VIBE_PREFETCH_THRESHOLD = 2  # Remaining tracks in the queue when the next vibe batch is requested
+
+class StagedBatch:
+    """Vibe batch fetched ahead of time and not yet added to the queue.
+
+    Args:
+        station (str): Station of the batch, e.g. `user:onyourwave`.
+        batch_id (str | None): Batch id for vibe feedback.
+        tracks (list[Track]): Tracks of the batch.
+    """
+    __slots__ = ('station', 'batch_id', 'tracks')
+
+    def __init__(self, station: str, batch_id: str | None, tracks: list[Track]) -> None:
+        self.station = station
+        self.batch_id = batch_id
+        self.tracks = tracks
+
+class VibePrefetcher:
+    """Requests the next vibe batch of a guild while the current one is still playing.
+
+    The batch is staged in memory, so the queue the users see doesn't change until it runs out. Audio of the first
+    track of the batch is downloaded next to the playing one, so switching batches doesn't wait on the download either.
+    Staged batches are bound to a station and must be discarded when the station or its settings change.
+
+    Args:
+        threshold (int, optional): Remaining tracks in the queue when the batch is requested. Defaults to `VIBE_PREFETCH_THRESHOLD`.
+        directory (str, optional): Directory for the warmed audio. Defaults to 'music'.
+    """
+
+    def __init__(self, threshold: int = VIBE_PREFETCH_THRESHOLD, directory: str = 'music') -> None:
+        self.threshold = threshold
+        self.directory = directory
+        self._tasks: dict[int, tuple[str, asyncio.Task[StagedBatch | None]]] = {}  # Guild id -> (station, request)
+        self._warmed: dict[int, str] = {}  # Guild id -> id of the track with downloaded audio
+
+    def schedule(self, gid: int, station: str, fetch: Callable[[], Awaitable[StagedBatch | None]]) -> None:
+        """Start fetching the next batch of the guild unless it's already fetched or being fetched for the station."""
+        if (staged := self._tasks.get(gid)):
+            staged_station, task = staged
+            failed = task.done() and (task.cancelled() or task.result() is None)
+            if staged_station == station and not failed:
+                return
+            self.discard(gid)
+
+        logging.debug(f"[VIBE] Prefetching next batch of '{station}' in guild {gid}")
+        self._tasks[gid] = (station, asyncio.create_task(self._stage(gid, fetch)))
+
+    async def take(self, gid: int, station: str) -> StagedBatch | None:
+        """Return the staged batch of the station and forget it, waiting for the request if it's still running.
+        Return None if there is no batch for the station."""
+        if not (staged := self._tasks.pop(gid, None)):
+            return None
+
+        staged_station, task = staged
+        if staged_station != station:
+            task.cancel()
+            self._drop_audio(gid)
+            return None
+
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if (current := asyncio.current_task()) and current.cancelling():
+                raise
+            return None
+
+    def discard(self, gid: int) -> None:
+        """Forget the staged batch and its audio. Safe to call if nothing is staged."""
+        if (staged := self._tasks.pop(gid, None)) and not staged[1].done():
+            logging.debug(f"[VIBE] Cancelling vibe prefetch in guild {gid}")
+            staged[1].cancel()
+        self._drop_audio(gid)
+
+    def pop_audio(self, gid: int, track_id: str | int) -> str | None:
+        """Return the path of the downloaded audio if it belongs to the track. The file is owned by the caller after that."""
+        if self._warmed.get(gid) != str(track_id):
+            return None
+
+        del self._warmed[gid]
+        path = self._audio_path(gid)
+        return path if os.path.exists(path) else None
+
+    def _audio_path(self, gid: int) -> str:
+        return os.path.join(self.directory, f'{gid}.next.mp3')
+
+    def _drop_audio(self, gid: int) -> None:
+        if self._warmed.pop(gid, None):
+            try:
+                os.remove(self._audio_path(gid))
+            except OSError:
+                pass
+
+    async def _stage(self, gid: int, fetch: Callable[[], Awaitable[StagedBatch | None]]) -> StagedBatch | None:
+        try:
+            batch = await fetch()
+        except Exception as e:
+            logging.warning(f"[VIBE] Failed to prefetch next batch in guild {gid}: {e}")
+            return None
+
+        if not batch or not batch.tracks:
+            return None
+
+        track = batch.tracks[0]
+        try:
+            await track.download_async(self._audio_path(gid))
+        except Exception as e:
+            # The track is downloaded as usual when it starts playing
+            logging.info(f"[VIBE] Failed to warm audio of '{track.title}': {e}")
+        else:
+            self._warmed[gid] = str(track.id)
+
+        logging.debug(f"[VIBE] Staged {len(batch.tracks)} tracks in guild {gid}")
+        return batch
@@ -2,23 +2,162 @@ import asyncio
 import aiofiles
 import logging
 import io
-from typing import Any, Literal, cast
+import os
+from time import monotonic
+from typing import Any, AsyncIterator, Literal, Sequence, TypeVar, cast
 
 import yandex_music.exceptions
-from yandex_music import Track, TrackShort, ClientAsync as YMClient
+from yandex_music import Track, ClientAsync as YMClient
 
 import discord
 from discord import Interaction, ApplicationContext, RawReactionActionEvent
 
 from MusicBot.cogs.utils.base_bot import BaseBot
 from MusicBot.cogs.utils import generate_item_embed
-from MusicBot.database import ExplicitGuild, MessageVotes
+from MusicBot.cogs.utils.vibe import StagedBatch, VibePrefetcher
+from MusicBot.cogs.utils.feedback import FeedbackEvent, FeedbackQueue, FeedbackType
+from MusicBot.database import ExplicitGuild, MessageVotes, instrumented
+
+T = TypeVar('T')
+
+ENQUEUE_CHUNK_SIZE = 100  # Maximum amount of tracks added to the queue with a single update
+ENQUEUE_PROGRESS_INTERVAL = 2  # Minimum delay between progress message edits in seconds
+
+async def iter_chunks(items: Sequence[T], size: int = ENQUEUE_CHUNK_SIZE) -> AsyncIterator[list[T]]:
+    """Split `items` into chunks for `VoiceExtension.enqueue_tracks`."""
+    for start in range(0, len(items), size):
+        yield list(items[start:start + size])
+
+async def _prepend(chunk: list[T], chunks: AsyncIterator[list[T]]) -> AsyncIterator[list[T]]:
+    yield chunk
+    async for rest in chunks:
+        yield rest
 
 class VoiceExtension(BaseBot):
 
+    _enqueue_tasks: dict[int, asyncio.Task] = {}  # Background enqueue tasks by guild id. Cancelled when the queue is reset.
+    _vibe_prefetch = VibePrefetcher()  # Next vibe batches staged before the queue runs out
+    _vibe_feedback = FeedbackQueue(BaseBot._ym_clients)  # Vibe feedback sent in the background
+
     def __init__(self, bot: discord.Bot | None) -> None:
         super().__init__(bot)
 
+    async def enqueue_tracks(
+        self,
+        ctx: ApplicationContext | Interaction | RawReactionActionEvent,
+        chunks: AsyncIterator[list[Track]] | AsyncIterator[list[dict[str, Any]]],
+        *,
+        play: bool = False,
+        total: int | None = None
+    ) -> bool:
+        """Add tracks to the queue chunk by chunk. Only the first chunk is awaited, the rest are added in the background
+        with progress reported in the channel. Chunks of the consecutive calls are added in order.
+
+        Args:
+            ctx (ApplicationContext | Interaction | RawReactionActionEvent): Context.
+            chunks (AsyncIterator[list[Track]] | AsyncIterator[list[dict[str, Any]]]): Chunks of tracks. Should be bounded by `ENQUEUE_CHUNK_SIZE`.
+            play (bool, optional): Play the first track as soon as the first chunk is received. Defaults to False.
+            total (int | None, optional): Total amount of tracks for the progress message. Defaults to None.
+
+        Returns:
+            bool: True if the first chunk was processed or scheduled, False if there are no tracks or playback failed.
+        """
+        if not (gid := ctx.guild_id):
+            logging.warning("[VC_EXT] Guild ID not found in context inside 'enqueue_tracks'")
+            return False
+
+        previous_task = self._enqueue_tasks.get(gid)
+        if previous_task and previous_task.done():
+            previous_task = None
+
+        added = 0
+        if not previous_task or play:
+            if not (first_chunk := await anext(chunks, None)):
+                logging.info("[VC_EXT] No tracks to enqueue")
+                return False
+
+            track = first_chunk.pop(0) if play else None
+            if first_chunk and previous_task:
+                # Only the first track is played right away, the rest is queued after the chunks of the running task
+                chunks = _prepend(first_chunk, chunks)  # type: ignore
+            elif first_chunk:
+                await self.db.modify_track(gid, first_chunk, 'next', 'extend')
+                added = len(first_chunk)
+            added += bool(track)
+
+            if track and not await self.play_track(ctx, track):
+                return False
+
+        task = asyncio.create_task(self._enqueue_remaining(ctx, gid, chunks, previous_task, added, total))
+        self._enqueue_tasks[gid] = task
+        task.add_done_callback(lambda task: self._enqueue_tasks.pop(gid) if self._enqueue_tasks.get(gid) is task else None)
+
+        return True
+
+    def cancel_enqueue(self, gid: int) -> None:
+        """Stop adding tracks to the queue of the guild."""
+        if (task := self._enqueue_tasks.pop(gid, None)) and not task.done():
+            logging.info(f"[VC_EXT] Cancelling enqueue task in guild {gid}")
+            task.cancel()
+
+    async def _enqueue_remaining(
+        self,
+        ctx: ApplicationContext | Interaction | RawReactionActionEvent,
+        gid: int,
+        chunks: AsyncIterator[list[Track]] | AsyncIterator[list[dict[str, Any]]],
+        previous_task: asyncio.Task | None,
+        added: int,
+        total: int | None
+    ) -> None:
+        if previous_task:
+            await asyncio.wait([previous_task])
+
+        message: discord.Interaction | discord.WebhookMessage | discord.Message | None = None
+        last_report = monotonic()
+
+        async def report(content: str, response_type: Literal['info', 'success', 'error']) -> None:
+            nonlocal message
+            embed = self.generate_response_embed(ctx, response_type, description=content)
+
+            try:
+                if not message:
+                    message = await self.respond(ctx, embed=embed)
+                elif isinstance(message, discord.Interaction):
+                    await message.edit_original_response(embed=embed)
+                else:
+                    await message.edit(embed=embed)
+            except discord.HTTPException as e:
+                logging.debug(f"[VC_EXT] Failed to report enqueue progress: {e}")
+
+        try:
+            async for chunk in chunks:
+                await self.db.modify_track(gid, chunk, 'next', 'extend')
+                added += len(chunk)
+
+                if (total is None or total > ENQUEUE_CHUNK_SIZE) and monotonic() - last_report >= ENQUEUE_PROGRESS_INTERVAL:
+                    last_report = monotonic()
+                    await report(f"Добавление треков в очередь: {added}" + (f" из {total}" if total else "") + "...", 'info')
+        except asyncio.CancelledError:
+            logging.info(f"[VC_EXT] Enqueue cancelled in guild {gid} after {added} tracks")
+            if message:
+                await report(f"Добавление треков отменено. Добавлено треков: {added}.", 'error')
+            raise
+        except Exception as e:
+            logging.error(f"[VC_EXT] Failed to enqueue tracks in guild {gid}: {e}")
+            await report(f"Не удалось добавить все треки. Добавлено треков: {added}.", 'error')
+            return
+
+        logging.info(f"[VC_EXT] Enqueued {added} tracks in guild {gid}")
+        if message:
+            await report(f"Все треки добавлены в очередь ({added}).", 'success')
+            try:
+                if isinstance(message, discord.Interaction):
+                    await message.delete_original_response(delay=15)
+                else:
+                    await message.delete(delay=15)
+            except discord.HTTPException:
+                pass
+
     async def send_menu_message(self, ctx: ApplicationContext | Interaction | RawReactionActionEvent, *, disable: bool = False) -> bool:
         """Send menu message to the channel and delete old one if exists. Return True if sent.
 
@@ -44,13 +183,10 @@ class VoiceExtension(BaseBot):
 
         if not guild['current_track']:
             embed = None
-        elif not (vc := await self.get_voice_client(ctx)):
+        elif not (vc := await self.get_voice_client(ctx)) or not (client := await self.init_ym_client(ctx)):
             return False
         else:
-            track = cast(Track, Track.de_json(
-                guild['current_track'],
-                client=YMClient()  # type: ignore
-            ))
+            track = self._tracks.cache.from_dict(guild['current_track'], client)
 
             embed = await generate_item_embed(track, guild['vibing'])
 
@@ -153,10 +289,10 @@ class VoiceExtension(BaseBot):
             logging.debug("[VC_EXT] No current track found")
             return False
 
-        track = cast(Track, Track.de_json(
-            guild['current_track'],
-            client=YMClient()  # type: ignore
-        ))
+        if not (client := await self.init_ym_client(ctx)):
+            return False
+
+        track = self._tracks.cache.from_dict(guild['current_track'], client)
 
         embed = await generate_item_embed(track, guild['vibing'])
 
@@ -271,6 +407,9 @@ class VoiceExtension(BaseBot):
         if not (client := await self.init_ym_client(ctx)):
             return False
 
+        # The staged batch belongs to the previous station or settings
+        self._vibe_prefetch.discard(ctx.guild_id)
+
         if update_settings:
             logging.debug("[VIBE] Updating vibe settings")
 
@@ -309,6 +448,7 @@ class VoiceExtension(BaseBot):
             return False
         
         next_tracks = [cast(Track, track.track) for track in tracks.sequence]
+        self._tracks.cache.set_many(next_tracks)
         logging.debug(f"[VIBE] Got next vibe tracks: {[track.title for track in next_tracks]}")
 
         await self.users_db.update(uid, {
@@ -317,7 +457,8 @@ class VoiceExtension(BaseBot):
             'vibe_batch_id': tracks.batch_id
         })
         await self.db.update(ctx.guild_id, {
-            'next_tracks': [track.to_dict() for track in next_tracks],
+            'next_tracks': self.db.queue_entries([track.to_dict() for track in next_tracks]),
+            'shuffle_order': [],
             'current_viber_id': uid,
             'vibing': True
         })
@@ -427,14 +568,16 @@ class VoiceExtension(BaseBot):
         if not vc:
             vc = await self.get_voice_client(ctx)
 
+        if not (client := await self.init_ym_client(ctx)):
+            return None
+
         if not await self.stop_playing(ctx, vc=vc):
             return None
 
         if isinstance(track, dict):
-            track = cast(Track, Track.de_json(
-                track,
-                client=await self.init_ym_client(ctx)  # type: ignore  # Async client can be used here.
-            ))
+            track = self._tracks.cache.from_dict(track, client)
+        else:
+            track = self._tracks.cache.bind(track, client)
 
         return await self._play_track(
             ctx,
@@ -479,11 +622,14 @@ class VoiceExtension(BaseBot):
             if guild['vibing'] and guild['current_track']:
                 await self.send_vibe_feedback(ctx, 'trackFinished', guild['current_track'])
                 
+            self.cancel_enqueue(ctx.guild_id)
+            self._vibe_prefetch.discard(ctx.guild_id)
             await self.db.update(ctx.guild_id, {
                 'current_menu': None, 'repeat': False, 'shuffle': False,
-                'previous_tracks': [], 'next_tracks': [], 'votes': {},
+                'previous_tracks': [], 'next_tracks': [], 'shuffle_order': [],
                 'vibing': False, 'current_viber_id': None
             })
+            await self.db.clear_votes(ctx.guild_id)
 
             if guild['current_menu']:
                 return await self._delete_menu_message(ctx, guild['current_menu'], ctx.guild_id)
@@ -542,15 +688,16 @@ class VoiceExtension(BaseBot):
             logging.debug("[VC_EXT] Repeating current track")
             next_track = guild['current_track']
         elif guild['shuffle']:
-            logging.debug("[VC_EXT] Getting random track from queue")
-            next_track = await self.db.pop_random_track(ctx.guild_id, 'next')
+            logging.debug("[VC_EXT] Getting next shuffled track from queue")
+            next_track = await self.db.pop_shuffled_track(ctx.guild_id)
         else:
             logging.debug("[VC_EXT] Getting next track from queue")
             next_track = await self.db.get_track(ctx.guild_id, 'next')
 
         if not next_track and guild['vibing']:
             # NOTE: Real vibe gets next tracks after each skip. For smoother experience
-            #       we get next tracks only after all the other tracks are finished
+            #       we get next tracks only after all the other tracks are finished.
+            #       The batch is usually prefetched by `_prefetch_vibe` by then.
 
             logging.debug("[VC_EXT] No next track found, generating new vibe")
 
@@ -559,7 +706,10 @@ class VoiceExtension(BaseBot):
                 logging.warning("[VC_EXT] No vibe type or vibe id found in user data")
                 return None
 
-            await self.update_vibe(ctx, user['vibe_type'], user['vibe_id'])
+            if (batch := await self._vibe_prefetch.take(ctx.guild_id, f"{user['vibe_type']}:{user['vibe_id']}")):
+                await self._apply_vibe_batch(ctx.guild_id, uid, batch)
+            else:
+                await self.update_vibe(ctx, user['vibe_type'], user['vibe_id'])
             next_track = await self.db.get_track(ctx.guild_id, 'next')
 
         if next_track:
@@ -615,39 +765,31 @@ class VoiceExtension(BaseBot):
 
         return None
 
-    async def get_reacted_tracks(
+    async def get_reactions(
         self,
         ctx: ApplicationContext | Interaction | RawReactionActionEvent,
-        tracks_type: Literal['like', 'dislike']
-    ) -> list[TrackShort]:
-        """Get liked or disliked tracks from Yandex Music. Return list of tracks on success.
-        Return empty list if no likes found or error occurred.
-        
+        client: YMClient | None = None
+    ) -> tuple[set[str], set[str]] | None:
+        """Get ids of liked and disliked tracks. Lists are cached in `BaseBot._reactions` and only refreshed when their revision changes.
+
         Args:
             ctx (ApplicationContext | Interaction | RawReactionActionEvent): Context.
-            tracks_type (Literal['like', 'dislike']): Type of tracks to get.
-        
+            client (YMClient | None, optional): Initialized client. Created from context if not provided. Defaults to None.
+
         Returns:
-            list[TrackShort]: List of tracks.
+            (tuple[set[str], set[str]] | None): Liked and disliked track ids or None on error.
         """
-        logging.info("[VC_EXT] Getting liked tracks")
-
-        if not ctx.guild_id:
-            logging.warning("Guild ID not found in context")
-            return []
+        logging.debug("[VC_EXT] Getting reacted tracks")
 
-        if not await self.db.get_track(ctx.guild_id, 'current'):
-            logging.debug("[VC_EXT] Current track not found. Likes can't be fetched")
-            return []
-
-        if not (client := await self.init_ym_client(ctx)):
-            return []
+        if not client and not (client := await self.init_ym_client(ctx)):
+            return None
 
-        if not (collection := await client.users_likes_tracks() if tracks_type == 'like' else await client.users_dislikes_tracks()):
-            logging.info(f"[VC_EXT] No {tracks_type}s found")
-            return []
+        likes, dislikes = await asyncio.gather(self._reactions.get(client, 'like'), self._reactions.get(client, 'dislike'))
+        if likes is None or dislikes is None:
+            logging.info("[VC_EXT] Failed to get reacted tracks")
+            return None
 
-        return collection.tracks
+        return likes, dislikes
     
     async def proccess_vote(
         self,
@@ -703,13 +845,13 @@ class VoiceExtension(BaseBot):
                 return False
 
             await self.db.update(guild['_id'], {'is_stopped': False})
-            await self.db.modify_track(guild['_id'], vote_data['vote_content'], 'next', 'extend')
+            chunks = iter_chunks(vote_data['vote_content'])
 
-            if guild['current_track']:
-                await self.respond(ctx, "success", "Контент был добавлен в очередь!", delete_after=15)
-            elif not await self.play_next_track(ctx):
+            if not await self.enqueue_tracks(ctx, chunks, play=not guild['current_track'], total=len(vote_data['vote_content'])):
                 await self.respond(ctx, "error", "Ошибка при воспроизведении! Попробуйте ещё раз.", delete_after=15)
                 return False
+            elif guild['current_track']:
+                await self.respond(ctx, "success", "Контент был добавлен в очередь!", delete_after=15)
 
         elif vote_data['action'] == 'play/pause':
             if not (vc := await self.get_voice_client(ctx)):
@@ -723,12 +865,17 @@ class VoiceExtension(BaseBot):
 
             await self.update_menu_embed_and_view(ctx)
 
-        elif vote_data['action'] in ('repeat', 'shuffle'):
-            await self.db.update(guild['_id'], {vote_data['action']: not guild[vote_data['action']]})
+        elif vote_data['action'] == 'repeat':
+            await self.db.update(guild['_id'], {'repeat': not guild['repeat']})
+            await self.update_menu_view(ctx)
+
+        elif vote_data['action'] == 'shuffle':
+            await self.db.set_shuffle(guild['_id'], not guild['shuffle'])
             await self.update_menu_view(ctx)
 
         elif vote_data['action'] == 'clear_queue':
-            await self.db.update(ctx.guild_id, {'previous_tracks': [], 'next_tracks': []})
+            self.cancel_enqueue(ctx.guild_id)
+            await self.db.update(ctx.guild_id, {'previous_tracks': [], 'next_tracks': [], 'shuffle_order': []})
             await self.respond(ctx, "success", "Очередь и история сброшены.", delete_after=15)
 
         elif vote_data['action'] == 'stop':
@@ -765,10 +912,11 @@ class VoiceExtension(BaseBot):
     async def send_vibe_feedback(
         self,
         ctx: ApplicationContext | Interaction | RawReactionActionEvent,
-        feedback_type: Literal['radioStarted', 'trackStarted', 'trackFinished', 'skip'],
+        feedback_type: FeedbackType,
         track: Track | dict[str, Any]
     ) -> bool:
-        """Send vibe feedback to Yandex Music. Return True on success.
+        """Schedule vibe feedback for Yandex Music. The feedback is sent in the background by `_vibe_feedback`,
+        so the station and batch are captured now. Return True if the feedback was scheduled.
 
         Args:
             ctx (ApplicationContext | Interaction | RawReactionActionEvent): Context.
@@ -776,9 +924,9 @@ class VoiceExtension(BaseBot):
             track (Track | dict[str, Any]): Track data.
 
         Returns:
-            bool: True on success, False otherwise.
+            bool: True if scheduled, False otherwise.
         """
-        logging.debug(f"[VC_EXT] Sending vibe feedback, type: {feedback_type}")
+        logging.debug(f"[VC_EXT] Scheduling vibe feedback, type: {feedback_type}")
 
         if not (uid := await self.get_viber_id_from_ctx(ctx)) or not ctx.guild_id:
             logging.warning("[VC_EXT] User id or guild id not found")
@@ -786,36 +934,38 @@ class VoiceExtension(BaseBot):
 
         user = await self.users_db.get_user(uid, projection={'vibe_batch_id': 1, 'vibe_type': 1, 'vibe_id': 1})
 
-        if not (client := await self.init_ym_client(ctx)):
+        if not (token := await self.get_ym_token(ctx)):
+            logging.debug("[VC_EXT] No token found, feedback is not sent")
             return False
-        
+
         if feedback_type not in ('radioStarted', 'trackStarted') and track['duration_ms']:
             total_play_seconds = track['duration_ms'] // 1000
         else:
             total_play_seconds = None
-            
-        try:
-            feedback = await client.rotor_station_feedback(
-                f'{user['vibe_type']}:{user['vibe_id']}',
-                feedback_type,
-                track_id=track['id'],
-                total_played_seconds=total_play_seconds,  # type: ignore
-                batch_id=user['vibe_batch_id']  # type: ignore
-            )
-        except yandex_music.exceptions.BadRequestError as e:
-            logging.error(f"[VC_EXT] Failed to send vibe feedback, type: {feedback_type}, track: {track['title']} error: {e}")
-            return False
 
-        logging.info(f"[VC_EXT] Sent vibe feedback type '{feedback_type}' with result: {feedback}")
-        return feedback
-    
+        self._vibe_feedback.submit(FeedbackEvent(
+            ctx.guild_id,
+            token,
+            f"{user['vibe_type']}:{user['vibe_id']}",
+            feedback_type,
+            track['id'],
+            user['vibe_batch_id'],
+            total_play_seconds
+        ))
+        return True
+
     async def _download_track(self, gid: int, track: Track) -> None:
-        """Download track to local storage.
+        """Download track to local storage. Audio warmed by the vibe prefetcher is used instead if available.
 
         Args:
             gid (int): Guild ID.
             track (Track): Track to download.
         """
+        if (warmed := self._vibe_prefetch.pop_audio(gid, track.id)):
+            logging.debug(f"[VC_EXT] Using prefetched audio of track '{track.title}'")
+            os.replace(warmed, f'music/{gid}.mp3')
+            return
+
         try:
             await track.download_async(f'music/{gid}.mp3')
         except yandex_music.exceptions.TimedOutError:
@@ -883,7 +1033,9 @@ class VoiceExtension(BaseBot):
 
         try:
             if not guild['current_track'] or track.id != guild['current_track']['id']:
-                await self._download_track(ctx.guild_id, track)
+                if not (client := await self.init_ym_client(ctx)):
+                    return None
+                await self._download_track(ctx.guild_id, self._tracks.cache.bind(track, client))
         except yandex_music.exceptions.TimedOutError:
             if not retry:
                 return await self._play_track(ctx, track, vc=vc, button_callback=button_callback, retry=True)
@@ -911,8 +1063,9 @@ class VoiceExtension(BaseBot):
             await asyncio.sleep(1)
 
         loop = self.get_current_event_loop(ctx)
+        play_next_track = instrumented('VoiceExtension.play_next_track')(self.play_next_track)  # The after callback runs outside of the interaction context
         try:
-            vc.play(song, after=lambda exc: asyncio.run_coroutine_threadsafe(self.play_next_track(ctx, after=True), loop))
+            vc.play(song, after=lambda exc: asyncio.run_coroutine_threadsafe(play_next_track(ctx, after=True), loop))
         except discord.errors.ClientException as e:
             logging.error(f"[VC_EXT] Error while playing track '{track.title}': {e}")
             await self.respond(ctx, "error", "Не удалось проиграть трек. Попробуйте сбросить меню.", delete_after=15, ephemeral=True)
@@ -923,5 +1076,51 @@ class VoiceExtension(BaseBot):
 
         if guild['vibing']:
             await self.send_vibe_feedback(ctx, 'trackStarted', track)
+            await self._prefetch_vibe(ctx, track)
 
         return track.title
+
+    async def _prefetch_vibe(self, ctx: ApplicationContext | Interaction | RawReactionActionEvent, track: Track) -> None:
+        """Stage the next vibe batch in the background if only a few tracks are left in the queue.
+
+        Args:
+            ctx (ApplicationContext | Interaction | RawReactionActionEvent): Context.
+            track (Track): Track that started playing.
+        """
+        if not ctx.guild_id:
+            return
+
+        guild = await self.db.get_queue_tail(ctx.guild_id, self._vibe_prefetch.threshold)
+        if not guild or not guild.get('current_viber_id'):
+            return
+
+        user = await self.users_db.get_user(guild['current_viber_id'], projection={'vibe_type': 1, 'vibe_id': 1})
+        if not user['vibe_type'] or not user['vibe_id']:
+            return
+
+        station = f"{user['vibe_type']}:{user['vibe_id']}"
+        queue = guild['next_tracks'][-1]['id'] if guild.get('next_tracks') else track.id
+
+        async def fetch() -> StagedBatch | None:
+            if not (token := await self.get_ym_token(ctx)):
+                return None
+
+            client = await self._ym_clients.client(token)
+            if not (tracks := await client.rotor_station_tracks(station, queue=queue)):
+                return None
+
+            next_tracks = [cast(Track, item.track) for item in tracks.sequence]
+            self._tracks.cache.set_many(next_tracks)
+            return StagedBatch(station, tracks.batch_id, next_tracks)
+
+        self._vibe_prefetch.schedule(ctx.guild_id, station, fetch)
+
+    async def _apply_vibe_batch(self, gid: int, uid: int, batch: StagedBatch) -> None:
+        """Replace the exhausted queue with the staged vibe batch."""
+        logging.debug(f"[VIBE] Using prefetched vibe tracks: {[track.title for track in batch.tracks]}")
+
+        await self.users_db.update(uid, {'vibe_batch_id': batch.batch_id})
+        await self.db.update(gid, {
+            'next_tracks': self.db.queue_entries([track.to_dict() for track in batch.tracks]),
+            'shuffle_order': []
+        })
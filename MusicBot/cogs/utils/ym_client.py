@@ -0,0 +1,219 @@
+import os
+import asyncio
+import logging
+from http import HTTPStatus
+from time import monotonic
+from functools import partial
+from collections import OrderedDict
+from typing import Any, Callable
+from urllib.parse import urlsplit
+
+from yandex_music import ClientAsync as YMClient
+from yandex_music.exceptions import UnauthorizedError, YandexMusicError, NetworkError, TimedOutError
+from yandex_music.utils.request_async import Request
+from yandex_music.utils.schema_mismatch import set_current_endpoint
+
+import aiohttp
+
+from MusicBot.cogs.utils.http import SharedSession, ym_session
+from MusicBot.cogs.utils.gateway import API_HOST, YMGateway, classify, ym_gateway
+
+VALIDATION_TTL = 600  # Seconds before a cached client is validated again in the background
+
+# Alternative API address, e.g. the stand-in server from `MusicBot.devtools`. None means the real API
+YM_BASE_URL = os.getenv('YM_BASE_URL') or None
+
+class YMRequest(Request):
+    """Request that sends API calls through a shared connection pool and the rate limiting gateway, and reports
+    authorization failures, so clients with revoked tokens are dropped as soon as they are used instead of being
+    validated before each call.
+
+    Args:
+        on_unauthorized (Callable[[], None] | None, optional): Called when the API responds with 401 or 403. Storage hosts
+            are not reported, they respond with 403 to expired download links. Defaults to None.
+        session (SharedSession, optional): Connection pool. Defaults to `ym_session`.
+        gateway (YMGateway, optional): Rate limits and circuit breaker. Defaults to `ym_gateway`.
+        args, kwargs: Arguments of `yandex_music.utils.request_async.Request`.
+    """
+
+    def __init__(
+        self,
+        *args: Any,
+        on_unauthorized: Callable[[], None] | None = None,
+        session: SharedSession = ym_session,
+        gateway: YMGateway = ym_gateway,
+        **kwargs: Any
+    ) -> None:
+        super().__init__(*args, **kwargs)
+        self.on_unauthorized = on_unauthorized
+        self.session = session
+        self.gateway = gateway
+
+    async def _request_wrapper(self, *args: Any, **kwargs: Any) -> bytes:
+        key = self.headers.get('Authorization', '')
+        return await self.gateway.call(key, classify(*args[:2]), partial(self._send, *args, **kwargs))
+
+    async def _send(self, method: str, url: str, **kwargs: Any) -> bytes:
+        # Same as the library implementation, but with the shared session instead of `aiohttp.request`.
+        # Relies on internals of yandex-music, keep it pinned in requirements.txt
+        set_current_endpoint(method, url)
+        kwargs = self._prepare_kwargs(kwargs)
+        session = await self.session.get()
+
+        if YM_BASE_URL and YM_BASE_URL.startswith('http://') and url.startswith('https://' + YM_BASE_URL[len('http://'):]):
+            # Direct links built by the library are always https, the stand-in server is not
+            url = 'http://' + url[len('https://'):]
+
+        try:
+            async with session.request(method, url, **kwargs) as resp:
+                content = await resp.content.read()
+        except asyncio.TimeoutError as e:
+            raise TimedOutError from e
+        except aiohttp.ClientError as e:
+            raise NetworkError(e) from e
+
+        if not HTTPStatus.OK <= resp.status < HTTPStatus.MULTIPLE_CHOICES:
+            try:
+                self._handle_error_response(resp.status, content)
+            except UnauthorizedError:
+                if urlsplit(url).hostname == API_HOST:
+                    logging.debug("[YM_CLIENT] Request is unauthorized")
+                    if self.on_unauthorized:
+                        self.on_unauthorized()
+                raise
+
+        return content
+
+class _Entry:
+    __slots__ = ('client', 'used_at', 'validated_at')
+
+    def __init__(self, client: YMClient) -> None:
+        self.client = client
+        self.used_at = self.validated_at = monotonic()
+
+class YMClientRegistry:
+    """Initialized Yandex Music clients by token.
+
+    The registry is bounded by `maxsize` (least recently used clients are evicted first) and drops clients
+    unused for `idle_timeout` seconds. Clients are validated in the background every `validation_ttl` seconds,
+    revoked tokens are detected by `YMRequest` on any call.
+
+    Clients don't own connections, all of them share the `ym_session` pool, so evicted and discarded clients are only
+    dropped from the registry and have nothing to close.
+
+    Args:
+        maxsize (int, optional): Maximum amount of clients. Defaults to `YM_CLIENTS_CACHE_SIZE` environment variable or 1000.
+        idle_timeout (float, optional): Seconds without use before the client is evicted.
+            Defaults to `YM_CLIENTS_IDLE_TIMEOUT` environment variable or 3600.
+        validation_ttl (float, optional): Seconds between background validations. Defaults to `VALIDATION_TTL`.
+    """
+
+    def __init__(self, maxsize: int | None = None, idle_timeout: float | None = None, validation_ttl: float = VALIDATION_TTL) -> None:
+        self.maxsize = maxsize if maxsize is not None else int(os.getenv('YM_CLIENTS_CACHE_SIZE', '1000'))
+        self.idle_timeout = idle_timeout if idle_timeout is not None else float(os.getenv('YM_CLIENTS_IDLE_TIMEOUT', '3600'))
+        self.validation_ttl = validation_ttl
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0  # Evicted because of `maxsize` or `idle_timeout`
+        self.invalidations = 0  # Removed because the token is invalid or deleted
+
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._validations: dict[str, asyncio.Task] = {}
+
+    def create(self, token: str) -> YMClient:
+        """Create a client that is removed from the registry once the API rejects its token. `init` must be awaited."""
+        return YMClient(token, base_url=YM_BASE_URL, request=YMRequest(on_unauthorized=partial(self.discard, token)))
+
+    async def client(self, token: str) -> YMClient:
+        """Return the cached client or initialize a new one.
+
+        Raises:
+            UnauthorizedError: The token is invalid.
+        """
+        if client := self.get(token):
+            return client
+
+        client = await self.create(token).init()
+        self.add(token, client)
+        return client
+
+    def get(self, token: str) -> YMClient | None:
+        """Return the cached client and schedule its validation if needed. Return None if the client is not cached."""
+        self._evict_idle()
+
+        if not (entry := self._entries.get(token)):
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        entry.used_at = monotonic()
+        self._entries.move_to_end(token)
+
+        if entry.used_at - entry.validated_at > self.validation_ttl and token not in self._validations:
+            task = asyncio.create_task(self._validate(token, entry))
+            self._validations[token] = task
+            task.add_done_callback(lambda _: self._validations.pop(token, None))
+
+        return entry.client
+
+    def add(self, token: str, client: YMClient) -> None:
+        """Store the initialized client. Initialization validates the token."""
+        self._entries[token] = _Entry(client)
+        self._entries.move_to_end(token)
+
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, token: str) -> None:
+        """Remove the client. Safe to call for unknown tokens."""
+        if self._entries.pop(token, None):
+            self.invalidations += 1
+            logging.debug("[YM_CLIENT] Client removed from registry")
+
+    def stats(self) -> dict[str, int]:
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations
+        }
+
+    async def close(self) -> None:
+        """Drop all clients and close the shared connection pool. Must be called on shutdown."""
+        for task in self._validations.values():
+            task.cancel()
+        await asyncio.gather(*self._validations.values(), return_exceptions=True)
+
+        self._entries.clear()
+        await ym_session.close()
+        logging.info(f"[YM_CLIENT] Registry closed: {self.stats()}")
+
+    def __contains__(self, token: str) -> bool:
+        return token in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict_idle(self) -> None:
+        # Entries are ordered by the last use, so only the oldest ones have to be checked
+        deadline = monotonic() - self.idle_timeout
+        while self._entries:
+            token, entry = next(iter(self._entries.items()))
+            if entry.used_at > deadline:
+                break
+
+            del self._entries[token]
+            self.evictions += 1
+
+    async def _validate(self, token: str, entry: _Entry) -> None:
+        try:
+            await entry.client.account_status()
+        except UnauthorizedError:
+            pass  # Already discarded by `YMRequest`
+        except YandexMusicError as e:
+            logging.warning(f"[YM_CLIENT] Failed to validate client: {e}")
+        else:
+            entry.validated_at = monotonic()
@@ -4,11 +4,10 @@ from typing import cast
 import discord
 from discord.ext.commands import Cog
 
-from yandex_music import ClientAsync as YMClient
 from yandex_music.exceptions import UnauthorizedError
 
 from MusicBot.cogs.utils import VoiceExtension
-from MusicBot.database import BaseUsersDatabase
+from MusicBot.database import BaseUsersDatabase, instrumented
 from MusicBot.ui import QueueView, generate_queue_embed
 
 def setup(bot: discord.Bot):
@@ -20,18 +19,19 @@ async def get_vibe_stations_suggestions(ctx: discord.AutocompleteContext) -> lis
     if not ctx.interaction.user or not ctx.value or len(ctx.value) < 2:
         return []
 
-    if not (token := await users_db.get_ym_token(ctx.interaction.user.id)):
-        logging.info(f"[GENERAL] User {ctx.interaction.user.id} has no token")
+    uid = ctx.interaction.user.id
+    if not (token := await users_db.get_ym_token(uid)):
+        logging.info(f"[GENERAL] User {uid} has no token")
         return []
 
     try:
-        client = await YMClient(token).init()
+        client = await VoiceExtension._ym_clients.client(token)
+        stations = await VoiceExtension._catalog.stations(client)
     except UnauthorizedError:
-        logging.info(f"[GENERAL] User {ctx.interaction.user.id} provided invalid token")
+        logging.info(f"[GENERAL] User {uid} provided invalid token")
         return []
 
-    stations = await client.rotor_stations_list()
-    return [station.station.name for station in stations if station.station and ctx.value in station.station.name][:100]
+    return stations.search(ctx.value)
 
 
 class Voice(Cog, VoiceExtension):
@@ -44,6 +44,7 @@ class Voice(Cog, VoiceExtension):
         self.typed_bot: discord.Bot = bot
 
     @Cog.listener()
+    @instrumented()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState) -> None:
         guild = await self.db.get_guild(member.guild.id, projection={'current_menu': 1})
 
@@ -82,11 +83,14 @@ class Voice(Cog, VoiceExtension):
                 if (message := self.typed_bot.get_message(guild['current_menu'])):
                     await message.delete()
 
+            self.cancel_enqueue(member.guild.id)
+            self._vibe_prefetch.discard(member.guild.id)
             await self.db.update(member.guild.id, {
-                'previous_tracks': [], 'next_tracks': [], 'votes': {},
+                'previous_tracks': [], 'next_tracks': [], 'shuffle_order': [],
                 'current_track': None, 'current_menu': None, 'vibing': False,
                 'repeat': False, 'shuffle': False, 'is_stopped': True
             })
+            await self.db.clear_votes(member.guild.id)
             vc.stop()
 
             if member.guild.id in self.menu_views:
@@ -94,6 +98,7 @@ class Voice(Cog, VoiceExtension):
                 del self.menu_views[member.guild.id]
 
     @Cog.listener()
+    @instrumented()
     async def on_raw_reaction_add(self, payload: discord.RawReactionActionEvent) -> None:
         logging.debug(f"[VOICE] Reaction added by user {payload.user_id} in channel {payload.channel_id}")
 
@@ -125,87 +130,72 @@ class Voice(Cog, VoiceExtension):
             logging.info(f"[VOICE] Message {payload.message_id} is not a bot message")
             return
 
-        guild = await self.db.get_guild(payload.guild_id)
+        guild = await self.db.get_guild(payload.guild_id, projection={'use_single_token': 1, 'single_token_uid': 1})
 
         if not guild['use_single_token'] and not (guild['single_token_uid'] or await self.users_db.get_ym_token(payload.user_id)):
             await message.remove_reaction(payload.emoji, payload.member)
             await channel.send("❌ Для участия в голосовании необходимо авторизоваться через /account login.", delete_after=15)
             return
 
-        votes = guild['votes']
-
-        if str(payload.message_id) not in votes:
-            logging.info(f"[VOICE] Message {payload.message_id} not found in votes")
-            return
-
-        vote_data = votes[str(payload.message_id)]
-
         if payload.emoji.name == '✅':
             logging.info(f"[VOICE] User {payload.user_id} voted positively for message {payload.message_id}")
-            vote_data['positive_votes'].append(payload.user_id)
+            vote_type = 'positive'
         elif payload.emoji.name == '❌':
             logging.info(f"[VOICE] User {payload.user_id} voted negatively for message {payload.message_id}")
-            vote_data['negative_votes'].append(payload.user_id)
+            vote_type = 'negative'
+        else:
+            return
+
+        if not (vote_data := await self.db.modify_vote(payload.message_id, payload.user_id, vote_type, 'add')):
+            logging.info(f"[VOICE] Message {payload.message_id} not found in votes")
+            return
 
         total_members = len(channel.members)
         required_votes = 2 if total_members <= 5 else 4 if total_members <= 10 else 6 if total_members <= 15 else 9
         if len(vote_data['positive_votes']) >= required_votes:
+            if not await self.db.pop_vote(payload.message_id):
+                logging.debug(f"[VOICE] Vote for message {payload.message_id} was already processed")
+                return
+
             logging.info(f"[VOICE] Enough positive votes for message {payload.message_id}")
             await message.delete()
+
+            guild = await self.db.get_guild(payload.guild_id, projection={
+                'current_menu': 1, 'current_track': 1, 'repeat': 1, 'shuffle': 1,
+                'next_tracks': {'$slice': 1}, 'previous_tracks': {'$slice': 1}
+            })
             await self.proccess_vote(payload, guild, vote_data)
-            del votes[str(payload.message_id)]
 
         elif len(vote_data['negative_votes']) >= required_votes:
+            if not await self.db.pop_vote(payload.message_id):
+                logging.debug(f"[VOICE] Vote for message {payload.message_id} was already processed")
+                return
+
             logging.info(f"[VOICE] Enough negative votes for message {payload.message_id}")
             await message.clear_reactions()
             await message.edit(content='Запрос был отклонён.', delete_after=15)
-            del votes[str(payload.message_id)]
-
-        await self.db.update(payload.guild_id, {'votes': votes})
 
     @Cog.listener()
+    @instrumented()
     async def on_raw_reaction_remove(self, payload: discord.RawReactionActionEvent) -> None:
         logging.debug(f"[VOICE] Reaction removed by user {payload.user_id} in channel {payload.channel_id}")
 
-        if not self.typed_bot.user or not payload.member:
+        # Discord doesn't provide member for removed reactions
+        if not self.typed_bot.user or not payload.guild_id:
             return
 
-        if not payload.guild_id:
-            return
-
-        channel = self.typed_bot.get_channel(payload.channel_id)
-        if not isinstance(channel, discord.VoiceChannel):
-            logging.info(f"[VOICE] Channel {payload.channel_id} is not a voice channel")
+        if payload.emoji.name == '✅':
+            vote_type = 'positive'
+        elif payload.emoji.name == '❌':
+            vote_type = 'negative'
+        else:
             return
 
-        guild = await self.db.get_guild(payload.guild_id, projection={'votes': 1})
-        votes = guild['votes']
-
-        if str(payload.message_id) not in votes:
+        if not await self.db.modify_vote(payload.message_id, payload.user_id, vote_type, 'remove'):
             logging.info(f"[VOICE] Message {payload.message_id} not found in votes")
             return
 
-        try:
-            message = await channel.fetch_message(payload.message_id)
-        except discord.Forbidden:
-            logging.info(f"[VOICE] Bot does not have permissions to read messages in channel {payload.channel_id}")
-            return
-        except discord.NotFound:
-            logging.info(f"[VOICE] Message {payload.message_id} not found in channel {payload.channel_id}")
-            return
-
-        if not message or message.author.id != self.typed_bot.user.id:
-            return
-
-        vote_data = votes[str(payload.message_id)]
-        if payload.emoji.name == '✔️':
-            logging.info(f"[VOICE] User {payload.user_id} removed positive vote for message {payload.message_id}")
-            del vote_data['positive_votes'][payload.user_id]
-        elif payload.emoji.name == '❌':
-            logging.info(f"[VOICE] User {payload.user_id} removed negative vote for message {payload.message_id}")
-            del vote_data['negative_votes'][payload.user_id]
-
-        await self.db.update(payload.guild_id, {'votes': votes})
+        logging.info(f"[VOICE] User {payload.user_id} removed {vote_type} vote for message {payload.message_id}")
 
     @voice.command(name="menu", description="Создать или обновить меню проигрывателя.")
     async def menu(self, ctx: discord.ApplicationContext) -> None:
@@ -259,6 +249,7 @@ class Voice(Cog, VoiceExtension):
                 if guild['use_single_token']:
                     response_message = ("success", "Подключение успешно! Ваш токен будет использован для всех операций с музыкой на этом сервере.")
                     await self.db.update(ctx.guild_id, {'single_token_uid': ctx.author.id})
+                    self.invalidate_ym_token(gid=ctx.guild_id)
         else:
             response_message = ("error", "Вы должны отправить команду в чате голосового канала.")
 
@@ -298,6 +289,7 @@ class Voice(Cog, VoiceExtension):
         logging.info(f"[VOICE] Successfully disconnected from voice channel in guild {ctx.guild_id}")
 
         await self.db.update(ctx.guild_id, {'single_token_uid': None})
+        self.invalidate_ym_token(gid=ctx.guild_id)
         await self.respond(ctx, "success", "Отключение успешно!", delete_after=15, ephemeral=True)
 
     @queue.command(description="Очистить очередь треков и историю прослушивания.")
@@ -333,7 +325,8 @@ class Voice(Cog, VoiceExtension):
             )
             return
 
-        await self.db.update(ctx.guild_id, {'previous_tracks': [], 'next_tracks': []})
+        self.cancel_enqueue(ctx.guild_id)
+        await self.db.update(ctx.guild_id, {'previous_tracks': [], 'next_tracks': [], 'shuffle_order': []})
         await self.respond(ctx, "success", "Очередь и история сброшены.", delete_after=15, ephemeral=True)
         logging.info(f"[VOICE] Queue and history cleared in guild {ctx.guild_id}")
 
@@ -344,7 +337,7 @@ class Voice(Cog, VoiceExtension):
         if not await self.voice_check(ctx):
             return
 
-        tracks = await self.db.get_tracks_list(ctx.guild_id, 'next')
+        tracks = await self.db.get_upcoming_tracks(ctx.guild_id)
         if len(tracks) == 0:
             await self.respond(ctx, "error", "Очередь прослушивания пуста.", delete_after=15, ephemeral=True)
             return
@@ -421,13 +414,7 @@ class Voice(Cog, VoiceExtension):
             if not (client := await self.init_ym_client(ctx)):
                 return
 
-            for content in (await client.rotor_stations_list()):
-                if content.station and content.station.name == name and content.ad_params:
-                    break
-            else:
-                content = None
-
-            if not content:
+            if not (content := (await self._catalog.stations(client)).get(name)) or not content.ad_params:
                 logging.debug(f"[VOICE] Station {name} not found")
                 await self.respond(ctx, "error", "Станция не найдена.", delete_after=15, ephemeral=True)
                 return
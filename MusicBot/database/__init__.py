@@ -1,8 +1,10 @@
-from .base import BaseGuildsDatabase, BaseUsersDatabase, guilds, users
+from .base import BaseGuildsDatabase, BaseUsersDatabase, backend, change_streams, guilds, users, votes
+from .backends import StorageBackend, MongoBackend, SQLiteBackend
+from .instrumentation import instrumented, track_interaction
 from .extensions import VoiceGuildsDatabase
 
 from .user import User, ExplicitUser
-from .guild import Guild, ExplicitGuild, MessageVotes
+from .guild import Guild, ExplicitGuild, MessageVotes, ExplicitMessageVotes
 
 __all__ = [
     'BaseGuildsDatabase',
@@ -13,6 +15,15 @@ __all__ = [
     'Guild',
     'ExplicitGuild',
     'MessageVotes',
+    'ExplicitMessageVotes',
+    'StorageBackend',
+    'MongoBackend',
+    'SQLiteBackend',
+    'backend',
+    'change_streams',
+    'instrumented',
+    'track_interaction',
     'guilds',
     'users',
+    'votes',
 ]
\ No newline at end of file
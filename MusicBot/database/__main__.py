@@ -0,0 +1,106 @@
+import asyncio
+import logging
+import argparse
+from pathlib import Path
+from datetime import datetime, timedelta, timezone
+
+from MusicBot.database import backend
+from MusicBot.database.backup import BACKUP_COLLECTIONS, backup, restore, read_manifest
+from MusicBot.database.indexes import ensure_indexes, verify_indexes, diagnose
+from MusicBot.database.maintenance import compact_idle_guilds
+
+async def indexes_command(args: argparse.Namespace) -> int:
+    created = await ensure_indexes()
+    print(f"Created indexes: {', '.join(created) or 'none'}")
+
+    if problems := await verify_indexes():
+        print('Index problems:\n' + '\n'.join(f'  {problem}' for problem in problems))
+        return 1
+
+    print('All indexes are in place')
+    return 0
+
+async def diagnose_command(args: argparse.Namespace) -> int:
+    try:
+        plans = await diagnose()
+    except NotImplementedError as e:
+        print(e)
+        return 1
+
+    for plan in plans:
+        print(f"{'COLLSCAN' if plan['collscan'] else 'ok':>8}  {plan['collection']} {plan['filter']}: {' <- '.join(plan['stages'])}")
+
+    return 1 if any(plan['collscan'] for plan in plans) else 0
+
+async def compact_command(args: argparse.Namespace) -> int:
+    compacted = await compact_idle_guilds(timedelta(days=args.days), batch_size=args.batch_size, archive=args.archive)
+    print(f"Compacted guilds: {compacted}")
+    return 0
+
+def parse_since(value: str) -> datetime:
+    """Accept an ISO datetime or a previous backup directory whose start time is used."""
+    if Path(value).is_dir():
+        value = read_manifest(value)['created_at']
+
+    since = datetime.fromisoformat(value)
+    return since if since.tzinfo else since.replace(tzinfo=timezone.utc)
+
+async def backup_command(args: argparse.Namespace) -> int:
+    manifest = await backup(
+        args.directory,
+        collections=tuple(args.collections),
+        fmt=args.format,
+        since=args.since,
+        batch_size=args.batch_size,
+        throttle=args.throttle
+    )
+    print(f"Saved documents: {', '.join(f'{name}: {count}' for name, count in manifest['collections'].items())}")
+    return 0
+
+async def restore_command(args: argparse.Namespace) -> int:
+    try:
+        restored = await restore(args.directory, collections=tuple(args.collections) if args.collections else None, batch_size=args.batch_size)
+    except (OSError, ValueError) as e:
+        print(e)
+        return 1
+
+    print(f"Restored documents: {', '.join(f'{name}: {count}' for name, count in restored.items())}")
+    return 0
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(prog='python -m MusicBot.database', description='Database maintenance tools')
+    subparsers = parser.add_subparsers(required=True)
+
+    subparsers.add_parser('indexes', help='create missing indexes and verify them').set_defaults(func=indexes_command)
+    subparsers.add_parser('diagnose', help='explain the queries used by the bot and report collection scans').set_defaults(func=diagnose_command)
+
+    compact = subparsers.add_parser('compact', help='reset playback state of idle guilds')
+    compact.add_argument('--days', type=int, default=30, help='minimal days since the last activity')
+    compact.add_argument('--batch-size', type=int, default=500)
+    compact.add_argument('--archive', action='store_true', help='save queues and history to guilds_archive')
+    compact.set_defaults(func=compact_command)
+
+    backup_parser = subparsers.add_parser('backup', help='save guilds and users to gzip compressed files')
+    backup_parser.add_argument('directory', help='output directory')
+    backup_parser.add_argument('--format', choices=('ndjson', 'bson'), default='ndjson')
+    backup_parser.add_argument('--collections', nargs='+', default=list(BACKUP_COLLECTIONS))
+    backup_parser.add_argument('--since', type=parse_since, help='only documents updated since an ISO datetime or a previous backup directory')
+    backup_parser.add_argument('--batch-size', type=int, default=500)
+    backup_parser.add_argument('--throttle', type=float, default=0, help='pause between batches in seconds')
+    backup_parser.set_defaults(func=backup_command)
+
+    restore_parser = subparsers.add_parser('restore', help='restore documents from a backup directory')
+    restore_parser.add_argument('directory', help='backup directory')
+    restore_parser.add_argument('--collections', nargs='+', help='defaults to all collections of the backup')
+    restore_parser.add_argument('--batch-size', type=int, default=500)
+    restore_parser.set_defaults(func=restore_command)
+
+    args = parser.parse_args()
+    try:
+        return await args.func(args)
+    finally:
+        await backend.close()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    raise SystemExit(asyncio.run(main()))
@@ -0,0 +1,42 @@
+import os
+
+from .base import StorageBackend, Collection, Cursor
+from .mongo import MongoBackend
+from .sqlite import SQLiteBackend
+from .. import instrumentation
+
+def create_backend() -> StorageBackend:
+    """Create storage backend from the environment variables.
+
+    `DB_BACKEND` selects the backend: 'mongo' (default) uses `MONGO_URI`,
+    'sqlite' uses `SQLITE_PATH` (':memory:' keeps the data in memory).
+
+    Raises:
+        ValueError: Unknown backend or missing connection settings.
+
+    Returns:
+        StorageBackend: Configured backend.
+    """
+    backend = os.getenv('DB_BACKEND', 'mongo').lower()
+
+    if backend == 'mongo':
+        mongo_server = os.getenv('MONGO_URI')
+        if not mongo_server:
+            raise ValueError('MONGO_URI environment variable is not set')
+        if instrumentation.enabled:
+            return MongoBackend(mongo_server, event_listeners=[instrumentation.metrics])
+        return MongoBackend(mongo_server)
+
+    if backend == 'sqlite':
+        return SQLiteBackend(os.getenv('SQLITE_PATH', 'YandexMusicBot.db'))
+
+    raise ValueError(f"Unknown DB_BACKEND '{backend}'. Expected 'mongo' or 'sqlite'")
+
+__all__ = [
+    'StorageBackend',
+    'Collection',
+    'Cursor',
+    'MongoBackend',
+    'SQLiteBackend',
+    'create_backend',
+]
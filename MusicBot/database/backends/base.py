@@ -0,0 +1,51 @@
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Iterable, Mapping, Protocol, Self, Sequence, TypeVar
+
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+_DocumentType = TypeVar('_DocumentType', bound=Mapping[str, Any])
+
+class Cursor(Protocol[_DocumentType]):
+    """Subset of `pymongo.asynchronous.cursor.AsyncCursor` used by the bot."""
+
+    def limit(self, limit: int) -> Self: ...
+    def batch_size(self, batch_size: int) -> Self: ...
+    def __aiter__(self) -> AsyncIterator[_DocumentType]: ...
+    async def to_list(self, length: int | None = None) -> list[_DocumentType]: ...
+
+class Collection(Protocol[_DocumentType]):
+    """Subset of `pymongo.asynchronous.collection.AsyncCollection` that every storage backend must implement.
+    Filters, updates and projections use MongoDB syntax.
+    """
+
+    @property
+    def name(self) -> str: ...
+
+    async def find_one(self, filter: Mapping[str, Any] | None = None, *args: Any, **kwargs: Any) -> _DocumentType | None: ...
+    def find(self, filter: Mapping[str, Any] | None = None, *args: Any, **kwargs: Any) -> Cursor[_DocumentType]: ...
+    async def find_one_and_update(self, filter: Mapping[str, Any], update: Mapping[str, Any], *args: Any, **kwargs: Any) -> _DocumentType | None: ...
+    async def find_one_and_delete(self, filter: Mapping[str, Any], *args: Any, **kwargs: Any) -> _DocumentType | None: ...
+    async def insert_one(self, document: Any, *args: Any, **kwargs: Any) -> InsertOneResult: ...
+    async def insert_many(self, documents: Iterable[Any], *args: Any, **kwargs: Any) -> InsertManyResult: ...
+    async def update_one(self, filter: Mapping[str, Any], update: Mapping[str, Any], *args: Any, **kwargs: Any) -> UpdateResult: ...
+    async def update_many(self, filter: Mapping[str, Any], update: Mapping[str, Any], *args: Any, **kwargs: Any) -> UpdateResult: ...
+    async def replace_one(self, filter: Mapping[str, Any], replacement: Mapping[str, Any], *args: Any, **kwargs: Any) -> UpdateResult: ...
+    async def delete_one(self, filter: Mapping[str, Any], *args: Any, **kwargs: Any) -> DeleteResult: ...
+    async def delete_many(self, filter: Mapping[str, Any], *args: Any, **kwargs: Any) -> DeleteResult: ...
+    async def bulk_write(self, requests: Sequence[Any], *args: Any, **kwargs: Any) -> BulkWriteResult: ...
+    async def create_index(self, keys: Any, **kwargs: Any) -> str: ...
+    async def drop_index(self, index_or_name: Any, **kwargs: Any) -> None: ...
+    async def index_information(self) -> dict[str, Any]: ...
+
+class StorageBackend(ABC):
+    """Storage used by the database classes. Collections returned by `collection` follow the pymongo collection API."""
+
+    name: str
+
+    @abstractmethod
+    def collection(self, name: str) -> Collection[Any]:
+        """Get collection by name. Collections are created on first use."""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Release all resources held by the backend."""
@@ -0,0 +1,26 @@
+from typing import Any, cast
+
+from pymongo import AsyncMongoClient
+
+from .base import StorageBackend, Collection
+
+class MongoBackend(StorageBackend):
+    """MongoDB backend. Collections are plain `AsyncCollection` objects.
+
+    Args:
+        uri (str): MongoDB connection string.
+        database (str, optional): Database name. Defaults to 'YandexMusicBot'.
+        client_options: Additional arguments for `AsyncMongoClient`.
+    """
+
+    name = 'mongo'
+
+    def __init__(self, uri: str, database: str = 'YandexMusicBot', **client_options: Any) -> None:
+        self.client: AsyncMongoClient = AsyncMongoClient(uri, **client_options)
+        self.db = self.client[database]
+
+    def collection(self, name: str) -> Collection[Any]:
+        return cast(Collection[Any], self.db[name])
+
+    async def close(self) -> None:
+        await self.client.close()
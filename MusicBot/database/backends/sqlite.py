@@ -0,0 +1,818 @@
+import asyncio
+import logging
+import re
+import sqlite3
+from copy import deepcopy
+from time import monotonic
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Iterable, Mapping, Self, Sequence, TypeVar
+
+from bson import ObjectId, json_util
+from pymongo import InsertOne, UpdateOne, UpdateMany, ReplaceOne, DeleteOne, DeleteMany
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from pymongo.results import BulkWriteResult, DeleteResult, InsertManyResult, InsertOneResult, UpdateResult
+
+from .base import StorageBackend, Collection
+
+T = TypeVar('T')
+
+_JSON_OPTIONS = json_util.RELAXED_JSON_OPTIONS
+_TTL_PURGE_INTERVAL = 60
+_FIELD_NAME = re.compile(r'\w+')  # Top level fields that can be indexed
+
+class SQLiteBackend(StorageBackend):
+    """Embedded backend for single-node deployments and tests. Documents are stored as JSON in SQLite tables
+    and queried with the subset of MongoDB syntax used by the bot, anything else raises `OperationFailure`:
+
+    - Filters: equality, `$eq`, `$ne`, `$lt`, `$gte`, `$in`, `$nin`, `$exists`, `$and` and `$or`.
+    - Updates: `$set`, `$setOnInsert`, `$unset`, `$currentDate`, `$push` (with `$each` and `$position`),
+      `$addToSet`, `$pull` and `$pop`.
+    - Projections: inclusion, exclusion, `$slice` with a count and `$elemMatch`.
+
+    Lookups by `_id` and equality on single field indexes (see `SQLiteCollection.create_index`) use SQLite indexes,
+    other filters scan the table.
+
+    All queries run on one dedicated thread, so every operation (including `find_one_and_update`) is atomic.
+
+    Args:
+        path (str, optional): Database file path. ':memory:' keeps everything in memory. Defaults to ':memory:'.
+    """
+
+    name = 'sqlite'
+
+    def __init__(self, path: str = ':memory:') -> None:
+        self.path = path
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='sqlite')
+        self._connection: sqlite3.Connection | None = None
+        self._collections: dict[str, SQLiteCollection] = {}
+
+    def collection(self, name: str) -> 'SQLiteCollection':
+        if name not in self._collections:
+            self._collections[name] = SQLiteCollection(self, name)
+        return self._collections[name]
+
+    async def close(self) -> None:
+        def _close() -> None:
+            if self._connection:
+                self._connection.close()
+                self._connection = None
+
+        await self.run(_close)
+        self._executor.shutdown(wait=False)
+
+    async def run(self, func: Callable[[sqlite3.Connection], T] | Callable[[], T], *, connection: bool = False) -> T:
+        """Run `func` on the database thread. If `connection` is True, the connection is passed as the only argument."""
+        loop = asyncio.get_running_loop()
+        if connection:
+            return await loop.run_in_executor(self._executor, lambda: func(self._connect()))  # type: ignore
+        return await loop.run_in_executor(self._executor, func)  # type: ignore
+
+    def _connect(self) -> sqlite3.Connection:
+        if not self._connection:
+            logging.info(f"[DATABASE] Opening SQLite database '{self.path}'")
+            self._connection = sqlite3.connect(self.path, isolation_level=None)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+        return self._connection
+
+
+class SQLiteCursor:
+    """Minimal async cursor compatible with the `AsyncCursor` methods used by the bot."""
+
+    def __init__(self, collection: 'SQLiteCollection', filter: Mapping[str, Any] | None, projection: Any = None) -> None:
+        self._collection = collection
+        self._filter = filter or {}
+        self._projection = projection
+        self._limit = 0
+        self._batch_size = 100
+
+    def limit(self, limit: int) -> Self:
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> Self:
+        self._batch_size = max(batch_size, 1)
+        return self
+
+    async def __aiter__(self) -> AsyncIterator[dict[str, Any]]:
+        last_key: str | None = None
+        returned = 0
+
+        while True:
+            rows = await self._collection._backend.run(
+                lambda conn: self._collection._scan(conn, self._filter, after=last_key, limit=self._batch_size),
+                connection=True
+            )
+            if not rows:
+                return
+
+            for key, document in rows:
+                last_key = key
+                if not _matches(document, self._filter):
+                    continue
+
+                yield project(document, self._projection)
+                returned += 1
+                if self._limit and returned >= self._limit:
+                    return
+
+    async def to_list(self, length: int | None = None) -> list[dict[str, Any]]:
+        def _query(conn: sqlite3.Connection) -> list[dict[str, Any]]:
+            documents = self._collection._find(conn, self._filter)
+            limit = min(filter(None, (self._limit, length)), default=0)
+            if limit:
+                documents = documents[:limit]
+
+            return [project(document, self._projection) for document in documents]
+
+        return await self._collection._backend.run(_query, connection=True)
+
+
+class SQLiteCollection(Collection[Any]):
+    """Collection stored in the SQLite table with the same name."""
+
+    def __init__(self, backend: SQLiteBackend, name: str) -> None:
+        self._backend = backend
+        self._name = name
+        self._table = '"' + name.replace('"', '""') + '"'
+        self._created = False
+        self._ttl: dict[str, int] = {}
+        self._indexes: dict[str, dict[str, Any]] = {'_id_': {'key': [('_id', 1)]}}
+        self._lookups: dict[str, str] = {}  # Indexed field -> name of its SQLite index
+        self._last_purge = 0.0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    # Public API
+
+    async def find_one(self, filter: Mapping[str, Any] | None = None, projection: Any = None, **kwargs: Any) -> dict[str, Any] | None:
+        def _query(conn: sqlite3.Connection) -> dict[str, Any] | None:
+            document = self._find_one(conn, filter or {})
+            return project(document, projection) if document is not None else None
+
+        return await self._run(_query)
+
+    def find(self, filter: Mapping[str, Any] | None = None, projection: Any = None, **kwargs: Any) -> SQLiteCursor:
+        cursor = SQLiteCursor(self, filter, projection)
+        if 'limit' in kwargs:
+            cursor.limit(kwargs['limit'])
+        if 'batch_size' in kwargs:
+            cursor.batch_size(kwargs['batch_size'])
+        return cursor
+
+    async def find_one_and_update(
+        self,
+        filter: Mapping[str, Any],
+        update: Mapping[str, Any],
+        projection: Any = None,
+        upsert: bool = False,
+        return_document: bool = False,
+        **kwargs: Any
+    ) -> dict[str, Any] | None:
+        def _query(conn: sqlite3.Connection) -> dict[str, Any] | None:
+            with _transaction(conn):
+                before = self._find_one(conn, filter)
+                if before is None and not upsert:
+                    return None
+
+                after, _ = self._update_document(conn, before, filter, update)
+                result = after if return_document else before
+                return project(result, projection) if result is not None else None
+
+        return await self._run(_query)
+
+    async def find_one_and_delete(self, filter: Mapping[str, Any], projection: Any = None, **kwargs: Any) -> dict[str, Any] | None:
+        def _query(conn: sqlite3.Connection) -> dict[str, Any] | None:
+            with _transaction(conn):
+                document = self._find_one(conn, filter)
+                if document is None:
+                    return None
+
+                self._delete(conn, document['_id'])
+                return project(document, projection)
+
+        return await self._run(_query)
+
+    async def insert_one(self, document: Any, **kwargs: Any) -> InsertOneResult:
+        def _query(conn: sqlite3.Connection) -> Any:
+            return self._insert(conn, document)
+
+        return InsertOneResult(await self._run(_query), True)
+
+    async def insert_many(self, documents: Iterable[Any], **kwargs: Any) -> InsertManyResult:
+        def _query(conn: sqlite3.Connection) -> list[Any]:
+            with _transaction(conn):
+                return [self._insert(conn, document) for document in documents]
+
+        return InsertManyResult(await self._run(_query), True)
+
+    async def update_one(self, filter: Mapping[str, Any], update: Mapping[str, Any], upsert: bool = False, **kwargs: Any) -> UpdateResult:
+        return UpdateResult(await self._run(lambda conn: self._update(conn, filter, update, upsert, many=False)), True)
+
+    async def update_many(self, filter: Mapping[str, Any], update: Mapping[str, Any], upsert: bool = False, **kwargs: Any) -> UpdateResult:
+        return UpdateResult(await self._run(lambda conn: self._update(conn, filter, update, upsert, many=True)), True)
+
+    async def replace_one(self, filter: Mapping[str, Any], replacement: Mapping[str, Any], upsert: bool = False, **kwargs: Any) -> UpdateResult:
+        _check_replacement(replacement)
+        return UpdateResult(await self._run(lambda conn: self._update(conn, filter, replacement, upsert, many=False)), True)
+
+    async def delete_one(self, filter: Mapping[str, Any], **kwargs: Any) -> DeleteResult:
+        return DeleteResult({'n': await self._run(lambda conn: self._delete_matching(conn, filter, many=False))}, True)
+
+    async def delete_many(self, filter: Mapping[str, Any], **kwargs: Any) -> DeleteResult:
+        return DeleteResult({'n': await self._run(lambda conn: self._delete_matching(conn, filter, many=True))}, True)
+
+    async def bulk_write(self, requests: Sequence[Any], ordered: bool = True, **kwargs: Any) -> BulkWriteResult:
+        def _query(conn: sqlite3.Connection) -> dict[str, Any]:
+            result: dict[str, Any] = {
+                'nInserted': 0, 'nUpserted': 0, 'nMatched': 0, 'nModified': 0, 'nRemoved': 0, 'upserted': []
+            }
+            with _transaction(conn):
+                for index, request in enumerate(requests):
+                    # pymongo doesn't expose operation fields publicly
+                    if isinstance(request, InsertOne):
+                        self._insert(conn, request._doc)
+                        result['nInserted'] += 1
+                    elif isinstance(request, (UpdateOne, UpdateMany, ReplaceOne)):
+                        raw = self._update(conn, request._filter, request._doc, bool(request._upsert), many=isinstance(request, UpdateMany))
+                        if 'upserted' in raw:
+                            result['nUpserted'] += 1
+                            result['upserted'].append({'index': index, '_id': raw['upserted']})
+                        else:
+                            result['nMatched'] += raw['n']
+                            result['nModified'] += raw['nModified']
+                    elif isinstance(request, (DeleteOne, DeleteMany)):
+                        result['nRemoved'] += self._delete_matching(conn, request._filter, many=isinstance(request, DeleteMany))
+                    else:
+                        raise TypeError(f"Unsupported bulk write operation: {type(request).__name__}")
+            return result
+
+        return BulkWriteResult(await self._run(_query), True)
+
+    async def create_index(self, keys: Any, **kwargs: Any) -> str:
+        """Register index. TTL indexes (`expireAfterSeconds`) expire documents, single field indexes are created in SQLite
+        and serve equality filters on integers and strings. Indexed fields must not hold arrays. Other options are ignored.
+        """
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        elif isinstance(keys, Mapping):
+            keys = list(keys.items())
+
+        name = kwargs.get('name') or '_'.join(f'{key}_{direction}' for key, direction in keys)
+        self._indexes[name] = {'key': list(keys), **{k: v for k, v in kwargs.items() if k != 'name'}}
+
+        if 'expireAfterSeconds' in kwargs:
+            self._ttl[keys[0][0]] = int(kwargs['expireAfterSeconds'])
+        elif len(keys) == 1 and _FIELD_NAME.fullmatch(field := keys[0][0]) and field != '_id':
+            def _create(conn: sqlite3.Connection) -> None:
+                self._prepare(conn)
+                conn.execute(f'CREATE INDEX IF NOT EXISTS {self._sql_index(name)} ON {self._table} ({_json_field(field)})')
+
+            await self._run(_create)
+            self._lookups[field] = name
+
+        return name
+
+    async def drop_index(self, index_or_name: Any, **kwargs: Any) -> None:
+        if index_or_name not in self._indexes or index_or_name == '_id_':
+            raise OperationFailure(f"index not found with name [{index_or_name}]", code=27)
+
+        index = self._indexes.pop(index_or_name)
+        if 'expireAfterSeconds' in index:
+            self._ttl.pop(index['key'][0][0], None)
+        elif (field := index['key'][0][0]) in self._lookups:
+            del self._lookups[field]
+            await self._run(lambda conn: conn.execute(f'DROP INDEX IF EXISTS {self._sql_index(index_or_name)}'))
+
+    async def index_information(self) -> dict[str, Any]:
+        return deepcopy(self._indexes)
+
+    def watch(self, *args: Any, **kwargs: Any) -> Any:
+        raise OperationFailure("Change streams are not supported by the SQLite backend", code=40573)
+
+    # Database thread helpers
+
+    async def _run(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        return await self._backend.run(func, connection=True)
+
+    def _prepare(self, conn: sqlite3.Connection) -> None:
+        if not self._created:
+            conn.execute(f'CREATE TABLE IF NOT EXISTS {self._table} (id TEXT PRIMARY KEY, doc TEXT NOT NULL) WITHOUT ROWID')
+            self._created = True
+
+        if self._ttl and monotonic() - self._last_purge > _TTL_PURGE_INTERVAL:
+            self._last_purge = monotonic()
+            self._purge_expired(conn)
+
+    def _scan(
+        self,
+        conn: sqlite3.Connection,
+        filter: Mapping[str, Any] | None = None,
+        *,
+        after: str | None = None,
+        limit: int | None = None
+    ) -> list[tuple[str, dict[str, Any]]]:
+        """Return keys and documents ordered by key. Ids and indexed fields of `filter` narrow the query,
+        the rest of the filter is not checked.
+        """
+        self._prepare(conn)
+
+        conditions: list[str] = []
+        params: list[Any] = []
+        if filter and (ids := _id_candidates(filter)) is not None:
+            if not ids:
+                return []
+            conditions.append(f'id IN ({", ".join("?" * len(ids))})')
+            params.extend(_encode_id(_id) for _id in ids)
+        elif filter and (lookup := self._lookup(filter)):
+            field, value = lookup
+            conditions.append(f'{_json_field(field)} = ?')
+            params.append(value)
+
+        if after is not None:
+            conditions.append('id > ?')
+            params.append(after)
+
+        query = f'SELECT id, doc FROM {self._table}'
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY id'
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+
+        return [(key, _loads(doc)) for key, doc in conn.execute(query, params)]
+
+    def _sql_index(self, name: str) -> str:
+        return '"' + f'{self._name}.{name}'.replace('"', '""') + '"'
+
+    def _lookup(self, filter: Mapping[str, Any]) -> tuple[str, Any] | None:
+        """Return an indexed field and the value the filter requires it to equal, if there is one."""
+        for field, condition in filter.items():
+            if field not in self._lookups:
+                continue
+            if isinstance(condition, dict) and set(condition) == {'$eq'}:
+                condition = condition['$eq']
+            if isinstance(condition, (int, str)) and not isinstance(condition, bool):
+                return field, condition
+        return None
+
+    def _find(self, conn: sqlite3.Connection, filter: Mapping[str, Any]) -> list[dict[str, Any]]:
+        return [document for _, document in self._scan(conn, filter) if _matches(document, filter)]
+
+    def _find_one(self, conn: sqlite3.Connection, filter: Mapping[str, Any]) -> dict[str, Any] | None:
+        documents = self._find(conn, filter)
+        return documents[0] if documents else None
+
+    def _save(self, conn: sqlite3.Connection, document: dict[str, Any]) -> None:
+        conn.execute(
+            f'INSERT OR REPLACE INTO {self._table} (id, doc) VALUES (?, ?)',
+            (_encode_id(document['_id']), _dumps(document))
+        )
+
+    def _delete(self, conn: sqlite3.Connection, _id: Any) -> None:
+        conn.execute(f'DELETE FROM {self._table} WHERE id = ?', (_encode_id(_id),))
+
+    def _insert(self, conn: sqlite3.Connection, document: Any) -> Any:
+        self._prepare(conn)
+
+        if '_id' not in document:
+            document['_id'] = ObjectId()  # pymongo sets generated id on the passed document as well
+
+        key = _encode_id(document['_id'])
+        if conn.execute(f'SELECT 1 FROM {self._table} WHERE id = ?', (key,)).fetchone():
+            raise _duplicate_key_error(self._name, document['_id'])
+
+        self._save(conn, dict(document))
+        return document['_id']
+
+    def _update_document(
+        self,
+        conn: sqlite3.Connection,
+        document: dict[str, Any] | None,
+        filter: Mapping[str, Any],
+        update: Mapping[str, Any]
+    ) -> tuple[dict[str, Any], bool]:
+        """Apply update to `document` or upsert a new one if `document` is None. Return new document and modification flag."""
+        if document is None:
+            new = _upsert_base(filter)
+            _apply_update(new, update, is_insert=True)
+            new.setdefault('_id', ObjectId())
+            self._save(conn, new)
+            return new, True
+
+        new = deepcopy(document)
+        _apply_update(new, update, is_insert=False)
+        if new.get('_id') != document['_id']:
+            raise OperationFailure("Performing an update on the path '_id' would modify the immutable field '_id'", code=66)
+
+        modified = new != document
+        if modified:
+            self._save(conn, new)
+        return new, modified
+
+    def _update(self, conn: sqlite3.Connection, filter: Mapping[str, Any], update: Mapping[str, Any], upsert: bool, *, many: bool) -> dict[str, Any]:
+        with _transaction(conn):
+            documents = self._find(conn, filter)
+            if not many:
+                documents = documents[:1]
+
+            if not documents:
+                if not upsert:
+                    return {'n': 0, 'nModified': 0}
+                document, _ = self._update_document(conn, None, filter, update)
+                return {'n': 1, 'nModified': 0, 'upserted': document['_id']}
+
+            modified = sum(self._update_document(conn, document, filter, update)[1] for document in documents)
+            return {'n': len(documents), 'nModified': modified}
+
+    def _delete_matching(self, conn: sqlite3.Connection, filter: Mapping[str, Any], *, many: bool) -> int:
+        with _transaction(conn):
+            documents = self._find(conn, filter)
+            if not many:
+                documents = documents[:1]
+
+            for document in documents:
+                self._delete(conn, document['_id'])
+            return len(documents)
+
+    def _purge_expired(self, conn: sqlite3.Connection) -> None:
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        expired = []
+
+        for key, document in self._scan(conn):
+            for field, ttl in self._ttl.items():
+                value = _normalize(_first(_resolve(document, field)))
+                if isinstance(value, datetime) and value + timedelta(seconds=ttl) <= now:
+                    expired.append(key)
+                    break
+
+        if expired:
+            logging.debug(f"[DATABASE] Removing {len(expired)} expired documents from '{self._name}'")
+            conn.executemany(f'DELETE FROM {self._table} WHERE id = ?', [(key,) for key in expired])
+
+
+# Serialization
+
+def _dumps(document: Any) -> str:
+    return json_util.dumps(document, json_options=_JSON_OPTIONS)
+
+def _loads(data: str) -> Any:
+    return json_util.loads(data, json_options=_JSON_OPTIONS)
+
+def _encode_id(_id: Any) -> str:
+    return _dumps(_id)
+
+def _json_field(field: str) -> str:
+    # Index expressions must be repeated literally in queries for SQLite to use the index
+    return f"json_extract(doc, '$.\"{field}\"')"
+
+class _transaction:
+    """Wrap queries in a transaction unless one is already open."""
+
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+        self.owner = False
+
+    def __enter__(self) -> None:
+        if not self.conn.in_transaction:
+            self.conn.execute('BEGIN')
+            self.owner = True
+
+    def __exit__(self, exc_type: Any, *args: Any) -> None:
+        if self.owner:
+            self.conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+def _duplicate_key_error(collection: str, _id: Any) -> DuplicateKeyError:
+    return DuplicateKeyError(f"E11000 duplicate key error collection: {collection} dup key: {{ _id: {_id!r} }}", code=11000)
+
+def _check_replacement(replacement: Mapping[str, Any]) -> None:
+    if any(key.startswith('$') for key in replacement):
+        raise ValueError('replacement can not include $ operators')
+
+
+# Queries
+
+def _normalize(value: Any) -> Any:
+    """Convert aware datetimes to naive UTC ones as they are returned from the storage."""
+    if isinstance(value, datetime) and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _equals(a: Any, b: Any) -> bool:
+    a, b = _normalize(a), _normalize(b)
+    if isinstance(a, bool) != isinstance(b, bool):
+        return False
+    return a == b
+
+def _first(values: list[Any]) -> Any:
+    return values[0] if values else None
+
+def _resolve(document: Any, path: str) -> list[Any]:
+    """Return all values found by the dotted `path`. Arrays are traversed like in MongoDB."""
+    values = [document]
+    for part in path.split('.'):
+        found = []
+        for value in values:
+            if isinstance(value, dict):
+                if part in value:
+                    found.append(value[part])
+            elif isinstance(value, list):
+                if part.isdigit():
+                    if int(part) < len(value):
+                        found.append(value[int(part)])
+                else:
+                    found.extend(item[part] for item in value if isinstance(item, dict) and part in item)
+        values = found
+    return values
+
+def _id_candidates(filter: Mapping[str, Any]) -> list[Any] | None:
+    """Return ids the filter is limited to or None if every document has to be checked."""
+    if '_id' not in filter:
+        return None
+
+    condition = filter['_id']
+    if isinstance(condition, dict) and condition and all(key.startswith('$') for key in condition):
+        if set(condition) == {'$in'}:
+            return list(condition['$in'])
+        if set(condition) == {'$eq'}:
+            return [condition['$eq']]
+        return None
+    return [condition]
+
+def _is_operator_dict(value: Any) -> bool:
+    return isinstance(value, dict) and bool(value) and all(key.startswith('$') for key in value)
+
+def _matches(document: Any, filter: Mapping[str, Any]) -> bool:
+    for key, condition in filter.items():
+        if key == '$and':
+            if not all(_matches(document, sub) for sub in condition):
+                return False
+        elif key == '$or':
+            if not any(_matches(document, sub) for sub in condition):
+                return False
+        elif not _match_values(_resolve(document, key), condition):
+            return False
+    return True
+
+def _match_values(values: list[Any], condition: Any) -> bool:
+    if _is_operator_dict(condition):
+        return all(_match_operator(values, operator, argument) for operator, argument in condition.items())
+    return _match_eq(values, condition)
+
+def _expand(values: list[Any]) -> list[Any]:
+    """Add array elements to the values to compare them the way MongoDB does."""
+    expanded = list(values)
+    for value in values:
+        if isinstance(value, list):
+            expanded.extend(value)
+    return expanded
+
+def _match_eq(values: list[Any], expected: Any) -> bool:
+    if expected is None and not values:
+        return True
+    return any(_equals(value, expected) for value in _expand(values))
+
+def _compare(values: list[Any], argument: Any, check: Callable[[Any, Any], bool]) -> bool:
+    argument = _normalize(argument)
+    for value in _expand(values):
+        value = _normalize(value)
+        try:
+            if type(value) is not bool and type(argument) is not bool and check(value, argument):
+                return True
+        except TypeError:
+            continue
+    return False
+
+def _match_operator(values: list[Any], operator: str, argument: Any) -> bool:
+    match operator:
+        case '$eq':
+            return _match_eq(values, argument)
+        case '$ne':
+            return not _match_eq(values, argument)
+        case '$gte':
+            return _compare(values, argument, lambda a, b: a >= b)
+        case '$lt':
+            return _compare(values, argument, lambda a, b: a < b)
+        case '$in':
+            return any(_match_eq(values, item) for item in argument)
+        case '$nin':
+            return not any(_match_eq(values, item) for item in argument)
+        case '$exists':
+            return bool(values) == bool(argument)
+        case _:
+            raise OperationFailure(f"Unsupported query operator for the SQLite backend: {operator}")
+
+def _match_element(element: Any, condition: Any) -> bool:
+    """Match array element like in `$elemMatch` projections and `$pull` conditions."""
+    if _is_operator_dict(condition):
+        return _match_values([element], condition)
+    if isinstance(condition, dict):
+        return isinstance(element, dict) and _matches(element, condition)
+    return _equals(element, condition)
+
+
+# Projections
+
+def project(document: dict[str, Any], projection: Any) -> dict[str, Any]:
+    """Apply MongoDB projection (inclusion, exclusion, `$slice` with a count and `$elemMatch`) to the document."""
+    if projection is None:
+        return document
+
+    if not isinstance(projection, Mapping):
+        projection = {key: 1 for key in projection}
+
+    include_id = bool(projection.get('_id', 1))
+    fields = {key: value for key, value in projection.items() if key != '_id'}
+
+    inclusion = any(
+        (not isinstance(value, dict) and value) or (isinstance(value, dict) and '$elemMatch' in value)
+        for value in fields.values()
+    )
+    exclusion = any(not isinstance(value, dict) and not value for value in fields.values())
+    if not fields and projection.get('_id'):
+        inclusion = True  # {'_id': 1} returns only the id
+    if inclusion and exclusion:
+        raise OperationFailure("Cannot do exclusion on field in inclusion projection", code=31254)
+
+    if inclusion:
+        result: dict[str, Any] = {}
+        for key in fields:
+            _copy_path(document, result, key)
+    else:
+        result = deepcopy(document)
+        for key, value in fields.items():
+            if not isinstance(value, dict):
+                _unset_path(result, key)
+
+    for key, value in fields.items():
+        if not isinstance(value, dict):
+            continue
+
+        container, last = _walk(result, key, create=False)
+        if not isinstance(container, dict) or not isinstance(container.get(last), list):
+            continue
+
+        if '$slice' in value:
+            container[last] = _slice(container[last], value['$slice'])
+        elif '$elemMatch' in value:
+            matched = next((item for item in container[last] if _match_element(item, value['$elemMatch'])), None)
+            if matched is None:
+                del container[last]
+            else:
+                container[last] = [matched]
+
+    if include_id and '_id' in document:
+        result['_id'] = document['_id']
+    else:
+        result.pop('_id', None)
+
+    return result
+
+def _slice(items: list[Any], argument: int) -> list[Any]:
+    if not isinstance(argument, int):
+        raise OperationFailure("Only $slice with a count is supported by the SQLite backend")
+    return items[:argument] if argument >= 0 else items[argument:]
+
+def _copy_path(source: dict[str, Any], target: dict[str, Any], path: str) -> None:
+    key, _, rest = path.partition('.')
+    if key not in source:
+        return
+
+    value = source[key]
+    if not rest:
+        target[key] = deepcopy(value)
+    elif isinstance(value, dict):
+        _copy_path(value, target.setdefault(key, {}), rest)
+    elif isinstance(value, list):
+        # Like MongoDB, project every embedded document of the array and drop other elements
+        documents = [item for item in value if isinstance(item, dict)]
+        projected = target.setdefault(key, [{} for _ in documents])
+        for item, item_target in zip(documents, projected):
+            _copy_path(item, item_target, rest)
+
+
+# Updates
+
+def _walk(document: Any, path: str, *, create: bool = True) -> tuple[Any, str]:
+    """Return the container holding the last element of `path` and the last path element."""
+    *parents, last = path.split('.')
+    container = document
+
+    for part in parents:
+        if isinstance(container, list) and part.isdigit():
+            index = int(part)
+            if index >= len(container):
+                if not create:
+                    return None, last
+                container.extend([None] * (index - len(container) + 1))
+            if container[index] is None and create:
+                container[index] = {}
+            container = container[index]
+        elif isinstance(container, dict):
+            if part not in container or container[part] is None:
+                if not create:
+                    return None, last
+                container[part] = {}
+            container = container[part]
+        else:
+            if not create:
+                return None, last
+            raise OperationFailure(f"Cannot create field '{part}' in path '{path}'", code=28)
+
+        if '$' in part:
+            raise OperationFailure("Positional operators are not supported by the SQLite backend")
+
+    return container, last
+
+def _get(container: Any, key: str, default: Any = None) -> Any:
+    if isinstance(container, list):
+        return container[int(key)] if key.isdigit() and int(key) < len(container) else default
+    if isinstance(container, dict):
+        return container.get(key, default)
+    return default
+
+def _put(container: Any, key: str, value: Any) -> None:
+    if isinstance(container, list):
+        index = int(key)
+        if index >= len(container):
+            container.extend([None] * (index - len(container) + 1))
+        container[index] = value
+    else:
+        container[key] = value
+
+def _unset_path(document: Any, path: str) -> None:
+    container, last = _walk(document, path, create=False)
+    if isinstance(container, dict):
+        container.pop(last, None)
+    elif isinstance(container, list) and last.isdigit() and int(last) < len(container):
+        container[int(last)] = None
+
+def _array(container: Any, key: str, operator: str) -> list[Any]:
+    value = _get(container, key)
+    if value is None:
+        value = []
+        _put(container, key, value)
+    if not isinstance(value, list):
+        raise OperationFailure(f"The field '{key}' must be an array to apply {operator}", code=2)
+    return value
+
+def _upsert_base(filter: Mapping[str, Any]) -> dict[str, Any]:
+    document: dict[str, Any] = {}
+    for key, value in filter.items():
+        if key.startswith('$') or _is_operator_dict(value):
+            if isinstance(value, dict) and set(value) == {'$eq'}:
+                _put(*_walk(document, key), deepcopy(value['$eq']))
+            continue
+        _put(*_walk(document, key), deepcopy(value))
+    return document
+
+def _apply_update(document: dict[str, Any], update: Mapping[str, Any], *, is_insert: bool) -> None:
+    if not any(key.startswith('$') for key in update):
+        _id = document.get('_id')
+        document.clear()
+        document.update(deepcopy(dict(update)))
+        if _id is not None:
+            document.setdefault('_id', _id)
+        return
+
+    for operator, fields in update.items():
+        if operator == '$setOnInsert' and not is_insert:
+            continue
+
+        for path, argument in fields.items():
+            argument = deepcopy(argument)
+            container, last = _walk(document, path, create=operator not in ('$unset', '$pull', '$pop'))
+
+            match operator:
+                case '$set' | '$setOnInsert':
+                    _put(container, last, argument)
+                case '$unset':
+                    _unset_path(document, path)
+                case '$currentDate':
+                    _put(container, last, datetime.now(timezone.utc))
+                case '$push':
+                    items = _array(container, last, operator)
+                    if isinstance(argument, dict) and '$each' in argument:
+                        position = argument.get('$position')
+                        if position is None:
+                            items.extend(argument['$each'])
+                        else:
+                            items[position:position] = argument['$each']
+                    else:
+                        items.append(argument)
+                case '$addToSet':
+                    items = _array(container, last, operator)
+                    if not any(_equals(existing, argument) for existing in items):
+                        items.append(argument)
+                case '$pull':
+                    if container is not None and isinstance(_get(container, last), list):
+                        _put(container, last, [item for item in _get(container, last) if not _match_element(item, argument)])
+                case '$pop':
+                    if container is not None and (items := _get(container, last)):
+                        items.pop(0 if argument == -1 else -1)
+                case _:
+                    raise OperationFailure(f"Unsupported update operator for the SQLite backend: {operator}")
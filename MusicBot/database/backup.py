@@ -0,0 +1,159 @@
+import gzip
+import json
+import asyncio
+import logging
+from pathlib import Path
+from datetime import datetime, timezone
+from typing import Any, Iterator, Literal, TypedDict
+
+import bson
+from bson import json_util
+from pymongo import ReadPreference, ReplaceOne
+
+from .base import backend
+
+BackupFormat = Literal['ndjson', 'bson']
+
+BACKUP_COLLECTIONS = ('guilds', 'users')
+MANIFEST_NAME = 'manifest.json'
+
+_JSON_OPTIONS = json_util.CANONICAL_JSON_OPTIONS  # Keeps exact BSON types, e.g. int64 ids
+
+class BackupManifest(TypedDict):
+    created_at: str  # ISO time of the backup start. Use it as `since` for the next incremental backup
+    since: str | None
+    format: BackupFormat
+    collections: dict[str, int]  # Amount of saved documents by collection name
+
+def _file_name(collection: str, fmt: BackupFormat) -> str:
+    return f'{collection}.{"ndjson" if fmt == "ndjson" else "bson"}.gz'
+
+def read_manifest(directory: str | Path) -> BackupManifest:
+    with open(Path(directory) / MANIFEST_NAME, encoding='utf-8') as file:
+        return json.load(file)
+
+async def backup(
+    directory: str | Path,
+    *,
+    collections: tuple[str, ...] = BACKUP_COLLECTIONS,
+    fmt: BackupFormat = 'ndjson',
+    since: datetime | None = None,
+    batch_size: int = 500,
+    throttle: float = 0
+) -> BackupManifest:
+    """Stream collections to gzip compressed files in `directory`. Only one batch of documents is kept in memory.
+
+    BSON files can be restored with `mongorestore --gzip` as well.
+
+    Args:
+        directory (str | Path): Output directory. Created if missing.
+        collections (tuple[str, ...], optional): Collections to save. Defaults to guilds and users.
+        fmt (BackupFormat, optional): 'ndjson' for MongoDB Extended JSON lines or 'bson'. Defaults to 'ndjson'.
+        since (datetime | None, optional): Save only documents updated since this time (incremental backup). Defaults to None.
+        batch_size (int, optional): Cursor batch size. Defaults to 500.
+        throttle (float, optional): Pause after each batch in seconds to reduce the load on the database. Defaults to 0.
+
+    Returns:
+        BackupManifest: Backup description, also saved to `manifest.json`.
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    manifest = BackupManifest(
+        created_at=datetime.now(timezone.utc).isoformat(),
+        since=since.isoformat() if since else None,
+        format=fmt,
+        collections={}
+    )
+    query = {'updated_at': {'$gte': since}} if since else {}
+
+    for name in collections:
+        collection: Any = backend.collection(name)
+        if hasattr(collection, 'with_options'):
+            # Don't compete with the bot for the primary if there are secondaries
+            collection = collection.with_options(read_preference=ReadPreference.SECONDARY_PREFERRED)
+
+        count = 0
+        buffer: list[bytes] = []
+
+        with gzip.open(directory / _file_name(name, fmt), 'wb') as file:
+            async for document in collection.find(query).batch_size(batch_size):
+                if fmt == 'ndjson':
+                    buffer.append(json_util.dumps(document, json_options=_JSON_OPTIONS).encode() + b'\n')
+                else:
+                    buffer.append(bson.encode(document))
+
+                if len(buffer) >= batch_size:
+                    file.write(b''.join(buffer))
+                    count += len(buffer)
+                    buffer.clear()
+                    if throttle:
+                        await asyncio.sleep(throttle)
+
+            file.write(b''.join(buffer))
+            count += len(buffer)
+
+        manifest['collections'][name] = count
+        logging.info(f"[DATABASE] Saved {count} documents from '{name}'")
+
+    with open(directory / MANIFEST_NAME, 'w', encoding='utf-8') as file:
+        json.dump(manifest, file, indent=4)
+
+    return manifest
+
+def _read_documents(path: Path, fmt: BackupFormat) -> Iterator[dict[str, Any]]:
+    with gzip.open(path, 'rb') as file:
+        if fmt == 'bson':
+            yield from bson.decode_file_iter(file)  # type: ignore
+            return
+
+        for line in file:
+            if line.strip():
+                yield json_util.loads(line, json_options=_JSON_OPTIONS)
+
+async def restore(
+    directory: str | Path,
+    *,
+    collections: tuple[str, ...] | None = None,
+    batch_size: int = 500
+) -> dict[str, int]:
+    """Restore documents saved by `backup`. Existing documents with the same `_id` are replaced.
+    Incremental backups must be restored in order after the full backup they are based on.
+
+    Args:
+        directory (str | Path): Backup directory.
+        collections (tuple[str, ...] | None, optional): Collections to restore. Defaults to all collections of the backup.
+        batch_size (int, optional): Amount of documents written with a single ordered bulk write. Defaults to 500.
+
+    Returns:
+        dict[str, int]: Amount of restored documents by collection name.
+    """
+    directory = Path(directory)
+    manifest = read_manifest(directory)
+    restored = {}
+
+    for name in collections or tuple(manifest['collections']):
+        if name not in manifest['collections']:
+            raise ValueError(f"Collection '{name}' is not present in the backup")
+
+        # Documents are written as is, wrappers would change `updated_at`. Caches of running bots are updated by change streams
+        collection = backend.collection(name)
+        count = 0
+        batch: list[ReplaceOne] = []
+
+        for document in _read_documents(directory / _file_name(name, manifest['format']), manifest['format']):
+            batch.append(ReplaceOne({'_id': document['_id']}, document, upsert=True))
+
+            if len(batch) >= batch_size:
+                await collection.bulk_write(batch, ordered=True)
+                count += len(batch)
+                batch = []
+
+        if batch:
+            await collection.bulk_write(batch, ordered=True)
+            count += len(batch)
+
+        restored[name] = count
+        logging.info(f"[DATABASE] Restored {count} documents to '{name}'")
+
+    return restored
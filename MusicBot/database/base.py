@@ -1,21 +1,25 @@
 import os
-from typing import Iterable, Any, cast
-from pymongo import AsyncMongoClient, ReturnDocument, UpdateOne
-from pymongo.asynchronous.collection import AsyncCollection
+from datetime import datetime, timezone
+from typing import Iterable, Literal, Any, cast
+from pymongo import ReturnDocument, UpdateOne
 from pymongo.results import UpdateResult
 
 from .user import User, ExplicitUser
-from .guild import Guild, ExplicitGuild, MessageVotes
+from .guild import Guild, ExplicitGuild, MessageVotes, ExplicitMessageVotes
 
-mongo_server = os.getenv('MONGO_URI')
-if not mongo_server:
-    raise ValueError('MONGO_URI environment variable is not set')
+from .backends import Collection, create_backend
+from .cache import DocumentCache, CachedCollection, ChangeStreamSubscriber, cacheable_fields
+from .timestamps import TimestampedCollection
 
-client: AsyncMongoClient = AsyncMongoClient(mongo_server)
+backend = create_backend()
 
-db = client.YandexMusicBot
-users: AsyncCollection[ExplicitUser] = db.users
-guilds: AsyncCollection[ExplicitGuild] = db.guilds
+user_cache = DocumentCache(ttl=int(os.getenv('DB_CACHE_TTL', '300')), maxsize=10000)
+guild_cache = DocumentCache(ttl=int(os.getenv('DB_CACHE_TTL', '300')), maxsize=10000)
+change_streams = ChangeStreamSubscriber(backend, {'users': user_cache, 'guilds': guild_cache})
+
+users = cast(Collection[ExplicitUser], CachedCollection(TimestampedCollection(backend.collection('users')), user_cache))  # type: ignore
+guilds = cast(Collection[ExplicitGuild], CachedCollection(TimestampedCollection(backend.collection('guilds')), guild_cache))  # type: ignore
+votes: Collection[ExplicitMessageVotes] = backend.collection('votes')
 
 class BaseUsersDatabase:
     DEFAULT_USER = User(
@@ -27,7 +31,8 @@ class BaseUsersDatabase:
             'mood': 'all',
             'diversity': 'default',
             'lang': 'any'
-        }
+        },
+        updated_at=None
     )
 
     async def update(self, uid: int, data: User | dict[str, Any]) -> UpdateResult:
@@ -38,6 +43,18 @@ class BaseUsersDatabase:
         )
 
     async def get_user(self, uid: int, projection: User | Iterable[str] | None = None) -> ExplicitUser:
+        if not user_cache.enabled or (fields := cacheable_fields(projection, self.DEFAULT_USER)) is None:
+            return await self._fetch_user(uid, projection)
+
+        if (user := user_cache.get(uid, fields)) is None:
+            version = user_cache.version(uid)
+            user = await self._fetch_user(uid)
+            user_cache.set(uid, user, version)
+            user = cast(ExplicitUser, {key: value for key, value in user.items() if key == '_id' or key in fields})
+
+        return user
+
+    async def _fetch_user(self, uid: int, projection: User | Iterable[str] | None = None) -> ExplicitUser:
         user = await users.find_one_and_update(
             {'_id': uid},
             {'$setOnInsert': self.DEFAULT_USER},
@@ -89,13 +106,17 @@ class BaseGuildsDatabase:
         vote_switch_track=True,
         vote_add=True,
         shuffle=False,
+        shuffle_order=[],
         repeat=False,
-        votes={},
         vibing=False,
         current_viber_id=None,
         use_single_token=False,
-        single_token_uid=None
+        single_token_uid=None,
+        last_activity=None,
+        updated_at=None
     )
+    # Queues can be large and change on every playback event, so they are always read from the database
+    UNCACHED_FIELDS = frozenset({'next_tracks', 'previous_tracks', 'shuffle_order'})
 
     async def update(self, gid: int, data: Guild | dict[str, Any]) -> UpdateResult:
         return await guilds.update_one(
@@ -105,6 +126,18 @@ class BaseGuildsDatabase:
         )
 
     async def get_guild(self, gid: int, projection: Guild | Iterable[str] | None = None) -> ExplicitGuild:
+        if not guild_cache.enabled or (fields := cacheable_fields(projection, self.DEFAULT_GUILD, self.UNCACHED_FIELDS)) is None:
+            return await self._fetch_guild(gid, projection)
+
+        if (guild := guild_cache.get(gid, fields)) is None:
+            version = guild_cache.version(gid)
+            guild = await self._fetch_guild(gid, {key: 1 for key in self.DEFAULT_GUILD if key not in self.UNCACHED_FIELDS})
+            guild_cache.set(gid, guild, version)
+            guild = cast(ExplicitGuild, {key: value for key, value in guild.items() if key == '_id' or key in fields})
+
+        return guild
+
+    async def _fetch_guild(self, gid: int, projection: Guild | Iterable[str] | None = None) -> ExplicitGuild:
         guild = await guilds.find_one_and_update(
             {'_id': gid},
             {'$setOnInsert': self.DEFAULT_GUILD},
@@ -128,7 +161,35 @@ class BaseGuildsDatabase:
         return cast(ExplicitGuild, guild)
 
     async def update_vote(self, gid: int, mid: int, data: MessageVotes) -> UpdateResult:
-        return await guilds.update_one(
-            {'_id': gid},
-            {'$set': {f'votes.{mid}': data}}
+        return await votes.update_one(
+            {'_id': mid},
+            {'$set': {**data, 'gid': gid, 'created_at': datetime.now(timezone.utc)}},
+            upsert=True
         )
+
+    async def get_vote(self, mid: int) -> ExplicitMessageVotes | None:
+        return await votes.find_one({'_id': mid})
+
+    async def modify_vote(
+        self,
+        mid: int,
+        uid: int,
+        vote_type: Literal['positive', 'negative'],
+        operation: Literal['add', 'remove']
+    ) -> ExplicitMessageVotes | None:
+        """Atomically add or remove user's vote and return the updated vote. Return None if vote doesn't exist."""
+        field = f'{vote_type}_votes'
+        update = {'$addToSet': {field: uid}} if operation == 'add' else {'$pull': {field: uid}}
+
+        return await votes.find_one_and_update(
+            {'_id': mid},
+            update,
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def pop_vote(self, mid: int) -> ExplicitMessageVotes | None:
+        """Delete the vote and return it. Return None if it was already deleted by a concurrent call."""
+        return await votes.find_one_and_delete({'_id': mid})
+
+    async def clear_votes(self, gid: int) -> None:
+        await votes.delete_many({'gid': gid})
@@ -0,0 +1,335 @@
+import os
+import socket
+import asyncio
+import logging
+from copy import deepcopy
+from time import monotonic
+from collections import OrderedDict
+from typing import AbstractSet, Any, Callable, Iterable, Mapping
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from .backends import Collection, StorageBackend
+
+CHANGE_STREAM_RETRY_DELAY = 5  # Seconds between reconnection attempts
+RESUME_TOKEN_FLUSH_INTERVAL = 5  # Minimal delay between resume token writes in seconds
+
+_RESUME_ERRORS = (260, 280, 286)  # InvalidResumeToken, ChangeStreamFatalError, ChangeStreamHistoryLost
+_NOT_SUPPORTED_ERRORS = (40573,)  # The $changeStream stage is only supported on replica sets
+
+enabled = os.getenv('DB_CACHE', 'False') == 'True'
+
+class DocumentCache:
+    """Cache of documents (or their cached fields) by `_id`. Entries expire after `ttl` seconds and the least recently used entries are evicted.
+
+    Every invalidation bumps the version of the key, so a value read from the database before
+    the invalidation can't be stored with a stale version (see `version` and `set`).
+
+    Args:
+        ttl (float): Lifetime of the entries in seconds.
+        maxsize (int): Maximum amount of entries.
+    """
+
+    def __init__(self, ttl: float, maxsize: int) -> None:
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self.enabled = False  # Enabled by `ChangeStreamSubscriber` once other processes' writes can be observed
+        self._data: OrderedDict[Any, tuple[float, dict[str, Any]]] = OrderedDict()
+        self._versions: dict[Any, int] = {}
+        self._epoch = 0
+
+    def get(self, key: Any, fields: Iterable[str] | None = None) -> dict[str, Any] | None:
+        """Return a copy of the cached document or None. If `fields` are given, only they and `_id` are copied."""
+        if not self.enabled or not (entry := self._data.get(key)):
+            return None
+
+        expires_at, document = entry
+        if expires_at <= monotonic():
+            del self._data[key]
+            return None
+
+        self._data.move_to_end(key)
+        if fields is None:
+            return deepcopy(document)
+        return select(document, fields)
+
+    def version(self, key: Any) -> tuple[int, int]:
+        """Return the version of the key. Must be taken before reading the document from the database."""
+        return (self._epoch, self._versions.get(key, 0))
+
+    def set(self, key: Any, document: dict[str, Any], version: tuple[int, int]) -> None:
+        """Store a copy of the document if the key wasn't invalidated since `version` was taken."""
+        if not self.enabled or version != self.version(key):
+            return
+
+        self._data[key] = (monotonic() + self.ttl, deepcopy(document))
+        self._data.move_to_end(key)
+
+        while len(self._data) > self.maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            self._versions.pop(evicted, None)
+
+    def invalidate(self, key: Any) -> None:
+        self._data.pop(key, None)
+        self._versions[key] = self._versions.get(key, 0) + 1
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._versions.clear()
+        self._epoch += 1
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+def select(document: Mapping[str, Any], fields: Iterable[str]) -> dict[str, Any]:
+    """Return a copy of `_id` and the top level `fields` of the document, like an inclusion projection."""
+    selected = {field: deepcopy(document[field]) for field in fields if field in document}
+    if '_id' in document:
+        selected['_id'] = document['_id']
+    return selected
+
+def cacheable_fields(
+    projection: Mapping[str, Any] | Iterable[str] | None,
+    fields: Iterable[str],
+    uncached: AbstractSet[str] = frozenset()
+) -> list[str] | None:
+    """Return top level fields requested by the projection if none of them is `uncached`, otherwise None.
+    None projection requests all `fields`. Projections with exclusions or operators (e.g. `$slice`) can't be served from the cache.
+    """
+    if projection is None:
+        requested = list(fields)
+    elif isinstance(projection, Mapping):
+        if any(isinstance(value, Mapping) or not value for key, value in projection.items() if key != '_id'):
+            return None
+        requested = [key for key in projection if key != '_id']
+    else:
+        requested = [key for key in projection if key != '_id']
+
+    if any('.' in field or field in uncached for field in requested):
+        return None
+    return requested
+
+def _filter_ids(filter: Mapping[str, Any] | None) -> list[Any] | None:
+    """Return ids matched by the filter or None if it's not limited to specific ids."""
+    if not filter or '_id' not in filter:
+        return None
+
+    condition = filter['_id']
+    if isinstance(condition, Mapping):
+        if set(condition) == {'$in'}:
+            return list(condition['$in'])
+        if set(condition) == {'$eq'}:
+            return [condition['$eq']]
+        return None
+    return [condition]
+
+class CachedCollection:
+    """Collection wrapper that invalidates cached documents touched by the writes of this process.
+    Reads and all other attributes are passed to the wrapped collection.
+
+    Args:
+        collection (Collection): Wrapped collection.
+        cache (DocumentCache): Cache of the collection documents.
+    """
+
+    def __init__(self, collection: Collection[Any], cache: DocumentCache) -> None:
+        self.collection = collection
+        self.cache = cache
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.collection, name)
+
+    def _invalidate(self, filter: Mapping[str, Any] | None) -> None:
+        if (ids := _filter_ids(filter)) is None:
+            self.cache.clear()
+            return
+
+        for _id in ids:
+            self.cache.invalidate(_id)
+
+    async def _write(self, filters: Iterable[Mapping[str, Any] | None], method: str, *args: Any, **kwargs: Any) -> Any:
+        # Invalidate before the write so concurrent reads don't cache the old document, and after it to drop anything read meanwhile
+        filters = list(filters)
+        for filter in filters:
+            self._invalidate(filter)
+
+        try:
+            return await getattr(self.collection, method)(*args, **kwargs)
+        finally:
+            for filter in filters:
+                self._invalidate(filter)
+
+    async def find_one_and_update(self, filter: Mapping[str, Any], update: Mapping[str, Any], *args: Any, **kwargs: Any) -> Any:
+        if set(update) == {'$setOnInsert'}:
+            # Doesn't change existing documents. Used by `get_guild` and `get_user` to create defaults
+            return await self.collection.find_one_and_update(filter, update, *args, **kwargs)
+        return await self._write([filter], 'find_one_and_update', filter, update, *args, **kwargs)
+
+    async def find_one_and_delete(self, filter: Mapping[str, Any], *args: Any, **kwargs: Any) -> Any:
+        return await self._write([filter], 'find_one_and_delete', filter, *args, **kwargs)
+
+    async def update_one(self, filter: Mapping[str, Any], *args: Any, **kwargs: Any) -> Any:
+        return await self._write([filter], 'update_one', filter, *args, **kwargs)
+
+    async def update_many(self, filter: Mapping[str, Any], *args: Any, **kwargs: Any) -> Any:
+        return await self._write([filter], 'update_many', filter, *args, **kwargs)
+
+    async def replace_one(self, filter: Mapping[str, Any], *args: Any, **kwargs: Any) -> Any:
+        return await self._write([filter], 'replace_one', filter, *args, **kwargs)
+
+    async def delete_one(self, filter: Mapping[str, Any], *args: Any, **kwargs: Any) -> Any:
+        return await self._write([filter], 'delete_one', filter, *args, **kwargs)
+
+    async def delete_many(self, filter: Mapping[str, Any], *args: Any, **kwargs: Any) -> Any:
+        return await self._write([filter], 'delete_many', filter, *args, **kwargs)
+
+    async def insert_one(self, document: Mapping[str, Any], *args: Any, **kwargs: Any) -> Any:
+        # Documents without `_id` get a new one and can't be cached yet
+        return await self._write([{'_id': document['_id']}] if '_id' in document else [], 'insert_one', document, *args, **kwargs)
+
+    async def insert_many(self, documents: Iterable[Mapping[str, Any]], *args: Any, **kwargs: Any) -> Any:
+        documents = list(documents)
+        filters = [{'_id': document['_id']} for document in documents if '_id' in document]
+        return await self._write(filters, 'insert_many', documents, *args, **kwargs)
+
+    async def bulk_write(self, requests: list[Any], *args: Any, **kwargs: Any) -> Any:
+        # pymongo doesn't expose operation fields publicly
+        filters = [
+            request._filter if hasattr(request, '_filter') else {'_id': request._doc['_id']}
+            for request in requests if hasattr(request, '_filter') or '_id' in request._doc
+        ]
+        return await self._write(filters, 'bulk_write', requests, *args, **kwargs)
+
+class ChangeStreamSubscriber:
+    """Watch collections for changes made by any process and invalidate the local caches.
+
+    Caches are only enabled while the change streams are running. Resume tokens are stored in the
+    `change_stream_tokens` collection, so listeners don't miss events after a restart.
+
+    Args:
+        backend (StorageBackend): Storage backend.
+        caches (dict[str, DocumentCache]): Caches by collection name.
+        name (str, optional): Name of the subscriber used to store resume tokens. Must be unique per process.
+            Defaults to `DB_CACHE_NAME` environment variable or the host name.
+    """
+
+    def __init__(self, backend: StorageBackend, caches: dict[str, DocumentCache], name: str | None = None) -> None:
+        self.backend = backend
+        self.caches = caches
+        self.name = name or os.getenv('DB_CACHE_NAME') or socket.gethostname()
+        self.listeners: dict[str, list[Callable[[Any, Mapping[str, Any]], None]]] = {collection: [] for collection in caches}
+        self._tasks: list[asyncio.Task] = []
+
+    def add_listener(self, collection: str, listener: Callable[[Any, Mapping[str, Any]], None]) -> None:
+        """Call `listener` with the document id and the change event whenever a document in `collection` is changed by any process."""
+        self.listeners.setdefault(collection, []).append(listener)
+
+    async def start(self) -> bool:
+        """Start watching the collections. Return False if the backend doesn't support change streams."""
+        if self._tasks:
+            return True
+
+        for collection in self.caches:
+            try:
+                stream = await self._open(collection)
+            except (OperationFailure, NotImplementedError) as e:
+                if isinstance(e, OperationFailure) and e.code not in _NOT_SUPPORTED_ERRORS:
+                    raise
+
+                logging.warning(f"[DATABASE] Change streams are not supported ({e}). Document caching is disabled")
+                await self.stop()
+                return False
+
+            self._tasks.append(asyncio.create_task(self._watch(collection, stream)))
+
+        logging.info(f"[DATABASE] Watching {', '.join(self.caches)} for changes as '{self.name}'")
+        return True
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks.clear()
+
+        for cache in self.caches.values():
+            cache.enabled = False
+            cache.clear()
+
+    async def _open(self, collection: str) -> Any:
+        tokens = self.backend.collection('change_stream_tokens')
+        saved = await tokens.find_one({'_id': f'{self.name}:{collection}'})
+
+        try:
+            stream = await self.backend.collection(collection).watch(resume_after=saved['token'] if saved else None)  # type: ignore
+        except OperationFailure as e:
+            if not saved or e.code not in _RESUME_ERRORS:
+                raise
+
+            logging.warning(f"[DATABASE] Can't resume '{collection}' change stream: {e}. Starting from now")
+            stream = await self.backend.collection(collection).watch()  # type: ignore
+
+        # The stream is established, now any change made by other processes will reach the cache
+        self.caches[collection].clear()
+        self.caches[collection].enabled = True
+        return stream
+
+    async def _watch(self, collection: str, stream: Any) -> None:
+        cache = self.caches[collection]
+        tokens = self.backend.collection('change_stream_tokens')
+        last_flush = monotonic()
+
+        while True:
+            try:
+                async with stream:
+                    async for change in stream:
+                        self._handle_change(collection, change)
+
+                        if monotonic() - last_flush >= RESUME_TOKEN_FLUSH_INTERVAL:
+                            last_flush = monotonic()
+                            await tokens.update_one(
+                                {'_id': f'{self.name}:{collection}'},
+                                {'$set': {'token': stream.resume_token}},
+                                upsert=True
+                            )
+            except asyncio.CancelledError:
+                raise
+            except PyMongoError as e:
+                logging.error(f"[DATABASE] '{collection}' change stream failed: {e}")
+
+            # Changes made while the stream is down would be missed
+            cache.enabled = False
+            cache.clear()
+
+            while True:
+                await asyncio.sleep(CHANGE_STREAM_RETRY_DELAY)
+                try:
+                    stream = await self._open(collection)
+                    break
+                except PyMongoError as e:
+                    logging.error(f"[DATABASE] Failed to reopen '{collection}' change stream: {e}")
+
+    def _handle_change(self, collection: str, change: Mapping[str, Any]) -> None:
+        cache = self.caches[collection]
+
+        if change['operationType'] in ('insert', 'update', 'replace', 'delete'):
+            _id = change['documentKey']['_id']
+            cache.invalidate(_id)
+
+            for listener in self.listeners.get(collection, []):
+                try:
+                    listener(_id, change)
+                except Exception as e:
+                    logging.error(f"[DATABASE] Change listener failed for '{collection}' document {_id}: {e}")
+        else:
+            # drop, rename, dropDatabase or invalidate
+            logging.warning(f"[DATABASE] '{change['operationType']}' event on '{collection}', clearing cache")
+            cache.clear()
+
+def changed_fields(change: Mapping[str, Any]) -> set[str] | None:
+    """Return top-level fields changed by the update event or None if the whole document could have changed."""
+    if change['operationType'] != 'update':
+        return None
+
+    description = change.get('updateDescription', {})
+    paths = [*description.get('updatedFields', {}), *description.get('removedFields', [])]
+    return {path.split('.')[0] for path in paths}
@@ -1,4 +1,5 @@
-from random import randint
+from uuid import uuid4
+from random import randint, shuffle
 from typing import Any, Literal
 from yandex_music import Track
 from pymongo import UpdateOne, ReturnDocument
@@ -20,7 +21,7 @@ class VoiceGuildsDatabase(BaseGuildsDatabase):
             raise ValueError("list_type must be either 'next' or 'previous'")
         
         field = f'{list_type}_tracks'
-        guild = await self.get_guild(gid, projection={'current_track': 1, field: 1})
+        guild = await self.get_guild(gid, projection={'current_track': 1, 'shuffle': 1, field: 1})
 
         if list_type == 'current':
             return guild['current_track']
@@ -35,11 +36,13 @@ class VoiceGuildsDatabase(BaseGuildsDatabase):
         res = result.get(field, []) if result else None
 
         if field == 'previous_tracks' and res:
-            await guilds.find_one_and_update(
-                {'_id': gid},
-                {'$push': {'next_tracks': {'$each': [guild['current_track']], '$position': 0}}},
-                projection={'next_tracks': 1}
-            )
+            entry = self.queue_entries([guild['current_track']])[0]
+            update: dict[str, Any] = {'next_tracks': {'$each': [entry], '$position': 0}}
+            if guild['shuffle']:
+                # Current track goes back to the queue and must be the next one to play in shuffle mode as well
+                update['shuffle_order'] = {'$each': [entry['entry_id']], '$position': 0}
+
+            await guilds.update_one({'_id': gid}, {'$push': update})
 
         return res[0] if res else None
 
@@ -52,7 +55,9 @@ class VoiceGuildsDatabase(BaseGuildsDatabase):
     ) -> dict[str, Any] | None:
         field = f"{list_type}_tracks"
         track_data = self._normalize_track_data(track)
-        
+        if field == 'next_tracks':
+            track_data = self.queue_entries(track_data)
+
         operations = {
             'insert': {'$push': {field: {'$each': track_data, '$position': 0}}},
             'append': {'$push': {field: {'$each': track_data}}},
@@ -61,18 +66,39 @@ class VoiceGuildsDatabase(BaseGuildsDatabase):
             'pop_end': {'$pop': {field: 1}}
         }
 
-        update = operations[operation]
         try:
-            await guilds.update_one(
-                {'_id': gid},
-                update,
-                array_filters=None
-            )
+            if field == 'next_tracks' and operation in ('insert', 'append', 'extend'):
+                await guilds.bulk_write([
+                    UpdateOne({'_id': gid}, {**operations[operation], '$currentDate': {'last_activity': True}}),
+                    # New tracks join a generated shuffle order, an empty one is generated with them later
+                    UpdateOne(
+                        {'_id': gid, 'shuffle_order.0': {'$exists': True}},
+                        {'$push': {'shuffle_order': self._shuffle_order_update(track_data, operation)}}
+                    )
+                ])
+            else:
+                await guilds.update_one({'_id': gid}, operations[operation])
             return await self._get_popped_track(gid, field, operation)
         except DuplicateKeyError:
             await self._handle_duplicate_error(gid, field)
             return await self.modify_track(gid, track, list_type, operation)
 
+    def _shuffle_order_update(self, entries: list[dict[str, Any]], operation: str) -> dict[str, Any]:
+        entry_ids = [entry['entry_id'] for entry in entries]
+        if operation == 'insert':
+            return {'$each': entry_ids, '$position': 0}
+
+        # Appended tracks are shuffled among themselves and played after the tracks already in the order
+        shuffle(entry_ids)
+        return {'$each': entry_ids}
+
+    @staticmethod
+    def queue_entries(tracks: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        """Return copies of the track dicts with a new `entry_id`, which tells apart copies of the same track in the queue.
+        Must be used for everything put into `next_tracks`.
+        """
+        return [{**track, 'entry_id': uuid4().hex} for track in tracks]
+
     def _normalize_track_data(self, track: Track | dict | list) -> list[dict]:
         if not isinstance(track, list):
             track = [track]
@@ -82,11 +108,97 @@ class VoiceGuildsDatabase(BaseGuildsDatabase):
             for t in track
         ]
 
-    async def pop_random_track(self, gid: int, field: Literal['next', 'previous']) -> dict[str, Any] | None:
-        tracks = await self.get_tracks_list(gid, field)
-        track = tracks.pop(randint(0, len(tracks) - 1)) if tracks else None
-        await self.update(gid, {f"{field}_tracks": tracks})
-        return track
+    async def pop_shuffled_track(self, gid: int) -> dict[str, Any] | None:
+        """Pop the next track of the shuffle order from the queue. The order is generated on the first call
+        after the queue has changed, after that each call only transfers and updates a single track.
+
+        Args:
+            gid (int): Guild ID.
+
+        Returns:
+            (dict[str, Any] | None): Track or None if the queue is empty.
+        """
+        generated = False
+
+        while True:
+            guild = await guilds.find_one_and_update(
+                {'_id': gid, 'shuffle_order.0': {'$exists': True}},
+                {'$pop': {'shuffle_order': -1}},
+                projection={'shuffle_order': {'$slice': 1}},
+                return_document=ReturnDocument.BEFORE
+            )
+
+            if not guild:
+                if generated or not await self._generate_shuffle_order(gid):
+                    return None
+                generated = True
+                continue
+
+            entry_id = guild['shuffle_order'][0]
+            guild = await guilds.find_one_and_update(
+                {'_id': gid},
+                {'$pull': {'next_tracks': {'entry_id': entry_id}}},
+                projection={'next_tracks': {'$elemMatch': {'entry_id': entry_id}}},
+                return_document=ReturnDocument.BEFORE
+            )
+
+            # The track could have been removed from the queue after the order was generated
+            if guild and guild.get('next_tracks'):
+                return guild['next_tracks'][0]
+
+    async def _generate_shuffle_order(self, gid: int) -> bool:
+        """Store a random permutation of the queue entry ids. Return False if the queue is empty."""
+        guild = await guilds.find_one({'_id': gid}, projection={'next_tracks.entry_id': 1})
+        entry_ids = [track.get('entry_id') for track in guild.get('next_tracks', [])] if guild else []
+
+        if None in entry_ids:
+            # Queued before entry ids were introduced
+            if not (entry_ids := await self._add_entry_ids(gid)):
+                return False
+
+        if not entry_ids:
+            return False
+
+        shuffle(entry_ids)
+        await guilds.update_one({'_id': gid}, {'$set': {'shuffle_order': entry_ids}})
+        return True
+
+    async def _add_entry_ids(self, gid: int) -> list[str]:
+        """Give entry ids to queued tracks without them. Return entry ids of the queue."""
+        while True:
+            guild = await guilds.find_one({'_id': gid}, projection={'next_tracks': 1})
+            tracks = guild.get('next_tracks', []) if guild else []
+            entries = [track if 'entry_id' in track else self.queue_entries([track])[0] for track in tracks]
+
+            # Only written if the queue didn't change in the meantime
+            result = await guilds.update_one({'_id': gid, 'next_tracks': tracks}, {'$set': {'next_tracks': entries}})
+            if result.matched_count or not tracks:
+                return [entry['entry_id'] for entry in entries]
+
+    async def set_shuffle(self, gid: int, enabled: bool) -> None:
+        """Enable or disable shuffle. The queue itself is never reordered, so disabling shuffle keeps the original order."""
+        await self.update(gid, {'shuffle': enabled, 'shuffle_order': []})
+
+    async def get_upcoming_tracks(self, gid: int) -> list[dict[str, Any]]:
+        """Get queued tracks in the order they will be played.
+
+        Args:
+            gid (int): Guild ID.
+
+        Returns:
+            list[dict[str, Any]]: Tracks.
+        """
+        guild = await self.get_guild(gid, projection={'next_tracks': 1, 'shuffle': 1, 'shuffle_order': 1})
+        if not guild['shuffle'] or not guild['next_tracks']:
+            return guild['next_tracks']
+
+        if not guild['shuffle_order']:
+            await self._generate_shuffle_order(gid)
+            guild = await self.get_guild(gid, projection={'next_tracks': 1, 'shuffle_order': 1})
+
+        tracks = {track.get('entry_id'): track for track in guild['next_tracks']}
+        ordered = [tracks.pop(entry_id) for entry_id in guild['shuffle_order'] if entry_id in tracks]
+        return ordered + list(tracks.values())
 
     async def get_current_menu(self, gid: int) -> int | None:
         guild = await self.get_guild(gid, projection={'current_menu': 1})
@@ -140,7 +252,7 @@ class VoiceGuildsDatabase(BaseGuildsDatabase):
 
         await guilds.update_one(
             {'_id': gid},
-            {'$set': {'current_track': track}}
+            {'$set': {'current_track': track}, '$currentDate': {'last_activity': True}}
         )
 
     async def clear_tracks(self, gid: int, list_type: Literal['next', 'previous']) -> None:
@@ -148,26 +260,7 @@ class VoiceGuildsDatabase(BaseGuildsDatabase):
         field = f"{list_type}_tracks"
         await guilds.update_one(
             {'_id': gid},
-            {'$set': {field: []}}
-        )
-
-    async def shuffle_tracks(self, gid: int, list_type: Literal['next', 'previous']) -> None:
-        """Shuffle the specified tracks list."""
-        field = f"{list_type}_tracks"
-        guild = await self.get_guild(gid, projection={field: 1})
-        tracks = guild.get(field, [])
-
-        if not tracks:
-            return
-
-        shuffled_tracks = tracks.copy()
-        for i in range(len(shuffled_tracks) - 1, 0, -1):
-            j = randint(0, i)
-            shuffled_tracks[i], shuffled_tracks[j] = shuffled_tracks[j], shuffled_tracks[i]
-
-        await guilds.update_one(
-            {'_id': gid},
-            {'$set': {field: shuffled_tracks}}
+            {'$set': {field: [], 'shuffle_order': []} if list_type == 'next' else {field: []}}
         )
 
     async def move_track(
@@ -193,10 +286,12 @@ class VoiceGuildsDatabase(BaseGuildsDatabase):
             return False
 
         track = guild[from_field].pop(track_index)
+        if to_field == 'next_tracks':
+            track = self.queue_entries([track])[0]
         updates = [
             UpdateOne(
                 {'_id': gid},
-                {'$set': {from_field: guild[from_field]}},
+                {'$set': {from_field: guild[from_field], 'shuffle_order': []}},
             ),
             UpdateOne(
                 {'_id': gid},
@@ -213,6 +308,23 @@ class VoiceGuildsDatabase(BaseGuildsDatabase):
         guild = await self.get_guild(gid, projection={field: 1})
         return len(guild.get(field, []))
 
+    async def get_queue_tail(self, gid: int, max_length: int) -> dict[str, Any] | None:
+        """Get the last queued track and the current viber if at most `max_length` tracks are queued.
+        Only the last track is read from the database.
+
+        Args:
+            gid (int): Guild ID.
+            max_length (int): Maximum queue length.
+
+        Returns:
+            (dict[str, Any] | None): Guild with `next_tracks` holding the last track (or empty) and `current_viber_id`.
+                None if the queue is longer.
+        """
+        return await guilds.find_one(
+            {'_id': gid, f'next_tracks.{max_length}': {'$exists': False}},
+            projection={'next_tracks': {'$slice': -1}, 'current_viber_id': 1}
+        )
+
     async def set_current_menu(self, gid: int, menu_id: int | None) -> None:
         """Set the current menu message ID."""
         await guilds.update_one(
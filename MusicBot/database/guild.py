@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import TypedDict, Literal, Any
 
 class MessageVotes(TypedDict):
@@ -10,6 +11,19 @@ class MessageVotes(TypedDict):
     ]
     vote_content: Any | None
 
+class ExplicitMessageVotes(TypedDict):
+    _id: int  # Id of the vote message
+    gid: int
+    created_at: datetime  # Used by the TTL index to clean up stale votes
+    positive_votes: list[int]
+    negative_votes: list[int]
+    total_members: int
+    action: Literal[
+        'next', 'play/pause', 'stop', 'repeat', 'shuffle', 'previous', 'add_track',
+        'add_album', 'add_artist', 'add_playlist', 'vibe_station', 'clear_queue'
+    ]
+    vote_content: Any | None
+
 class Guild(TypedDict, total=False):  # Don't forget to change base.py if you add a new field
     next_tracks: list[dict[str, Any]]
     previous_tracks: list[dict[str, Any]]
@@ -20,12 +34,14 @@ class Guild(TypedDict, total=False):  # Don't forget to change base.py if you ad
     vote_switch_track: bool
     vote_add: bool
     shuffle: bool
+    shuffle_order: list[str]  # Entry ids of next_tracks in shuffled order. Generated lazily, empty means not generated yet
     repeat: bool
-    votes: dict[str, MessageVotes]
     vibing: bool
     current_viber_id: int | None
     use_single_token: bool
     single_token_uid: int | None
+    last_activity: datetime | None  # Last time tracks were played or queued. Used to compact idle guilds
+    updated_at: datetime | None  # Set on every write. Used for incremental backups
 
 class ExplicitGuild(TypedDict):
     _id: int
@@ -38,9 +54,11 @@ class ExplicitGuild(TypedDict):
     vote_switch_track: bool
     vote_add: bool
     shuffle: bool
+    shuffle_order: list[str]
     repeat: bool
-    votes: dict[str, MessageVotes]
     vibing: bool
     current_viber_id: int | None
     use_single_token: bool
     single_token_uid: int | None
+    last_activity: datetime | None
+    updated_at: datetime | None
@@ -0,0 +1,146 @@
+import logging
+from datetime import datetime
+from typing import Any, Mapping, TypedDict
+
+from pymongo.errors import OperationFailure
+
+from .base import backend
+
+class IndexSpec(TypedDict):
+    name: str
+    keys: list[tuple[str, int]]
+    options: dict[str, Any]
+
+class QueryPlan(TypedDict):
+    collection: str
+    filter: dict[str, Any]
+    stages: list[str]
+    collscan: bool
+
+INDEXES: dict[str, list[IndexSpec]] = {
+    'votes': [
+        # Votes are only relevant while the message exists, drop stale ones automatically
+        IndexSpec(name='created_at_ttl', keys=[('created_at', 1)], options={'expireAfterSeconds': 3600}),
+        IndexSpec(name='gid', keys=[('gid', 1)], options={}),
+    ],
+    'guilds': [
+        IndexSpec(name='last_activity', keys=[('last_activity', 1)], options={}),
+        IndexSpec(name='updated_at', keys=[('updated_at', 1)], options={}),
+    ],
+    'users': [
+        IndexSpec(name='updated_at', keys=[('updated_at', 1)], options={}),
+    ],
+    'tracks_cache': [
+        # Persistent tier of the track metadata cache (TRACK_CACHE_PERSIST)
+        IndexSpec(name='cached_at_ttl', keys=[('cached_at', 1)], options={'expireAfterSeconds': 7 * 24 * 3600}),
+    ],
+    'cover_colors': [
+        # Persistent tier of the cover color cache (COVER_COLOR_CACHE_PERSIST)
+        IndexSpec(name='cached_at_ttl', keys=[('cached_at', 1)], options={'expireAfterSeconds': 30 * 24 * 3600}),
+    ],
+}
+
+# Queries issued by the bot that should be served by an index.
+DIAGNOSTIC_QUERIES: list[tuple[str, dict[str, Any]]] = [
+    ('guilds', {'_id': 0}),
+    ('users', {'_id': 0}),
+    ('votes', {'_id': 0}),
+    ('votes', {'gid': 0}),
+    ('guilds', {'last_activity': {'$lt': datetime(2000, 1, 1)}}),
+]
+
+_INDEX_OPTIONS = ('expireAfterSeconds', 'partialFilterExpression', 'unique', 'sparse')
+
+def _same_keys(info: Mapping[str, Any], spec: IndexSpec) -> bool:
+    return [tuple(key) for key in info.get('key', [])] == [tuple(key) for key in spec['keys']]
+
+def _matches_spec(info: Mapping[str, Any], spec: IndexSpec) -> bool:
+    return _same_keys(info, spec) and all(info.get(option) == spec['options'].get(option) for option in _INDEX_OPTIONS)
+
+def _find_index(existing: Mapping[str, Mapping[str, Any]], spec: IndexSpec) -> str | None:
+    """Return the name of the index defined like `spec`, or with the same keys if there is none. Indexes created by hand
+    or by older versions of `init-mongodb.js` may have different names."""
+    if spec['name'] in existing:
+        return spec['name']
+    return next((name for name, info in existing.items() if _same_keys(info, spec)), None)
+
+async def ensure_indexes() -> list[str]:
+    """Create missing indexes and recreate the ones whose definition has changed. Safe to call on every start.
+
+    Returns:
+        list[str]: Names of created indexes.
+    """
+    created = []
+
+    for collection_name, specs in INDEXES.items():
+        collection = backend.collection(collection_name)
+        existing = await collection.index_information()
+
+        for spec in specs:
+            if name := _find_index(existing, spec):
+                if _matches_spec(existing[name], spec):
+                    continue
+
+                logging.warning(f"[DATABASE] Index '{name}' on '{collection_name}' is outdated, recreating")
+                await collection.drop_index(name)
+
+            try:
+                await collection.create_index(spec['keys'], name=spec['name'], **spec['options'])
+            except OperationFailure as e:
+                logging.error(f"[DATABASE] Failed to create index '{spec['name']}' on '{collection_name}': {e}")
+                continue
+
+            logging.info(f"[DATABASE] Created index '{spec['name']}' on '{collection_name}'")
+            created.append(f'{collection_name}.{spec["name"]}')
+
+    return created
+
+async def verify_indexes() -> list[str]:
+    """Compare existing indexes with `INDEXES`.
+
+    Returns:
+        list[str]: Descriptions of missing or outdated indexes. Empty if everything is in place.
+    """
+    problems = []
+
+    for collection_name, specs in INDEXES.items():
+        existing = await backend.collection(collection_name).index_information()
+        for spec in specs:
+            if not (name := _find_index(existing, spec)):
+                problems.append(f"{collection_name}.{spec['name']}: missing")
+            elif not _matches_spec(existing[name], spec):
+                problems.append(f"{collection_name}.{name}: definition differs from {spec['keys']} {spec['options']}")
+
+    return problems
+
+def _plan_stages(plan: Mapping[str, Any]) -> list[str]:
+    stages = [plan['stage']] if 'stage' in plan else []
+    if 'inputStage' in plan:
+        stages.extend(_plan_stages(plan['inputStage']))
+    for child in plan.get('inputStages', []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+async def diagnose() -> list[QueryPlan]:
+    """Explain `DIAGNOSTIC_QUERIES` and report the ones that need a collection scan.
+
+    Raises:
+        NotImplementedError: The storage backend doesn't support query plans.
+
+    Returns:
+        list[QueryPlan]: Winning plan stages for each query.
+    """
+    if backend.name != 'mongo':
+        raise NotImplementedError(f"Query plans are not available for the '{backend.name}' backend")
+
+    plans = []
+    for collection_name, query in DIAGNOSTIC_QUERIES:
+        explain = await backend.collection(collection_name).find(query).explain()  # type: ignore
+        winning_plan = explain['queryPlanner']['winningPlan']
+        stages = _plan_stages(winning_plan.get('queryPlan', winning_plan))  # Slot based engine nests the plan
+        plans.append(QueryPlan(collection=collection_name, filter=query, stages=stages, collscan='COLLSCAN' in stages))
+
+        if 'COLLSCAN' in stages:
+            logging.warning(f"[DATABASE] Query {query} on '{collection_name}' uses a collection scan")
+
+    return plans
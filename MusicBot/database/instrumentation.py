@@ -0,0 +1,222 @@
+import os
+import logging
+from time import monotonic
+from functools import wraps
+from contextvars import ContextVar, Token
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Iterator, ParamSpec, TypeVar
+
+import bson
+from pymongo.monitoring import CommandListener, CommandStartedEvent, CommandSucceededEvent, CommandFailedEvent
+
+P = ParamSpec('P')
+R = TypeVar('R')
+
+LATENCY_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000)  # Upper bounds in milliseconds, the last bucket is unbounded
+BACKGROUND_ORIGIN = '<background>'
+PENDING_TTL = 600  # Seconds before a command without a result (e.g. after a connection reset) is forgotten
+PENDING_MAXSIZE = 10000  # Maximum amount of commands waiting for a result
+
+_IGNORED_COMMANDS = {'hello', 'ismaster', 'isMaster', 'ping', 'endSessions', 'saslStart', 'saslContinue', 'buildInfo'}
+
+class CommandStats:
+    """Aggregated statistics of one command type for one origin."""
+
+    __slots__ = ('count', 'failures', 'total_ms', 'max_ms', 'bytes', 'histogram')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bytes = 0
+        self.histogram = [0] * (len(LATENCY_BUCKETS) + 1)
+
+    def record(self, duration_ms: float, size: int, failed: bool) -> None:
+        self.count += 1
+        self.failures += failed
+        self.total_ms += duration_ms
+        self.max_ms = max(self.max_ms, duration_ms)
+        self.bytes += size
+
+        for index, bound in enumerate(LATENCY_BUCKETS):
+            if duration_ms <= bound:
+                self.histogram[index] += 1
+                break
+        else:
+            self.histogram[-1] += 1
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            'count': self.count,
+            'failures': self.failures,
+            'total_ms': round(self.total_ms, 3),
+            'avg_ms': round(self.total_ms / self.count, 3) if self.count else 0.0,
+            'max_ms': round(self.max_ms, 3),
+            'bytes': self.bytes,
+            'histogram': dict(zip([*map(str, LATENCY_BUCKETS), 'inf'], self.histogram)),
+        }
+
+class InteractionStats:
+    """Commands issued while handling a single interaction or event."""
+
+    __slots__ = ('origin', 'started_at', 'count', 'failures', 'total_ms', 'bytes', 'commands')
+
+    def __init__(self, origin: str) -> None:
+        self.origin = origin
+        self.started_at = monotonic()
+        self.count = 0
+        self.failures = 0
+        self.total_ms = 0.0
+        self.bytes = 0
+        self.commands: dict[str, int] = {}
+
+    def record(self, command: str, duration_ms: float, size: int, failed: bool) -> None:
+        self.count += 1
+        self.failures += failed
+        self.total_ms += duration_ms
+        self.bytes += size
+        self.commands[command] = self.commands.get(command, 0) + 1
+
+    def summary(self) -> str:
+        commands = ', '.join(f'{name}: {count}' for name, count in sorted(self.commands.items(), key=lambda item: -item[1]))
+        return (
+            f"{self.origin}: {self.count} commands ({commands or 'none'}), "
+            f"{self.failures} failed, {self.total_ms:.1f} ms in database, {self.bytes} bytes returned, "
+            f"{(monotonic() - self.started_at) * 1000:.1f} ms total"
+        )
+
+_interaction: ContextVar[InteractionStats | None] = ContextVar('db_interaction', default=None)
+
+class DatabaseMetrics(CommandListener):
+    """pymongo command listener that aggregates database usage per interaction origin and command name.
+
+    The origin is taken from the current context (see `track_interaction`), commands without one
+    are recorded under `BACKGROUND_ORIGIN`. Commands that never complete are forgotten after `PENDING_TTL`
+    seconds or when more than `PENDING_MAXSIZE` commands are waiting, and counted in `abandoned`.
+    """
+
+    def __init__(self) -> None:
+        self.stats: dict[tuple[str, str], CommandStats] = {}
+        self.abandoned = 0
+        # Ordered by start time, so stale commands are always at the beginning
+        self._pending: dict[tuple[Any, int, int], tuple[float, InteractionStats | None]] = {}
+
+    def started(self, event: CommandStartedEvent) -> None:
+        if event.command_name in _IGNORED_COMMANDS:
+            return
+
+        now = monotonic()
+        while self._pending and (len(self._pending) >= PENDING_MAXSIZE or next(iter(self._pending.values()))[0] < now - PENDING_TTL):
+            del self._pending[next(iter(self._pending))]
+            self.abandoned += 1
+
+        self._pending[(event.connection_id, event.request_id, event.operation_id)] = (now, _interaction.get())
+
+    def succeeded(self, event: CommandSucceededEvent) -> None:
+        self._finish(event, self._reply_size(event.reply), failed=False)
+
+    def failed(self, event: CommandFailedEvent) -> None:
+        self._finish(event, 0, failed=True)
+
+    def snapshot(self) -> dict[str, dict[str, dict[str, Any]]]:
+        """Return aggregated statistics as `{origin: {command: stats}}`."""
+        result: dict[str, dict[str, dict[str, Any]]] = {}
+        for (origin, command), stats in self.stats.items():
+            result.setdefault(origin, {})[command] = stats.to_dict()
+        return result
+
+    def report(self, top: int = 10) -> str:
+        """Return a human readable list of the origins with the most database round trips."""
+        totals: dict[str, list[float]] = {}
+        for (origin, _), stats in self.stats.items():
+            total = totals.setdefault(origin, [0, 0.0, 0])
+            total[0] += stats.count
+            total[1] += stats.total_ms
+            total[2] += stats.bytes
+
+        lines = [
+            f"{origin}: {int(count)} commands, {total_ms:.1f} ms, {int(size)} bytes"
+            for origin, (count, total_ms, size) in sorted(totals.items(), key=lambda item: -item[1][0])[:top]
+        ]
+        if self.abandoned:
+            lines.append(f"{self.abandoned} commands never completed")
+        return '\n'.join(lines) or 'No database commands recorded'
+
+    def reset(self) -> None:
+        self.stats.clear()
+
+    def _finish(self, event: CommandSucceededEvent | CommandFailedEvent, size: int, *, failed: bool) -> None:
+        key = (event.connection_id, event.request_id, event.operation_id)
+        if key not in self._pending:
+            return
+
+        _, interaction = self._pending.pop(key)
+        origin = interaction.origin if interaction else BACKGROUND_ORIGIN
+        duration_ms = event.duration_micros / 1000
+
+        if (origin, event.command_name) not in self.stats:
+            self.stats[(origin, event.command_name)] = CommandStats()
+        self.stats[(origin, event.command_name)].record(duration_ms, size, failed)
+
+        if interaction:
+            interaction.record(event.command_name, duration_ms, size, failed)
+
+    @staticmethod
+    def _reply_size(reply: Any) -> int:
+        try:
+            return len(bson.encode(reply))
+        except Exception:
+            return 0
+
+metrics = DatabaseMetrics()
+enabled = os.getenv('DB_METRICS', os.getenv('DEBUG', 'False')) == 'True'
+
+def begin_interaction(origin: str) -> Token[InteractionStats | None] | None:
+    """Start tracking database commands in the current context. Return None if tracking has already started.
+
+    Args:
+        origin (str): Name of the interaction, e.g. slash command or button class.
+
+    Returns:
+        (Token | None): Token for `end_interaction`.
+    """
+    if not enabled or _interaction.get() is not None:
+        return None
+    return _interaction.set(InteractionStats(origin))
+
+def end_interaction(token: Token[InteractionStats | None] | None) -> None:
+    """Stop tracking started with `begin_interaction` and log the summary."""
+    if token is None:
+        return
+
+    if (stats := _interaction.get()) and stats.count:
+        logging.debug(f"[DATABASE] {stats.summary()}")
+    _interaction.reset(token)
+
+@contextmanager
+def track_interaction(origin: str) -> Iterator[None]:
+    """Context manager for `begin_interaction` and `end_interaction`."""
+    token = begin_interaction(origin)
+    try:
+        yield
+    finally:
+        end_interaction(token)
+
+def instrumented(origin: str | None = None) -> Callable[[Callable[P, Awaitable[R]]], Callable[P, Awaitable[R]]]:
+    """Decorator for button callbacks and event listeners. Commands issued by the coroutine are attributed to `origin`.
+
+    Args:
+        origin (str | None, optional): Origin name. Defaults to the qualified name of the coroutine.
+    """
+    def decorator(func: Callable[P, Awaitable[R]]) -> Callable[P, Awaitable[R]]:
+        name = origin or func.__qualname__
+
+        @wraps(func)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> R:
+            with track_interaction(name):
+                return await func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
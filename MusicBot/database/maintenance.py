@@ -0,0 +1,100 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Collection as AbstractCollection
+
+from pymongo import UpdateOne
+
+from .base import backend, guilds, BaseGuildsDatabase
+
+# Playback state that is useless once the guild stopped using the bot. Settings are kept.
+RUNTIME_FIELDS = (
+    'next_tracks', 'previous_tracks', 'shuffle_order', 'current_track', 'current_menu',
+    'is_stopped', 'vibing', 'current_viber_id', 'repeat', 'shuffle'
+)
+
+async def backfill_last_activity() -> int:
+    """Set `last_activity` of guilds without it to the current time, so guilds created before it was recorded
+    (or never played anything) get a full idle period before they can be compacted. Must run before `compact_idle_guilds`.
+
+    Returns:
+        int: Amount of updated guilds.
+    """
+    result = await guilds.update_many({'last_activity': None}, {'$currentDate': {'last_activity': True}})
+    if result.modified_count:
+        logging.info(f"[DATABASE] Backfilled last activity of {result.modified_count} guilds")
+    return result.modified_count
+
+async def compact_idle_guilds(
+    idle_for: timedelta,
+    *,
+    batch_size: int = 500,
+    archive: bool = False,
+    exclude: AbstractCollection[int] = (),
+    pause: float = 0.1
+) -> int:
+    """Reset playback state of guilds without activity for `idle_for`. Only guilds with something to reset are updated,
+    so consecutive passes are cheap. Guilds without `last_activity` are never treated as idle, see `backfill_last_activity`.
+
+    Args:
+        idle_for (timedelta): Minimal time since the last activity.
+        batch_size (int, optional): Amount of guilds processed with a single bulk write. Defaults to 500.
+        archive (bool, optional): Save queues and history to the `guilds_archive` collection before resetting them. Defaults to False.
+        exclude (Collection[int], optional): Guild ids to skip, e.g. guilds with active voice clients. Defaults to ().
+        pause (float, optional): Delay between batches in seconds to limit database load. Defaults to 0.1.
+
+    Returns:
+        int: Amount of compacted guilds.
+    """
+    cutoff = datetime.now(timezone.utc) - idle_for
+    idle = {'last_activity': {'$lt': cutoff}}
+    query = {
+        '$and': [
+            idle,
+            {'$or': [
+                {'next_tracks.0': {'$exists': True}},
+                {'previous_tracks.0': {'$exists': True}},
+                {'current_track': {'$ne': None}},
+                {'current_menu': {'$ne': None}},
+                {'vibing': True}
+            ]}
+        ]
+    }
+    if exclude:
+        query['_id'] = {'$nin': list(exclude)}
+
+    defaults = {field: BaseGuildsDatabase.DEFAULT_GUILD[field] for field in RUNTIME_FIELDS}  # type: ignore
+    projection: dict[str, Any] = {'next_tracks': 1, 'previous_tracks': 1, 'current_track': 1} if archive else {'_id': 1}
+    compacted = 0
+
+    while True:
+        batch = await guilds.find(query, projection).limit(batch_size).to_list()
+        if not batch:
+            break
+
+        if archive:
+            await backend.collection('guilds_archive').insert_many([
+                {
+                    'gid': guild['_id'],
+                    'archived_at': datetime.now(timezone.utc),
+                    'next_tracks': guild.get('next_tracks', []),
+                    'previous_tracks': guild.get('previous_tracks', []),
+                    'current_track': guild.get('current_track')
+                } for guild in batch
+            ])
+
+        # The idle condition is repeated, so guilds that became active in the meantime are left untouched
+        result = await guilds.bulk_write(
+            [UpdateOne({'_id': guild['_id'], **idle}, {'$set': defaults}) for guild in batch],
+            ordered=False
+        )
+        compacted += result.modified_count
+        logging.debug(f"[DATABASE] Compacted {result.modified_count} idle guilds")
+
+        if len(batch) < batch_size:
+            break
+        await asyncio.sleep(pause)
+
+    if compacted:
+        logging.info(f"[DATABASE] Compacted {compacted} guilds idle for more than {idle_for}")
+    return compacted
@@ -0,0 +1,83 @@
+from datetime import datetime, timezone
+from typing import Any, Iterable, Mapping
+
+from pymongo import InsertOne, ReplaceOne, UpdateMany, UpdateOne
+
+from .backends import Collection
+
+def _stamp(update: Mapping[str, Any]) -> dict[str, Any]:
+    """Add `updated_at` to the update document or the replacement."""
+    if not any(key.startswith('$') for key in update):
+        return {**update, 'updated_at': datetime.now(timezone.utc)}
+
+    if set(update) == {'$setOnInsert'}:
+        # Only affects new documents, existing ones must keep their timestamp
+        return {'$setOnInsert': {**update['$setOnInsert'], 'updated_at': datetime.now(timezone.utc)}}
+
+    stamped: dict[str, Any] = {}
+    for operator, fields in update.items():
+        if isinstance(fields, Mapping) and 'updated_at' in fields:
+            fields = {key: value for key, value in fields.items() if key != 'updated_at'}
+        if fields:
+            stamped[operator] = fields
+
+    stamped['$currentDate'] = {**stamped.get('$currentDate', {}), 'updated_at': True}
+    return stamped
+
+def _stamp_request(request: Any) -> Any:
+    """Return a copy of the bulk write operation that sets `updated_at`. Operations without documents are returned as is."""
+    # pymongo doesn't expose operation fields publicly
+    if isinstance(request, (UpdateOne, UpdateMany)) and isinstance(request._doc, Mapping):
+        options: dict[str, Any] = {'array_filters': request._array_filters}
+    elif isinstance(request, ReplaceOne):
+        options = {}
+    elif isinstance(request, InsertOne):
+        return InsertOne(_stamp(request._doc))
+    else:
+        return request  # Deletes and pipeline updates
+
+    if getattr(request, '_sort', None):
+        options['sort'] = request._sort
+    return type(request)(
+        request._filter,
+        _stamp(request._doc),
+        upsert=request._upsert,
+        collation=request._collation,
+        hint=request._hint,
+        **options
+    )
+
+class TimestampedCollection:
+    """Collection wrapper that sets `updated_at` on every written document, so incremental backups
+    can select changed documents. Reads and all other attributes are passed to the wrapped collection.
+
+    Args:
+        collection (Collection): Wrapped collection.
+    """
+
+    def __init__(self, collection: Collection[Any]) -> None:
+        self.collection = collection
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.collection, name)
+
+    async def find_one_and_update(self, filter: Mapping[str, Any], update: Mapping[str, Any], *args: Any, **kwargs: Any) -> Any:
+        return await self.collection.find_one_and_update(filter, _stamp(update), *args, **kwargs)
+
+    async def update_one(self, filter: Mapping[str, Any], update: Mapping[str, Any], *args: Any, **kwargs: Any) -> Any:
+        return await self.collection.update_one(filter, _stamp(update), *args, **kwargs)
+
+    async def update_many(self, filter: Mapping[str, Any], update: Mapping[str, Any], *args: Any, **kwargs: Any) -> Any:
+        return await self.collection.update_many(filter, _stamp(update), *args, **kwargs)
+
+    async def replace_one(self, filter: Mapping[str, Any], replacement: Mapping[str, Any], *args: Any, **kwargs: Any) -> Any:
+        return await self.collection.replace_one(filter, _stamp(replacement), *args, **kwargs)
+
+    async def insert_one(self, document: Mapping[str, Any], *args: Any, **kwargs: Any) -> Any:
+        return await self.collection.insert_one(_stamp(document), *args, **kwargs)
+
+    async def insert_many(self, documents: Iterable[Mapping[str, Any]], *args: Any, **kwargs: Any) -> Any:
+        return await self.collection.insert_many([_stamp(document) for document in documents], *args, **kwargs)
+
+    async def bulk_write(self, requests: list[Any], *args: Any, **kwargs: Any) -> Any:
+        return await self.collection.bulk_write([_stamp_request(request) for request in requests], *args, **kwargs)
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import TypedDict, TypeAlias, Literal
 
 VibeSettingsOptions: TypeAlias = Literal[
@@ -12,6 +13,7 @@ class User(TypedDict, total=False):  # Don't forget to change base.py if you add
     vibe_type: Literal['track', 'album', 'artist', 'playlist', 'user'] | None
     vibe_id: str | int | None
     vibe_settings: dict[Literal['mood', 'diversity', 'lang'], VibeSettingsOptions]
+    updated_at: datetime | None
 
 class ExplicitUser(TypedDict):
     _id: int
@@ -20,3 +22,4 @@ class ExplicitUser(TypedDict):
     vibe_type: Literal['track', 'album', 'artist', 'playlist', 'user'] | None
     vibe_id: str | int | None
     vibe_settings: dict[Literal['mood', 'diversity', 'lang'], VibeSettingsOptions]
+    updated_at: datetime | None
@@ -0,0 +1,9 @@
+from .fixtures import Fixtures, silent_mp3
+from .ym_server import Faults, StandInServer
+
+__all__ = [
+    'Fixtures',
+    'Faults',
+    'StandInServer',
+    'silent_mp3',
+]
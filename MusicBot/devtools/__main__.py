@@ -0,0 +1,35 @@
+import logging
+import argparse
+
+from aiohttp import web
+
+from MusicBot.devtools import Faults, Fixtures, StandInServer
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        prog='python -m MusicBot.devtools',
+        description='Local stand-in for the Yandex Music API. Point the bot to it with YM_BASE_URL=http://<host>:<port>'
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--audio-dir', help='directory with MP3 files served instead of silence')
+    parser.add_argument('--artists', type=int, default=8)
+    parser.add_argument('--tracks-per-album', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=30, help='duration of the tracks in seconds')
+    parser.add_argument('--latency', type=float, default=0, help='delay of each response in seconds')
+    parser.add_argument('--jitter', type=float, default=0, help='random additional delay in seconds')
+    parser.add_argument('--error-rate', type=float, default=0, help='share of requests answered with an error, from 0 to 1')
+    parser.add_argument('--error-status', type=int, default=500)
+    parser.add_argument('--paths', default='', help='inject faults only into requests with this substring in the path')
+    args = parser.parse_args()
+
+    server = StandInServer(
+        Fixtures(artists=args.artists, tracks_per_album=args.tracks_per_album, duration=args.duration),
+        Faults(args.latency, args.jitter, args.error_rate, args.error_status, args.paths),
+        args.audio_dir
+    )
+    web.run_app(server.create_app(), host=args.host, port=args.port)
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    main()
@@ -0,0 +1,196 @@
+import random
+from typing import Any
+
+ACCOUNT_UID = 1000
+MP3_FRAME = b'\xff\xfb\x90\x64' + bytes(413)  # MPEG-1 Layer III, 128 kbps, 44.1 kHz. Empty side info decodes to silence
+MP3_FRAMES_PER_SECOND = 44100 / 1152
+
+GENRES = ('rock', 'pop', 'jazz', 'electronics', 'hiphop', 'classical')
+STATIONS = (
+    ('genre', 'rock', 'Рок'),
+    ('genre', 'pop', 'Поп'),
+    ('genre', 'jazz', 'Джаз'),
+    ('genre', 'electronics', 'Электроника'),
+    ('mood', 'calm', 'Спокойное'),
+    ('activity', 'workout', 'Спорт'),
+    ('epoch', 'nineties', '90-е'),
+)
+
+def silent_mp3(seconds: float) -> bytes:
+    """Return a silent MP3 of about `seconds` long."""
+    return MP3_FRAME * max(1, round(seconds * MP3_FRAMES_PER_SECOND))
+
+class Fixtures:
+    """Deterministic catalog served by the stand-in server: artists, albums, tracks, account playlists, likes and stations.
+    Objects are kept in the JSON form of the API (camelCase keys).
+
+    Args:
+        artists (int, optional): Amount of artists. Defaults to 8.
+        albums_per_artist (int, optional): Albums of each artist. Defaults to 2.
+        tracks_per_album (int, optional): Tracks of each album. Defaults to 8.
+        duration (float, optional): Duration of the tracks in seconds. Defaults to 30.
+        seed (int, optional): Seed of the generated data. Defaults to 0.
+    """
+
+    def __init__(
+        self,
+        artists: int = 8,
+        albums_per_artist: int = 2,
+        tracks_per_album: int = 8,
+        duration: float = 30,
+        seed: int = 0
+    ) -> None:
+        self.duration = duration
+        self.random = random.Random(seed)
+
+        self.artists: dict[int, dict[str, Any]] = {}
+        self.albums: dict[int, dict[str, Any]] = {}
+        self.tracks: dict[str, dict[str, Any]] = {}
+        self.album_tracks: dict[int, list[str]] = {}
+        self.artist_tracks: dict[int, list[str]] = {}
+
+        for artist_index in range(1, artists + 1):
+            artist = {'id': artist_index, 'name': f'Artist {artist_index}', 'various': False, 'composer': False, 'genres': [GENRES[artist_index % len(GENRES)]]}
+            self.artists[artist_index] = artist
+            self.artist_tracks[artist_index] = []
+
+            for album_index in range(albums_per_artist):
+                album_id = artist_index * 100 + album_index
+                self.albums[album_id] = {
+                    'id': album_id,
+                    'title': f'Album {album_id}',
+                    'genre': artist['genres'][0],
+                    'year': 1990 + album_id % 35,
+                    'trackCount': tracks_per_album,
+                    'artists': [artist],
+                    'available': True
+                }
+                self.album_tracks[album_id] = []
+
+                for track_index in range(tracks_per_album):
+                    track_id = str(album_id * 100 + track_index)
+                    self.tracks[track_id] = {
+                        'id': track_id,
+                        'realId': track_id,
+                        'title': f'Track {track_id}',
+                        'available': True,
+                        'durationMs': int(duration * 1000),
+                        'explicit': track_index == 0,
+                        'contentWarning': 'explicit' if track_index == 0 else None,
+                        'lyricsAvailable': True,
+                        'artists': [artist],
+                        'albums': [{**self.albums[album_id], 'trackPosition': {'volume': 1, 'index': track_index + 1}}]
+                    }
+                    self.album_tracks[album_id].append(track_id)
+                    self.artist_tracks[artist_index].append(track_id)
+
+        track_ids = list(self.tracks)
+        self.likes: list[str] = track_ids[::3]
+        self.dislikes: list[str] = track_ids[1::17]
+        self.revision = 1
+
+        self.playlists: dict[int, dict[str, Any]] = {}
+        self.playlist_tracks: dict[int, list[str]] = {}
+        for kind in range(1001, 1004):
+            self.playlist_tracks[kind] = self.random.sample(track_ids, min(len(track_ids), 20))
+            self.playlists[kind] = {
+                'uid': ACCOUNT_UID,
+                'kind': kind,
+                'title': f'Playlist {kind}',
+                'owner': {'uid': ACCOUNT_UID, 'login': 'standin', 'name': 'Stand-in'},
+                'revision': 1,
+                'visibility': 'public',
+                'available': True,
+                'playlistUuid': f'standin-{kind}',
+                'cover': {'type': 'pic', 'custom': False}
+            }
+
+    def account_status(self) -> dict[str, Any]:
+        return {
+            'account': {
+                'uid': ACCOUNT_UID,
+                'login': 'standin',
+                'displayName': 'Stand-in',
+                'now': '2025-01-01T00:00:00+00:00',
+                'serviceAvailable': True,
+                'region': 225
+            },
+            'permissions': {'until': '2099-01-01T00:00:00+00:00', 'values': ['landing-play', 'radio-play'], 'default': []},
+            'plus': {'hasPlus': True, 'isTutorialCompleted': True},
+            'defaultEmail': 'standin@example.com'
+        }
+
+    def playlist(self, kind: int, with_tracks: bool = True) -> dict[str, Any]:
+        playlist = {**self.playlists[kind], 'trackCount': len(self.playlist_tracks[kind])}
+        if with_tracks:
+            playlist['tracks'] = [self.track_short(track_id) for track_id in self.playlist_tracks[kind]]
+        return playlist
+
+    def track_short(self, track_id: str, with_track: bool = True) -> dict[str, Any]:
+        track = self.tracks[track_id]
+        short = {'id': track_id, 'albumId': str(track['albums'][0]['id']), 'timestamp': '2025-01-01T00:00:00+00:00'}
+        if with_track:
+            short['track'] = track
+        return short
+
+    def station_result(self, station_type: str, tag: str, name: str) -> dict[str, Any]:
+        icon = {'backgroundColor': '#000000', 'imageUrl': ''}
+        restrictions = {
+            'language': {'type': 'enum', 'name': 'Язык', 'possibleValues': [{'value': 'any', 'name': 'Любой'}]},
+            'diversity': {'type': 'enum', 'name': 'Треки', 'possibleValues': [{'value': 'default', 'name': 'Любые'}]}
+        }
+        return {
+            'station': {
+                'id': {'type': station_type, 'tag': tag},
+                'name': name,
+                'icon': icon,
+                'mtsIcon': icon,
+                'idForFrom': f'{station_type}-{tag}',
+                'restrictions': restrictions,
+                'restrictions2': restrictions
+            },
+            'settings': {'language': 'any', 'diversity': 'default'},
+            'settings2': {'language': 'any', 'diversity': 'default', 'moodEnergy': 'all'},
+            'adParams': {
+                'partnerId': 0,
+                'categoryId': 0,
+                'pageRef': '',
+                'targetRef': '',
+                'otherParams': f'{station_type}:{tag}',
+                'adVolume': 0
+            }
+        }
+
+    def stations(self) -> list[dict[str, Any]]:
+        return [self.station_result(*station) for station in STATIONS]
+
+    def station_tracks(self, station: str, batch: int) -> dict[str, Any]:
+        """Return the next batch of a station. Batches of the same station differ, but are reproducible."""
+        rng = random.Random(f'{station}:{batch}')
+        track_ids = rng.sample(list(self.tracks), min(len(self.tracks), 5))
+        return {
+            'id': dict(zip(('type', 'tag'), station.split(':', 1))),
+            'sequence': [{'type': 'track', 'track': self.tracks[track_id], 'liked': track_id in self.likes} for track_id in track_ids],
+            'batchId': f'standin-{batch}',
+            'pumpkin': False
+        }
+
+    def search(self, text: str, search_type: str) -> dict[str, Any]:
+        text = text.casefold()
+
+        def section(kind: str, items: list[dict[str, Any]], title_key: str = 'title') -> dict[str, Any] | None:
+            if search_type not in ('all', kind):
+                return None
+            found = [item for item in items if text in item[title_key].casefold()] or items
+            return {'type': kind, 'total': len(found), 'perPage': 20, 'order': 0, 'results': found[:20]}
+
+        return {
+            'searchRequestId': 'standin',
+            'text': text,
+            'misspellCorrected': False,
+            'nocorrect': False,
+            'tracks': section('track', list(self.tracks.values())),
+            'albums': section('album', list(self.albums.values())),
+            'artists': section('artist', list(self.artists.values()), 'name'),
+            'playlists': section('playlist', [self.playlist(kind, with_tracks=False) for kind in self.playlists])
+        }
@@ -0,0 +1,290 @@
+import json
+import asyncio
+import logging
+import random
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from aiohttp import web
+from multidict import MultiDict
+
+from MusicBot.devtools.fixtures import ACCOUNT_UID, Fixtures, silent_mp3
+
+Handler = Callable[[web.Request], Awaitable[web.StreamResponse]]
+
+class Faults:
+    """Latency and errors injected into the responses. Can be changed at runtime with `POST /_control`.
+
+    Args:
+        latency (float, optional): Delay of each response in seconds. Defaults to 0.
+        jitter (float, optional): Random additional delay up to `jitter` seconds. Defaults to 0.
+        error_rate (float, optional): Share of requests answered with `error_status`, from 0 to 1. Defaults to 0.
+        error_status (int, optional): Status of the injected errors. Defaults to 500.
+        paths (str, optional): Only requests with this substring in the path are affected. Defaults to '' (all requests).
+    """
+    FIELDS = ('latency', 'jitter', 'error_rate', 'error_status', 'paths')
+
+    def __init__(self, latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0, error_status: int = 500, paths: str = '') -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.paths = paths
+
+    def update(self, values: dict[str, Any]) -> None:
+        for name in self.FIELDS:
+            if name in values:
+                setattr(self, name, type(getattr(self, name))(values[name]))
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+def ok(result: Any) -> web.Response:
+    return web.json_response({'invocationInfo': {'hostname': 'standin', 'req-id': 'standin'}, 'result': result})
+
+def error(status: int, name: str, description: str = '') -> web.Response:
+    return web.json_response({'error': name, 'error_description': description}, status=status)
+
+async def _form(request: web.Request) -> dict[str, Any]:
+    """Return query and body arguments. Repeated fields, which the client sends for list arguments, are returned as lists."""
+    fields: MultiDict[Any] = MultiDict(request.query)
+    if request.can_read_body:
+        if request.content_type == 'application/json':
+            fields.extend((await request.json()).items())
+        else:
+            fields.extend(await request.post())
+
+    return {key: values if len(values := fields.getall(key)) > 1 else values[0] for key in fields.keys()}
+
+def _ids(value: str | list[str]) -> list[str]:
+    values = value if isinstance(value, list) else value.split(',')
+    return [str(item).split(':')[0].strip() for item in values if str(item).strip()]
+
+class StandInServer:
+    """Local stand-in for the Yandex Music API endpoints used by the bot, for tests, benchmarks and offline development.
+
+    Any token is accepted except 'invalid', which is answered with 401. Audio is served from `audio_dir`
+    (`<track id>.mp3`, or any file of the directory in turn) or generated as silence.
+
+    Args:
+        fixtures (Fixtures | None, optional): Served catalog. Defaults to `Fixtures()`.
+        faults (Faults | None, optional): Injected latency and errors. Defaults to no faults.
+        audio_dir (str | Path | None, optional): Directory with fixture MP3 files. Defaults to None.
+    """
+
+    def __init__(self, fixtures: Fixtures | None = None, faults: Faults | None = None, audio_dir: str | Path | None = None) -> None:
+        self.fixtures = fixtures or Fixtures()
+        self.faults = faults or Faults()
+        self.audio_files = sorted(Path(audio_dir).glob('*.mp3')) if audio_dir else []
+        self.silence = silent_mp3(self.fixtures.duration)
+        self.requests = 0
+        self.feedback: list[dict[str, Any]] = []
+        self._batches: dict[str, int] = {}
+
+    def create_app(self) -> web.Application:
+        app = web.Application(middlewares=[self._inject_faults, self._authorize])
+        app.router.add_routes([
+            web.get('/_control', self.get_control),
+            web.post('/_control', self.post_control),
+            web.get('/account/status', self.account_status),
+            web.get('/search', self.search),
+            web.get('/search/suggest', self.search_suggest),
+            web.post('/tracks', self.tracks),
+            web.get('/tracks/{track_id}/download-info', self.download_info),
+            web.get('/tracks/{track_id}/lyrics', self.lyrics),
+            web.get('/standin/download-info/{track_id}.xml', self.download_info_xml),
+            web.get('/standin/lyrics/{track_id}.txt', self.lyrics_text),
+            web.get('/get-mp3/{sign}/{ts}/{track_id}.mp3', self.audio),
+            web.get('/albums/{album_id}/with-tracks', self.album_with_tracks),
+            web.get('/artists/{artist_id}/tracks', self.artist_tracks),
+            web.get('/users/{uid}/{reaction:likes|dislikes}/tracks', self.reactions),
+            web.post('/users/{uid}/{reaction:likes|dislikes}/tracks/{action}', self.react),
+            web.get('/users/{uid}/playlists/list', self.playlists_list),
+            web.post('/users/{uid}/playlists', self.playlists_by_kinds),
+            web.get('/users/{uid}/playlists/{kind}', self.playlist),
+            web.post('/users/{uid}/playlists/{kind}/change', self.playlist_change),
+            web.get('/rotor/stations/list', self.stations_list),
+            web.get('/rotor/station/{station}/tracks', self.station_tracks),
+            web.post('/rotor/station/{station}/feedback', self.station_feedback),
+            web.post('/rotor/station/{station}/settings3', self.station_settings),
+        ])
+        return app
+
+    @web.middleware
+    async def _inject_faults(self, request: web.Request, handler: Handler) -> web.StreamResponse:
+        if request.path == '/_control':
+            return await handler(request)
+
+        self.requests += 1
+        if self.faults.paths not in request.path:
+            return await handler(request)
+
+        if (delay := self.faults.latency + random.uniform(0, self.faults.jitter)) > 0:
+            await asyncio.sleep(delay)
+
+        if random.random() < self.faults.error_rate:
+            return error(self.faults.error_status, 'injected-error', 'Error injected by the stand-in server')
+
+        return await handler(request)
+
+    @web.middleware
+    async def _authorize(self, request: web.Request, handler: Handler) -> web.StreamResponse:
+        if request.headers.get('Authorization') == 'OAuth invalid':
+            return error(401, 'session-expired', 'Token is invalid')
+        return await handler(request)
+
+    async def get_control(self, request: web.Request) -> web.Response:
+        return web.json_response({**self.faults.to_dict(), 'requests': self.requests, 'feedback': len(self.feedback)})
+
+    async def post_control(self, request: web.Request) -> web.Response:
+        self.faults.update(await request.json())
+        logging.info(f"[STANDIN] Faults updated: {self.faults.to_dict()}")
+        return web.json_response(self.faults.to_dict())
+
+    async def account_status(self, request: web.Request) -> web.Response:
+        return ok(self.fixtures.account_status())
+
+    async def search(self, request: web.Request) -> web.Response:
+        return ok(self.fixtures.search(request.query.get('text', ''), request.query.get('type', 'all')))
+
+    async def search_suggest(self, request: web.Request) -> web.Response:
+        text = request.query.get('part', '').casefold()
+        titles = [track['title'] for track in self.fixtures.tracks.values() if text in track['title'].casefold()]
+        return ok({'suggestions': titles[:10]})
+
+    async def tracks(self, request: web.Request) -> web.Response:
+        data = await _form(request)
+        return ok([self.fixtures.tracks[track_id] for track_id in _ids(data.get('track-ids', '')) if track_id in self.fixtures.tracks])
+
+    async def download_info(self, request: web.Request) -> web.Response:
+        if (track_id := request.match_info['track_id'].split(':')[0]) not in self.fixtures.tracks:
+            return error(404, 'not-found')
+
+        url = request.url.with_path(f'/standin/download-info/{track_id}.xml').with_query(None)
+        return ok([
+            {'codec': 'mp3', 'bitrateInKbps': bitrate, 'gain': False, 'preview': False, 'downloadInfoUrl': str(url), 'direct': False}
+            for bitrate in (128, 192, 320)
+        ])
+
+    async def download_info_xml(self, request: web.Request) -> web.Response:
+        # The client builds `https://<host>/get-mp3/<sign>/<ts><path>` from this document
+        xml = (
+            '<?xml version="1.0" encoding="utf-8"?><download-info>'
+            f'<host>{request.host}</host><path>/{request.match_info["track_id"]}.mp3</path><ts>0</ts><region>-1</region><s>standin</s>'
+            '</download-info>'
+        )
+        return web.Response(text=xml, content_type='text/xml')
+
+    async def audio(self, request: web.Request) -> web.StreamResponse:
+        track_id = request.match_info['track_id']
+        if not self.audio_files:
+            return web.Response(body=self.silence, content_type='audio/mpeg')
+
+        path = next((file for file in self.audio_files if file.stem == track_id), None)
+        if path is None:
+            path = self.audio_files[int(track_id) % len(self.audio_files)] if track_id.isdigit() else self.audio_files[0]
+        return web.FileResponse(path, headers={'Content-Type': 'audio/mpeg'})
+
+    async def lyrics(self, request: web.Request) -> web.Response:
+        track_id = request.match_info['track_id'].split(':')[0]
+        url = request.url.with_path(f'/standin/lyrics/{track_id}.txt').with_query(None)
+        return ok({
+            'downloadUrl': str(url),
+            'lyricId': int(track_id) if track_id.isdigit() else 0,
+            'externalLyricId': track_id,
+            'writers': ['Stand-in'],
+            'major': {'id': 1, 'name': 'STANDIN', 'prettyName': 'Stand-in'}
+        })
+
+    async def lyrics_text(self, request: web.Request) -> web.Response:
+        track_id = request.match_info['track_id']
+        return web.Response(text='\n'.join(f'Line {line} of track {track_id}' for line in range(1, 9)))
+
+    async def album_with_tracks(self, request: web.Request) -> web.Response:
+        if (album_id := int(request.match_info['album_id'])) not in self.fixtures.albums:
+            return error(404, 'not-found')
+        tracks = [self.fixtures.tracks[track_id] for track_id in self.fixtures.album_tracks[album_id]]
+        return ok({**self.fixtures.albums[album_id], 'volumes': [tracks]})
+
+    async def artist_tracks(self, request: web.Request) -> web.Response:
+        if (artist_id := int(request.match_info['artist_id'])) not in self.fixtures.artists:
+            return error(404, 'not-found')
+
+        page, page_size = int(request.query.get('page', 0)), int(request.query.get('page-size', 20))
+        track_ids = self.fixtures.artist_tracks[artist_id]
+        return ok({
+            'tracks': [self.fixtures.tracks[track_id] for track_id in track_ids[page * page_size:(page + 1) * page_size]],
+            'pager': {'total': len(track_ids), 'page': page, 'perPage': page_size}
+        })
+
+    async def reactions(self, request: web.Request) -> web.Response:
+        track_ids = self.fixtures.likes if request.match_info['reaction'] == 'likes' else self.fixtures.dislikes
+        if int(request.query.get('if-modified-since-revision', 0)) >= self.fixtures.revision:
+            track_ids = []
+
+        return ok({'library': {
+            'uid': ACCOUNT_UID,
+            'revision': self.fixtures.revision,
+            'tracks': [self.fixtures.track_short(track_id, with_track=False) for track_id in track_ids]
+        }})
+
+    async def react(self, request: web.Request) -> web.Response:
+        data = await _form(request)
+        track_ids = self.fixtures.likes if request.match_info['reaction'] == 'likes' else self.fixtures.dislikes
+
+        for track_id in _ids(data.get('track-ids', '')):
+            if request.match_info['action'] == 'remove':
+                if track_id in track_ids:
+                    track_ids.remove(track_id)
+            elif track_id not in track_ids:
+                track_ids.insert(0, track_id)
+
+        self.fixtures.revision += 1
+        return ok({'revision': self.fixtures.revision})
+
+    async def playlists_list(self, request: web.Request) -> web.Response:
+        return ok([self.fixtures.playlist(kind, with_tracks=False) for kind in self.fixtures.playlists])
+
+    async def playlists_by_kinds(self, request: web.Request) -> web.Response:
+        data = await _form(request)
+        kinds = [int(kind) for kind in _ids(data.get('kinds', '')) if int(kind) in self.fixtures.playlists]
+        return ok([self.fixtures.playlist(kind) for kind in kinds])
+
+    async def playlist(self, request: web.Request) -> web.Response:
+        if (kind := int(request.match_info['kind'])) not in self.fixtures.playlists:
+            return error(404, 'playlist-not-found')
+        return ok(self.fixtures.playlist(kind))
+
+    async def playlist_change(self, request: web.Request) -> web.Response:
+        if (kind := int(request.match_info['kind'])) not in self.fixtures.playlists:
+            return error(404, 'playlist-not-found')
+
+        data = await _form(request)
+        playlist = self.fixtures.playlists[kind]
+        if int(data.get('revision', playlist['revision'])) != playlist['revision']:
+            return error(412, 'wrong-revision')
+
+        track_ids = self.fixtures.playlist_tracks[kind]
+        for operation in json.loads(data.get('diff', '[]')):
+            if operation['op'] == 'insert':
+                track_ids[operation['at']:operation['at']] = [str(track['id']) for track in operation['tracks']]
+            elif operation['op'] == 'delete':
+                del track_ids[operation['from']:operation['to']]
+
+        playlist['revision'] += 1
+        return ok(self.fixtures.playlist(kind))
+
+    async def stations_list(self, request: web.Request) -> web.Response:
+        return ok(self.fixtures.stations())
+
+    async def station_tracks(self, request: web.Request) -> web.Response:
+        station = request.match_info['station']
+        batch = self._batches[station] = self._batches.get(station, 0) + 1
+        return ok(self.fixtures.station_tracks(station, batch))
+
+    async def station_feedback(self, request: web.Request) -> web.Response:
+        self.feedback.append({'station': request.match_info['station'], **(await _form(request))})
+        return ok('ok')
+
+    async def station_settings(self, request: web.Request) -> web.Response:
+        return ok('ok')
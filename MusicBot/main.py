@@ -1,13 +1,33 @@
 import os
+import asyncio
 import logging
-from aiohttp import ClientSession
 
 import discord
 from discord.ext.commands import Bot
 from discord.ext import tasks
 
+class YandexMusicBot(Bot):
+
+    async def invoke_application_command(self, ctx: discord.ApplicationContext) -> None:
+        # Database is imported lazily so that the .env file is loaded first
+        from MusicBot.database import instrumentation
+
+        # Attribute database commands to the slash command that issued them
+        with instrumentation.track_interaction(f'/{ctx.command.qualified_name}'):
+            await super().invoke_application_command(ctx)
+
+    async def close(self) -> None:
+        from MusicBot.cogs.utils.base_bot import BaseBot
+        from MusicBot.cogs.utils.voice_extension import VoiceExtension
+        from MusicBot.cogs.utils.http import web_session
+
+        await super().close()
+        await VoiceExtension._vibe_feedback.close()
+        await BaseBot._ym_clients.close()
+        await web_session.close()
+
 intents = discord.Intents.default()
-bot = Bot(intents=intents)
+bot = YandexMusicBot(intents=intents)
 
 cogs_list = [
     'general',
@@ -20,21 +40,69 @@ async def on_ready():
     logging.info("Bot's ready!")
     await bot.change_presence(activity=discord.Activity(type=discord.ActivityType.listening, name="/voice vibe"))
 
+    from MusicBot.database import instrumentation
+    if instrumentation.enabled and not log_database_metrics.is_running():
+        log_database_metrics.start()
+
+@bot.listen('on_ready', once=True)
+async def setup_database():
+    from MusicBot.database import backend, cache, change_streams
+    from MusicBot.database.indexes import ensure_indexes, verify_indexes
+    from MusicBot.database.maintenance import backfill_last_activity
+    from MusicBot.cogs.utils.colors import color_cache
+
+    await ensure_indexes()
+    for problem in await verify_indexes():
+        logging.warning(f"[DATABASE] Index problem: {problem}")
+
+    if cache.enabled:
+        await change_streams.start()
+
+    color_cache.persist_to(backend.collection('cover_colors'))
+
+    await backfill_last_activity()
+    if not idle_guilds_compaction.is_running():
+        idle_guilds_compaction.start()
+
+@tasks.loop(seconds=600)
+async def log_database_metrics():
+    from MusicBot.database import instrumentation
+    logging.info(f"[DATABASE] Most active database users:\n{instrumentation.metrics.report()}")
+
+@tasks.loop(hours=6)
+async def idle_guilds_compaction():
+    from datetime import timedelta
+    from MusicBot.database.maintenance import compact_idle_guilds
+
+    await compact_idle_guilds(
+        timedelta(days=int(os.getenv('GUILD_IDLE_DAYS', '30'))),
+        archive=os.getenv('GUILD_ARCHIVE') == 'True',
+        exclude={vc.guild.id for vc in bot.voice_clients if isinstance(vc, discord.VoiceClient)}
+    )
+
+@idle_guilds_compaction.before_loop
+async def delay_idle_guilds_compaction():
+    # Give guilds time to reconnect to voice channels after a restart, so active ones are excluded
+    await asyncio.sleep(int(os.getenv('GUILD_COMPACT_DELAY', '3600')))
+
 @tasks.loop(seconds=3600)
 async def update_server_count():
     # Don't update server count in debug mode
     if os.getenv('DEBUG') == 'True':
         return
 
-    async with ClientSession() as session:
-        if token := os.getenv('PROMO_TOKEN_1'):
-            res = await session.post(
-                'https://api.server-discord.com/v2/bots/1325795708019806250/stats',
-                headers={'Authorization': token},
-                data={'servers': len(bot.guilds), 'shards': bot.shard_count or 1}
-            )
+    from MusicBot.cogs.utils.http import web_session, read_limited
+
+    session = await web_session.get()
+    if token := os.getenv('PROMO_TOKEN_1'):
+        async with session.post(
+            'https://api.server-discord.com/v2/bots/1325795708019806250/stats',
+            headers={'Authorization': token},
+            data={'servers': len(bot.guilds), 'shards': bot.shard_count or 1}
+        ) as res:
             if not res.ok:
-                logging.error(f'Failed to update server count 1: {res.status} {await res.text()}')
+                body = await read_limited(res, web_session.max_response_size)
+                logging.error(f'Failed to update server count 1: {res.status} {body.decode(errors="replace")}')
 
 if __name__ == '__main__':
     from dotenv import load_dotenv
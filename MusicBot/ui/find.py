@@ -1,13 +1,14 @@
 import logging
-from typing import cast
+from typing import AsyncIterator, cast
 
 import discord
-from yandex_music import Track, Album, Artist, Playlist
+from yandex_music import Track, Album, Artist, ArtistTracks, Playlist
 
 from discord.ui import View, Button, Item
 from discord import ButtonStyle, Interaction
 
-from MusicBot.cogs.utils.voice_extension import VoiceExtension
+from MusicBot.cogs.utils.voice_extension import VoiceExtension, iter_chunks, ENQUEUE_CHUNK_SIZE
+from MusicBot.database import instrumented
 
 class PlayButton(Button, VoiceExtension):
     def __init__(self, item: Track | Album | Artist | Playlist | list[Track], **kwargs):
@@ -15,6 +16,7 @@ class PlayButton(Button, VoiceExtension):
         VoiceExtension.__init__(self, None)
         self.item = item
 
+    @instrumented()
     async def callback(self, interaction: Interaction) -> None:
         logging.debug(f"[FIND] Callback triggered for type: '{type(self.item).__name__}'")
 
@@ -35,7 +37,7 @@ class PlayButton(Button, VoiceExtension):
         member = cast(discord.Member, interaction.user)
 
         if isinstance(self.item, Track):
-            tracks = [self.item]
+            chunks, total = iter_chunks([self.item]), 1
             action = 'add_track'
             vote_message = f"{member.mention} хочет добавить трек **{self.item.title}** в очередь.\n\n Голосуйте за добавление."
             response_message = f"Трек **{self.item.title}** был добавлен в очередь."
@@ -48,18 +50,19 @@ class PlayButton(Button, VoiceExtension):
                 return
 
             tracks = [track for volume in album.volumes for track in volume]
+            chunks, total = iter_chunks(tracks), len(tracks)
             action = 'add_album'
             vote_message = f"{member.mention} хочет добавить альбом **{self.item.title}** в очередь.\n\n Голосуйте за добавление."
             response_message = f"Альбом **{self.item.title}** был добавлен в очередь."
 
         elif isinstance(self.item, Artist):
-            artist_tracks = await self.item.get_tracks_async()
-            if not artist_tracks:
+            artist_tracks = await self.item.get_tracks_async(page_size=ENQUEUE_CHUNK_SIZE)
+            if not artist_tracks or not artist_tracks.tracks:
                 logging.debug("[FIND] Failed to fetch artist tracks in PlayButton callback")
                 await self.respond(interaction, "error", "Не удалось получить треки артиста.", ephemeral=True, delete_after=15)
                 return
 
-            tracks = artist_tracks.tracks.copy()
+            chunks, total = self._iter_artist_tracks(self.item, artist_tracks), artist_tracks.pager.total if artist_tracks.pager else None
             action = 'add_artist'
             vote_message = f"{member.mention} хочет добавить треки от **{self.item.name}** в очередь.\n\n Голосуйте за добавление."
             response_message = f"Песни артиста **{self.item.name}** были добавлены в очередь."
@@ -71,18 +74,22 @@ class PlayButton(Button, VoiceExtension):
                 await self.respond(interaction, "error", "Не удалось получить треки из плейлиста.", ephemeral=True, delete_after=15)
                 return
 
-            tracks = [cast(Track, short_track.track) for short_track in short_tracks]
+            client = short_tracks[0].client or await self.init_ym_client(interaction)
+            if not client:
+                return
+
+            chunks, total = self._tracks.iter_tracks(client, short_tracks, ENQUEUE_CHUNK_SIZE), len(short_tracks)
             action = 'add_playlist'
             vote_message = f"{member.mention} хочет добавить плейлист **{self.item.title}** в очередь.\n\n Голосуйте за добавление."
             response_message = f"Плейлист **{self.item.title}** был добавлен в очередь."
 
         elif isinstance(self.item, list):
-            tracks = self.item.copy()
-            if not tracks:
+            if not self.item:
                 logging.debug("[FIND] Empty tracks list in PlayButton callback")
                 await self.respond(interaction, "error", "Не удалось получить треки.", ephemeral=True, delete_after=15)
                 return
 
+            chunks, total = iter_chunks(self.item), len(self.item)
             action = 'add_playlist'
             vote_message = f"{member.mention} хочет добавить плейлист **Мне Нравится** в очередь.\n\n Голосуйте за добавление."
             response_message = f"Плейлист **«Мне нравится»** был добавлен в очередь."
@@ -107,7 +114,7 @@ class PlayButton(Button, VoiceExtension):
                     'negative_votes': list(),
                     'total_members': len(channel.members),
                     'action': action,
-                    'vote_content': [track.to_dict() for track in tracks]
+                    'vote_content': [track.to_dict() async for chunk in chunks for track in chunk]
                 }
             )
             return
@@ -117,27 +124,37 @@ class PlayButton(Button, VoiceExtension):
         elif not await self.send_menu_message(interaction, disable=True):
             await self.respond(interaction, "error", "Не удалось отправить сообщение.", ephemeral=True, delete_after=15)
 
-        if guild['current_track']:
-            logging.debug(f"[FIND] Adding tracks to queue")
-            await self.db.modify_track(interaction.guild_id, tracks, 'next', 'extend')
-        else:
-            logging.debug(f"[FIND] Playing track")
-            track = tracks.pop(0)
-            await self.db.modify_track(interaction.guild_id, tracks, 'next', 'extend')
-            if not await self.play_track(interaction, track):
-                await self.respond(interaction, "error", "Не удалось воспроизвести трек.", ephemeral=True, delete_after=15)
+        # Playback starts with the first chunk, the rest of the tracks are added in the background
+        logging.debug(f"[FIND] {'Adding tracks to queue' if guild['current_track'] else 'Playing track'}")
+        if not await self.enqueue_tracks(interaction, chunks, play=not guild['current_track'], total=total):
+            await self.respond(interaction, "error", "Не удалось воспроизвести трек.", ephemeral=True, delete_after=15)
 
         if interaction.message:
             await interaction.message.delete()
         else:
             logging.warning(f"[FIND] Interaction message is None")
 
+    async def _iter_artist_tracks(self, artist: Artist, first_page: ArtistTracks) -> AsyncIterator[list[Track]]:
+        """Yield artist tracks page by page starting with the already fetched `first_page`."""
+        page: ArtistTracks | None = first_page
+        page_number = 0
+
+        while page and page.tracks:
+            yield page.tracks
+
+            if not page.pager or (page_number + 1) * page.pager.per_page >= page.pager.total:
+                return
+
+            page_number += 1
+            page = await artist.get_tracks_async(page=page_number, page_size=ENQUEUE_CHUNK_SIZE)
+
 class MyVibeButton(Button, VoiceExtension):
     def __init__(self, item: Track | Album | Artist | Playlist | list[Track], *args, **kwargs):
         Button.__init__(self, *args, **kwargs)
         VoiceExtension.__init__(self, None)
         self.item = item
     
+    @instrumented()
     async def callback(self, interaction: discord.Interaction):
         logging.debug(f"[VIBE] Button callback for '{type(self.item).__name__}'")
 
@@ -247,6 +264,7 @@ class ListenView(View):
             self.add_item(self.button3)
             self.add_item(self.button4)
 
+    @instrumented()
     async def on_timeout(self) -> None:
         try:
             return await super().on_timeout()
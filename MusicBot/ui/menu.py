@@ -12,6 +12,7 @@ import yandex_music.exceptions
 from yandex_music import TrackLyrics, Playlist, ClientAsync as YMClient
 
 from MusicBot.cogs.utils import VoiceExtension
+from MusicBot.database import instrumented
 
 class ToggleButton(Button, VoiceExtension):
     def __init__(self, root: 'MenuView', *args, **kwargs):
@@ -19,6 +20,7 @@ class ToggleButton(Button, VoiceExtension):
         VoiceExtension.__init__(self, None)
         self.root = root
     
+    @instrumented()
     async def callback(self, interaction: Interaction) -> None:
 
         if (callback_type := interaction.custom_id) not in ('repeat', 'shuffle'):
@@ -62,7 +64,10 @@ class ToggleButton(Button, VoiceExtension):
             )
             return
         
-        await self.db.update(gid, {callback_type: not guild[callback_type]})
+        if callback_type == 'shuffle':
+            await self.db.set_shuffle(gid, not guild['shuffle'])
+        else:
+            await self.db.update(gid, {'repeat': not guild['repeat']})
 
         button = self.root.repeat_button if callback_type == 'repeat' else self.root.shuffle_button
         button.style = ButtonStyle.secondary if guild[callback_type] else ButtonStyle.success
@@ -74,6 +79,7 @@ class PlayPauseButton(Button, VoiceExtension):
         Button.__init__(self, **kwargs)
         VoiceExtension.__init__(self, None)
     
+    @instrumented()
     async def callback(self, interaction: Interaction) -> None:
         logging.info('[MENU] Play/Pause button callback...')
 
@@ -146,6 +152,7 @@ class SwitchTrackButton(Button, VoiceExtension):
         super().__init__(*args, **kwargs)
         VoiceExtension.__init__(self, None)
     
+    @instrumented()
     async def callback(self, interaction: Interaction) -> None:
 
         if (callback_type := interaction.custom_id) not in ('next', 'previous'):
@@ -208,6 +215,7 @@ class ReactionButton(Button, VoiceExtension):
         VoiceExtension.__init__(self, None)
         self.root = root
     
+    @instrumented()
     async def callback(self, interaction: Interaction):
         callback_type = interaction.custom_id
         if callback_type not in ('like', 'dislike'):
@@ -274,25 +282,28 @@ class ReactionButton(Button, VoiceExtension):
             return (False, None)
 
         if action == 'like':
-            tracks = await client.users_likes_tracks()
             add_func = client.users_likes_tracks_add
             remove_func = client.users_likes_tracks_remove
         else:
-            tracks = await client.users_dislikes_tracks()
             add_func = client.users_dislikes_tracks_add
             remove_func = client.users_dislikes_tracks_remove
 
-        if tracks is None:
+        if (reacted := await self._reactions.contains(client, action, current_track['id'])) is None:
             logging.debug(f"[VC_EXT] No {action}s found")
             return (False, None)
 
-        if str(current_track['id']) not in [str(track.id) for track in tracks]:
+        # The server may drop the opposite reaction, so its revision has to be checked
+        self._reactions.expire(client, 'dislike' if action == 'like' else 'like')
+
+        if not reacted:
             logging.debug(f"[VC_EXT] Track not found in {action}s. Adding...")
             await add_func(current_track['id'])
+            self._reactions.add(client, action, current_track['id'])
             return (True, 'added')
         else:
             logging.debug(f"[VC_EXT] Track found in {action}s. Removing...")
             await remove_func(current_track['id'])
+            self._reactions.discard(client, action, current_track['id'])
             return (True, 'removed')
 
 class LyricsButton(Button, VoiceExtension):
@@ -300,6 +311,7 @@ class LyricsButton(Button, VoiceExtension):
         super().__init__(**kwargs)
         VoiceExtension.__init__(self, None)
         
+    @instrumented()
     async def callback(self, interaction: Interaction) -> None:
         logging.info('[MENU] Lyrics button callback...')
 
@@ -337,6 +349,7 @@ class MyVibeButton(Button, VoiceExtension):
         Button.__init__(self, **kwargs)
         VoiceExtension.__init__(self, None)
     
+    @instrumented()
     async def callback(self, interaction: Interaction) -> None:
         logging.info('[MENU] My vibe button callback')
 
@@ -409,6 +422,7 @@ class MyVibeSelect(Select, VoiceExtension):
         super().__init__(*args, **kwargs)
         VoiceExtension.__init__(self, None)
     
+    @instrumented()
     async def callback(self, interaction: Interaction) -> None:
         logging.info('[MENU] My vibe select callback')
 
@@ -512,6 +526,7 @@ class MyVibeSettingsView(View, VoiceExtension):
 
         return self
     
+    @instrumented()
     async def on_timeout(self) -> None:
         try:
             return await super().on_timeout()
@@ -524,6 +539,7 @@ class MyVibeSettingsButton(Button, VoiceExtension):
         super().__init__(**kwargs)
         VoiceExtension.__init__(self, None)
 
+    @instrumented()
     async def callback(self, interaction: Interaction) -> None:
         logging.info('[MENU] My vibe settings button callback')
         if not await self.voice_check(interaction, check_vibe_privilage=True):
@@ -537,6 +553,7 @@ class AddToPlaylistSelect(Select, VoiceExtension):
         VoiceExtension.__init__(self, None)
         self.ym_client = ym_client
         
+    @instrumented()
     async def callback(self, interaction: Interaction):
         logging.info('[MENU] Add to playlist select callback')
 
@@ -580,6 +597,9 @@ class AddToPlaylistSelect(Select, VoiceExtension):
                 revision=playlist.revision or 1
             )
 
+        if res:
+            self._catalog.invalidate_playlists(self.ym_client)  # Track count and revision have changed
+
         if not res:
             await self.respond(interaction, "error", "Что-то пошло не так. Попробуйте позже.", delete_after=15, ephemeral=True)
         elif track_in_playlist:
@@ -593,6 +613,7 @@ class AddToPlaylistButton(Button, VoiceExtension):
         Button.__init__(self, **kwargs)
         VoiceExtension.__init__(self, None)
     
+    @instrumented()
     async def callback(self, interaction: Interaction):
         if not await self.voice_check(interaction) or not interaction.guild_id:
             return
@@ -609,7 +630,7 @@ class AddToPlaylistButton(Button, VoiceExtension):
             await self.respond(interaction, "error", "Нет воспроизводимого трека.", delete_after=15, ephemeral=True)
             return
 
-        if not (playlists := await client.users_playlists_list()):
+        if not (playlists := await self._catalog.playlists(client)):
             await self.respond(interaction, "error", "У вас нет плейлистов.", delete_after=15, ephemeral=True)
             return
 
@@ -694,12 +715,15 @@ class MenuView(View, VoiceExtension):
            and len(cast(VoiceChannel, self.ctx.channel).members) == 2 \
            and not self.guild['single_token_uid']:
 
-            if current_track and str(current_track['id']) in [str(like.id) for like in await self.get_reacted_tracks(self.ctx, 'like')]:
+            reactions = await self.get_reactions(self.ctx) if current_track else None
+            liked, disliked = reactions or (set(), set())
+
+            if current_track and str(current_track['id']) in liked:
                 self.like_button.style = ButtonStyle.success
             else:
                 self.like_button.style = ButtonStyle.secondary
 
-            if current_track and str(current_track['id']) in [str(dislike.id) for dislike in await self.get_reacted_tracks(self.ctx, 'dislike')]:
+            if current_track and str(current_track['id']) in disliked:
                 self.dislike_button.style = ButtonStyle.success
             else:
                 self.dislike_button.style = ButtonStyle.secondary
@@ -734,17 +758,20 @@ class MenuView(View, VoiceExtension):
 
         return self
     
+    @instrumented()
     async def on_timeout(self) -> None:
         logging.debug('[MENU] Menu timed out. Deleting menu message')
         if not self.ctx.guild_id:
             return
 
         if self.guild['current_menu']:
+            self._vibe_prefetch.discard(self.ctx.guild_id)
             await self.db.update(self.ctx.guild_id, {
                 'current_menu': None, 'repeat': False, 'shuffle': False,
-                'previous_tracks': [], 'next_tracks': [], 'votes': {},
+                'previous_tracks': [], 'next_tracks': [], 'shuffle_order': [],
                 'vibing': False, 'current_viber_id': None
             })
+            await self.db.clear_votes(self.ctx.guild_id)
 
             if (message := await self.get_menu_message(self.ctx, self.guild['current_menu'])):
                 await message.delete()
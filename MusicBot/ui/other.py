@@ -5,6 +5,7 @@ from discord.ui import View, Button, Item
 from discord import ApplicationContext, ButtonStyle, Interaction, Embed, HTTPException
 
 from MusicBot.cogs.utils.voice_extension import VoiceExtension
+from MusicBot.database import instrumented
 
 def generate_queue_embed(page: int, tracks_list: list[dict[str, Any]]) -> Embed:
     count = 15 * page
@@ -87,6 +88,7 @@ class QueueView(View, VoiceExtension):
         else:
             self.prev_button.disabled = True
     
+    @instrumented()
     async def on_timeout(self) -> None:
         try:
             await super().on_timeout()
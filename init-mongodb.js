@@ -1,3 +1,11 @@
 db = db.getSiblingDB('YandexMusicBot');
 db.createCollection('guilds');
-db.createCollection('users');
\ No newline at end of file
+db.createCollection('users');
+db.createCollection('votes');
+db.votes.createIndex({ created_at: 1 }, { name: 'created_at_ttl', expireAfterSeconds: 3600 });
+db.votes.createIndex({ gid: 1 }, { name: 'gid' });
+db.guilds.createIndex({ last_activity: 1 }, { name: 'last_activity' });
+db.guilds.createIndex({ updated_at: 1 }, { name: 'updated_at' });
+db.users.createIndex({ updated_at: 1 }, { name: 'updated_at' });
+db.tracks_cache.createIndex({ cached_at: 1 }, { name: 'cached_at_ttl', expireAfterSeconds: 604800 });
+db.cover_colors.createIndex({ cached_at: 1 }, { name: 'cached_at_ttl', expireAfterSeconds: 2592000 });
\ No newline at end of file
@@ -0,0 +1,32 @@
+import os
+import asyncio
+import inspect
+from typing import TYPE_CHECKING
+
+import pytest
+
+if TYPE_CHECKING:
+    from MusicBot.database import VoiceGuildsDatabase
+
+# Must be set before MusicBot.database creates the backend
+os.environ['DB_BACKEND'] = 'sqlite'
+os.environ['SQLITE_PATH'] = ':memory:'
+os.environ.setdefault('EXPLICIT_EID', '0')  # Required by the embeds of MusicBot.cogs.utils
+
+@pytest.hookimpl(tryfirst=True)
+def pytest_pyfunc_call(pyfuncitem: pytest.Function) -> bool | None:
+    """Run `async def` tests in a new event loop."""
+    if not inspect.iscoroutinefunction(pyfuncitem.obj):
+        return None
+
+    arguments = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+    asyncio.run(pyfuncitem.obj(**arguments))
+    return True
+
+@pytest.fixture
+def db() -> 'VoiceGuildsDatabase':
+    """Guild database with an empty guilds collection."""
+    from MusicBot.database import VoiceGuildsDatabase, guilds
+
+    asyncio.run(guilds.delete_many({}))
+    return VoiceGuildsDatabase()
@@ -0,0 +1,78 @@
+import asyncio
+from typing import Any
+
+from yandex_music.exceptions import NetworkError
+
+from MusicBot.cogs.utils.feedback import FeedbackEvent, FeedbackQueue
+
+class FakeClient:
+    """Records sent feedback. Tracks in `failing` fail with a transient error once."""
+
+    def __init__(self, failing: set[str] | None = None) -> None:
+        self.failing = failing or set()
+        self.attempts: list[str] = []
+        self.sent: list[str] = []
+        self.failed = asyncio.Event()
+
+    async def rotor_station_feedback(self, station: str, feedback_type: str, track_id: str | int, **kwargs: Any) -> bool:
+        self.attempts.append(str(track_id))
+        if str(track_id) in self.failing:
+            self.failing.discard(str(track_id))
+            self.failed.set()
+            raise NetworkError('Timed out')
+
+        self.sent.append(str(track_id))
+        return True
+
+class FakeRegistry:
+    def __init__(self, client: FakeClient) -> None:
+        self._client = client
+
+    async def client(self, token: str) -> FakeClient:
+        return self._client
+
+def event(gid: int, track_id: int, feedback_type: str = 'trackStarted') -> FeedbackEvent:
+    return FeedbackEvent(gid, 'token', 'user:onyourwave', feedback_type, track_id, 'batch')  # type: ignore
+
+def feedback_queue(client: FakeClient, **kwargs: Any) -> FeedbackQueue:
+    return FeedbackQueue(FakeRegistry(client), workers=1, backoff=0.05, **kwargs)  # type: ignore
+
+async def test_delayed_retry_keeps_guild_order() -> None:
+    client = FakeClient(failing={'1'})
+    queue = feedback_queue(client)
+
+    queue.submit(event(1, 1))
+    queue.submit(event(1, 2))
+    queue.submit(event(2, 3))
+    await queue.close()
+
+    # The other guild is not held back by the retry, later events of the guild are
+    assert client.attempts == ['1', '3', '1', '2']
+    assert client.sent == ['3', '1', '2']
+    assert queue.stats() == {'pending': 0, 'sent': 3, 'failed': 0, 'dropped': 0, 'coalesced': 0}
+
+async def test_duplicates_of_retried_event_are_coalesced() -> None:
+    client = FakeClient(failing={'1'})
+    queue = feedback_queue(client)
+
+    queue.submit(event(1, 1))
+    await client.failed.wait()
+    queue.submit(event(1, 1))
+    queue.submit(event(1, 1, 'trackFinished'))  # Different feedback of the same track is not a duplicate
+    await queue.close()
+
+    assert client.sent == ['1', '1']
+    assert queue.coalesced == 1
+
+async def test_full_shard_drops_oldest_event() -> None:
+    client = FakeClient()
+    queue = feedback_queue(client, maxsize=2)
+
+    # Workers don't run until the test yields, so all events are pending at once
+    for track_id in range(1, 4):
+        queue.submit(event(1, track_id))
+    assert queue.stats()['pending'] == 2
+    await queue.close()
+
+    assert client.sent == ['2', '3']
+    assert queue.dropped == 1
@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from yandex_music.exceptions import NetworkError, NotFoundError
+
+from MusicBot.cogs.utils.gateway import CircuitOpenError, Priority, YMGateway
+
+async def ok() -> str:
+    return 'ok'
+
+async def timeout() -> str:
+    raise NetworkError('Timed out')
+
+async def test_circuit_opens_probes_and_closes() -> None:
+    gateway = YMGateway(rate=1000, token_rate=1000, failure_threshold=2, reset_timeout=0.05)
+
+    for _ in range(2):
+        with pytest.raises(NetworkError):
+            await gateway.call('token', Priority.NORMAL, timeout)
+    assert gateway.breaker.is_open
+
+    # Open: requests are rejected without being sent
+    with pytest.raises(CircuitOpenError):
+        await gateway.call('token', Priority.NORMAL, timeout)
+    assert gateway.rejected == 1
+
+    # Half-open: a single probe is let through, a failed probe opens the circuit again
+    await asyncio.sleep(0.06)
+    with pytest.raises(NetworkError):
+        await gateway.call('token', Priority.NORMAL, timeout)
+    with pytest.raises(CircuitOpenError):
+        await gateway.call('token', Priority.NORMAL, ok)
+
+    await asyncio.sleep(0.06)
+    release = asyncio.Event()
+
+    async def probe() -> str:
+        await release.wait()
+        return 'ok'
+
+    probing = asyncio.create_task(gateway.call('token', Priority.NORMAL, probe))
+    await asyncio.sleep(0)
+    with pytest.raises(CircuitOpenError):
+        await gateway.call('token', Priority.CRITICAL, ok)
+
+    # Closed: the probe succeeded
+    release.set()
+    assert await probing == 'ok'
+    assert not gateway.breaker.is_open and gateway.breaker.failures == 0
+    assert await gateway.call('token', Priority.NORMAL, ok) == 'ok'
+
+async def test_api_errors_keep_circuit_closed() -> None:
+    gateway = YMGateway(rate=1000, token_rate=1000, failure_threshold=1, reset_timeout=60)
+
+    async def not_found() -> str:
+        raise NotFoundError('Not found')
+
+    with pytest.raises(NotFoundError):
+        await gateway.call('token', Priority.NORMAL, not_found)
+    assert not gateway.breaker.is_open
+
+async def test_higher_priority_goes_first_when_throttled() -> None:
+    gateway = YMGateway(rate=20, token_rate=1000, failure_threshold=10, reset_timeout=60)
+    gateway._global.tokens = 0
+    order: list[Priority] = []
+
+    async def call(priority: Priority) -> None:
+        async def send() -> None:
+            order.append(priority)
+        await gateway.call('token', priority, send)
+
+    # Lower priorities are queued first, so they would win without priorities
+    await asyncio.gather(*(call(priority) for priority in reversed(Priority)))
+
+    assert order == [Priority.CRITICAL, Priority.NORMAL, Priority.BACKGROUND]
+    assert gateway.throttled == 3
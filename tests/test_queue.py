@@ -0,0 +1,19 @@
+from MusicBot.database import VoiceGuildsDatabase
+
+GID = 1
+
+async def test_queue_tail(db: VoiceGuildsDatabase) -> None:
+    await db.get_guild(GID)
+    await db.update(GID, {'current_viber_id': 10})
+
+    assert await db.get_queue_tail(GID, 2) == {'_id': GID, 'next_tracks': [], 'current_viber_id': 10}
+
+    await db.modify_track(GID, [{'id': '1'}, {'id': '2'}], 'next', 'extend')
+    tail = await db.get_queue_tail(GID, 2)
+    assert tail is not None
+    assert [track['id'] for track in tail['next_tracks']] == ['2']
+
+    await db.modify_track(GID, [{'id': '3'}], 'next', 'append')
+    assert await db.get_queue_tail(GID, 2) is None
+    assert await db.get_queue_tail(GID, 3) is not None
+    assert await db.get_queue_tail(GID + 1, 2) is None
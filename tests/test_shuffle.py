@@ -0,0 +1,138 @@
+import asyncio
+from typing import Any
+
+from MusicBot.database import VoiceGuildsDatabase, guilds
+
+GID = 1
+
+def tracks(*track_ids: int) -> list[dict[str, Any]]:
+    return [{'id': str(track_id), 'title': f'Track {track_id}'} for track_id in track_ids]
+
+async def state(gid: int = GID) -> dict[str, Any]:
+    return await guilds.find_one({'_id': gid}, {'next_tracks': 1, 'shuffle_order': 1})
+
+def assert_consistent(guild: dict[str, Any]) -> None:
+    """The shuffle order is either not generated or a permutation of the queue entries."""
+    entry_ids = [track['entry_id'] for track in guild['next_tracks']]
+    assert len(set(entry_ids)) == len(entry_ids)
+    if guild['shuffle_order']:
+        assert sorted(guild['shuffle_order']) == sorted(entry_ids)
+
+async def drain(db: VoiceGuildsDatabase) -> list[dict[str, Any]]:
+    popped = []
+    while (track := await db.pop_shuffled_track(GID)):
+        popped.append(track)
+    return popped
+
+async def test_order_follows_queue_changes(db: VoiceGuildsDatabase) -> None:
+    await db.get_guild(GID)
+    await db.set_shuffle(GID, True)
+    await db.modify_track(GID, tracks(1, 2, 3, 4, 5), 'next', 'extend')
+
+    upcoming = await db.get_upcoming_tracks(GID)
+    guild = await state()
+    assert_consistent(guild)
+    assert [track['entry_id'] for track in upcoming] == guild['shuffle_order']
+
+    await db.modify_track(GID, tracks(6), 'next', 'insert')
+    await db.modify_track(GID, tracks(7, 8), 'next', 'append')
+    guild = await state()
+    assert_consistent(guild)
+    assert guild['shuffle_order'][0] == guild['next_tracks'][0]['entry_id']  # Inserted tracks play next
+    assert guild['shuffle_order'][:6] == [guild['shuffle_order'][0], *[track['entry_id'] for track in upcoming]]
+
+    upcoming = await db.get_upcoming_tracks(GID)
+    first = await db.pop_shuffled_track(GID)
+    assert first == upcoming[0]
+    assert_consistent(await state())
+
+    assert await drain(db) == upcoming[1:]
+    assert await state() == {'_id': GID, 'next_tracks': [], 'shuffle_order': []}
+
+async def test_toggle_keeps_queue_order(db: VoiceGuildsDatabase) -> None:
+    await db.get_guild(GID)
+    await db.modify_track(GID, tracks(1, 2, 3, 4, 5), 'next', 'extend')
+    await db.set_shuffle(GID, True)
+    shuffled = await db.get_upcoming_tracks(GID)
+    await db.pop_shuffled_track(GID)
+
+    await db.set_shuffle(GID, False)
+    guild = await state()
+    assert guild['shuffle_order'] == []
+    assert [track['id'] for track in await db.get_upcoming_tracks(GID)] == [
+        track['id'] for track in tracks(1, 2, 3, 4, 5) if track['id'] != shuffled[0]['id']
+    ]
+
+    await db.set_shuffle(GID, True)
+    upcoming = await db.get_upcoming_tracks(GID)
+    guild = await state()
+    assert_consistent(guild)
+    assert sorted(track['id'] for track in upcoming) == sorted(track['id'] for track in shuffled[1:])
+
+async def test_upcoming_tracks_follow_permutation(db: VoiceGuildsDatabase) -> None:
+    await db.get_guild(GID)
+    await db.set_shuffle(GID, True)
+    await db.modify_track(GID, tracks(1, 2, 3, 4), 'next', 'extend')
+    guild = await state()
+    entry_ids = [track['entry_id'] for track in guild['next_tracks']]
+
+    # Stale entries are skipped, entries missing in the order are played last
+    await guilds.update_one({'_id': GID}, {'$set': {'shuffle_order': [entry_ids[2], 'removed', entry_ids[0], entry_ids[3]]}})
+
+    upcoming = await db.get_upcoming_tracks(GID)
+    assert [track['id'] for track in upcoming] == ['3', '1', '4', '2']
+    assert await drain(db) == upcoming
+
+async def test_duplicate_tracks_are_separate_entries(db: VoiceGuildsDatabase) -> None:
+    await db.get_guild(GID)
+    await db.set_shuffle(GID, True)
+    await db.modify_track(GID, tracks(1, 1, 1), 'next', 'extend')
+
+    assert [track['id'] for track in await drain(db)] == ['1', '1', '1']
+
+async def test_legacy_tracks_get_entry_ids(db: VoiceGuildsDatabase) -> None:
+    await db.get_guild(GID)
+    await db.set_shuffle(GID, True)
+    await guilds.update_one({'_id': GID}, {'$set': {'next_tracks': [*tracks(1, 2), *db.queue_entries(tracks(3))]}})
+
+    upcoming = await db.get_upcoming_tracks(GID)
+    guild = await state()
+    assert all('entry_id' in track for track in guild['next_tracks'])
+    assert_consistent(guild)
+    assert sorted(track['id'] for track in upcoming) == ['1', '2', '3']
+
+async def test_concurrent_pushes_are_not_lost(db: VoiceGuildsDatabase) -> None:
+    await db.get_guild(GID)
+    await db.set_shuffle(GID, True)
+    await db.modify_track(GID, tracks(*range(10)), 'next', 'extend')
+
+    async def pop(count: int) -> list[dict[str, Any]]:
+        return [track for _ in range(count) if (track := await db.pop_shuffled_track(GID))]
+
+    results = await asyncio.gather(
+        pop(5),
+        *(db.modify_track(GID, tracks(track_id), 'next', 'append') for track_id in range(10, 20)),
+        db.modify_track(GID, tracks(*range(20, 25)), 'next', 'insert'),
+        pop(5),
+    )
+    assert_consistent(await state())
+
+    popped = [*results[0], *results[-1], *await drain(db)]
+    assert sorted(int(track['id']) for track in popped) == list(range(25))
+
+async def test_concurrent_push_while_adding_entry_ids(db: VoiceGuildsDatabase) -> None:
+    await db.get_guild(GID)
+    await db.set_shuffle(GID, True)
+    await guilds.update_one({'_id': GID}, {'$set': {'next_tracks': tracks(1, 2, 3)}})
+
+    popped, *_ = await asyncio.gather(
+        db.pop_shuffled_track(GID),
+        db.modify_track(GID, tracks(4), 'next', 'append'),
+        db.modify_track(GID, tracks(5), 'next', 'insert'),
+    )
+    guild = await state()
+    assert_consistent(guild)
+    assert all('entry_id' in track for track in guild['next_tracks'])
+
+    assert popped is not None
+    assert sorted(track['id'] for track in [popped, *await drain(db)]) == ['1', '2', '3', '4', '5']
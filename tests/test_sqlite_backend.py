@@ -0,0 +1,399 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterator
+
+import pytest
+from pymongo import ReturnDocument, UpdateOne, DeleteMany, InsertOne
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from MusicBot.database.backends import SQLiteBackend
+from MusicBot.database.backends.sqlite import SQLiteCollection
+
+@pytest.fixture
+def backend() -> Iterator[SQLiteBackend]:
+    backend = SQLiteBackend(':memory:')
+    yield backend
+    asyncio.run(backend.close())
+
+@pytest.fixture
+def guilds(backend: SQLiteBackend) -> SQLiteCollection:
+    return backend.collection('guilds')
+
+def track(track_id: str, entry_id: str | None = None) -> dict[str, Any]:
+    data: dict[str, Any] = {'id': track_id, 'title': f'Track {track_id}'}
+    if entry_id:
+        data['entry_id'] = entry_id
+    return data
+
+async def ids(collection: SQLiteCollection, filter: dict[str, Any]) -> list[Any]:
+    return [document['_id'] for document in await collection.find(filter, {'_id': 1}).to_list()]
+
+
+# Filters
+
+async def test_ne_none_does_not_match_missing_field(guilds: SQLiteCollection) -> None:
+    # compact_idle_guilds relies on guilds without the field not being selected
+    await guilds.insert_many([
+        {'_id': 1},
+        {'_id': 2, 'current_track': None},
+        {'_id': 3, 'current_track': track('1')},
+    ])
+
+    assert await ids(guilds, {'current_track': {'$ne': None}}) == [3]
+
+async def test_none_matches_missing_and_null(guilds: SQLiteCollection) -> None:
+    await guilds.insert_many([{'_id': 1}, {'_id': 2, 'last_activity': None}, {'_id': 3, 'last_activity': datetime.now(timezone.utc)}])
+
+    assert await ids(guilds, {'last_activity': None}) == [1, 2]
+
+async def test_array_index_exists(guilds: SQLiteCollection) -> None:
+    await guilds.insert_many([
+        {'_id': 1},
+        {'_id': 2, 'next_tracks': []},
+        {'_id': 3, 'next_tracks': [track('1')]},
+    ])
+
+    assert await ids(guilds, {'next_tracks.0': {'$exists': True}}) == [3]
+    assert await ids(guilds, {'next_tracks.0': {'$exists': False}}) == [1, 2]
+    assert await ids(guilds, {'next_tracks.1': {'$exists': False}}) == [1, 2, 3]
+
+async def test_bool_equality_is_strict(guilds: SQLiteCollection) -> None:
+    await guilds.insert_many([{'_id': 1, 'vibing': True}, {'_id': 2, 'vibing': 1}, {'_id': 3, 'vibing': False}])
+
+    assert await ids(guilds, {'vibing': True}) == [1]
+
+async def test_datetime_comparison(guilds: SQLiteCollection) -> None:
+    now = datetime.now(timezone.utc)
+    await guilds.insert_many([
+        {'_id': 1, 'last_activity': now - timedelta(days=2)},
+        {'_id': 2, 'last_activity': now},
+        {'_id': 3, 'last_activity': None},
+        {'_id': 4},
+    ])
+
+    assert await ids(guilds, {'last_activity': {'$lt': now - timedelta(days=1)}}) == [1]
+    assert await ids(guilds, {'last_activity': {'$gte': now - timedelta(days=1)}}) == [2]
+
+async def test_compaction_query(guilds: SQLiteCollection) -> None:
+    cutoff = datetime.now(timezone.utc)
+    old = cutoff - timedelta(days=1)
+    await guilds.insert_many([
+        {'_id': 1, 'last_activity': old, 'next_tracks': [], 'previous_tracks': [], 'current_track': None, 'current_menu': None, 'vibing': False},
+        {'_id': 2, 'last_activity': old, 'next_tracks': [track('1')], 'current_track': None},
+        {'_id': 3, 'last_activity': old, 'current_menu': 5},
+        {'_id': 4, 'last_activity': old, 'vibing': True},
+        {'_id': 5, 'last_activity': cutoff + timedelta(days=1), 'next_tracks': [track('1')]},
+        {'_id': 6, 'next_tracks': [track('1')]},
+        {'_id': 7, 'last_activity': old, 'previous_tracks': [track('1')]},
+    ])
+
+    query = {
+        '$and': [
+            {'last_activity': {'$lt': cutoff}},
+            {'$or': [
+                {'next_tracks.0': {'$exists': True}},
+                {'previous_tracks.0': {'$exists': True}},
+                {'current_track': {'$ne': None}},
+                {'current_menu': {'$ne': None}},
+                {'vibing': True}
+            ]}
+        ],
+        '_id': {'$nin': [4]}
+    }
+    assert await ids(guilds, query) == [2, 3, 7]
+
+async def test_id_lookups(guilds: SQLiteCollection) -> None:
+    await guilds.insert_many([{'_id': 1}, {'_id': 2}, {'_id': 'a'}])
+
+    assert await guilds.find_one({'_id': 2}) == {'_id': 2}
+    assert await guilds.find_one({'_id': 3}) is None
+    assert sorted(await ids(guilds, {'_id': {'$in': [1, 'a', 4]}}), key=str) == [1, 'a']
+    assert await ids(guilds, {'_id': {'$eq': 'a'}}) == ['a']
+
+async def test_indexed_field_lookup(backend: SQLiteBackend) -> None:
+    votes = backend.collection('votes')
+    await votes.create_index([('gid', 1)], name='gid')
+    await votes.insert_many([{'_id': 1, 'gid': 10}, {'_id': 2, 'gid': 20}, {'_id': 3, 'gid': 10}])
+
+    assert await ids(votes, {'gid': 10}) == [1, 3]
+    assert (await votes.delete_many({'gid': 10})).deleted_count == 2
+    assert await ids(votes, {}) == [2]
+
+async def test_whole_array_equality(guilds: SQLiteCollection) -> None:
+    # Compare-and-swap of the queue in VoiceGuildsDatabase._add_entry_ids
+    tracks = [track('1'), track('2')]
+    await guilds.insert_one({'_id': 1, 'next_tracks': tracks})
+
+    result = await guilds.update_one({'_id': 1, 'next_tracks': [track('1')]}, {'$set': {'next_tracks': []}})
+    assert result.matched_count == 0
+
+    result = await guilds.update_one({'_id': 1, 'next_tracks': tracks}, {'$set': {'next_tracks': []}})
+    assert result.matched_count == 1
+    assert (await guilds.find_one({'_id': 1}))['next_tracks'] == []
+
+async def test_unsupported_query_operator(guilds: SQLiteCollection) -> None:
+    await guilds.insert_one({'_id': 1, 'count': 2})
+
+    with pytest.raises(OperationFailure):
+        await guilds.find_one({'count': {'$gt': 1}})
+
+
+# Updates
+
+async def test_set_on_insert_with_upsert(guilds: SQLiteCollection) -> None:
+    defaults = {'next_tracks': [], 'shuffle': False}
+
+    created = await guilds.find_one_and_update(
+        {'_id': 1}, {'$setOnInsert': defaults}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    assert created == {'_id': 1, **defaults}
+
+    await guilds.update_one({'_id': 1}, {'$set': {'shuffle': True}})
+    existing = await guilds.find_one_and_update(
+        {'_id': 1}, {'$setOnInsert': defaults}, upsert=True, return_document=ReturnDocument.AFTER
+    )
+    assert existing == {'_id': 1, 'next_tracks': [], 'shuffle': True}
+
+async def test_find_one_and_update_return_document(guilds: SQLiteCollection) -> None:
+    await guilds.insert_one({'_id': 1, 'current_menu': 1})
+
+    before = await guilds.find_one_and_update({'_id': 1}, {'$set': {'current_menu': 2}}, return_document=ReturnDocument.BEFORE)
+    after = await guilds.find_one_and_update({'_id': 1}, {'$set': {'current_menu': 3}}, return_document=ReturnDocument.AFTER)
+
+    assert before == {'_id': 1, 'current_menu': 1}
+    assert after == {'_id': 1, 'current_menu': 3}
+    assert await guilds.find_one_and_update({'_id': 2}, {'$set': {'current_menu': 1}}) is None
+    assert await guilds.find_one({'_id': 2}) is None
+
+async def test_find_one_and_update_before_upsert_returns_none(guilds: SQLiteCollection) -> None:
+    assert await guilds.find_one_and_update({'_id': 1}, {'$set': {'a': 1}}, upsert=True) is None
+    assert await guilds.find_one({'_id': 1}) == {'_id': 1, 'a': 1}
+
+async def test_set_unset_and_current_date(guilds: SQLiteCollection) -> None:
+    await guilds.insert_one({'_id': 1, 'legacy': True, 'vibe_settings': {'mood': 'all'}})
+
+    await guilds.update_one({'_id': 1}, {
+        '$set': {'vibe_settings.mood': 'calm', 'current_track': track('1')},
+        '$unset': {'legacy': ''},
+        '$currentDate': {'last_activity': True}
+    })
+    guild = await guilds.find_one({'_id': 1})
+
+    assert guild['vibe_settings'] == {'mood': 'calm'}
+    assert guild['current_track'] == track('1')
+    assert 'legacy' not in guild
+    assert datetime.now() - guild['last_activity'] < timedelta(minutes=1)  # Stored as naive UTC, like pymongo returns it
+
+async def test_push_each_and_position(guilds: SQLiteCollection) -> None:
+    await guilds.insert_one({'_id': 1})
+
+    await guilds.update_one({'_id': 1}, {'$push': {'next_tracks': {'$each': [track('1'), track('2')]}}})
+    await guilds.update_one({'_id': 1}, {'$push': {'next_tracks': {'$each': [track('0')], '$position': 0}}})
+    await guilds.update_one({'_id': 1}, {'$push': {'previous_tracks': track('3')}})
+    guild = await guilds.find_one({'_id': 1})
+
+    assert [item['id'] for item in guild['next_tracks']] == ['0', '1', '2']
+    assert guild['previous_tracks'] == [track('3')]
+
+async def test_pop(guilds: SQLiteCollection) -> None:
+    await guilds.insert_one({'_id': 1, 'next_tracks': [track('1'), track('2'), track('3')], 'previous_tracks': []})
+
+    before = await guilds.find_one_and_update(
+        {'_id': 1}, {'$pop': {'next_tracks': -1}}, projection={'next_tracks': 1}, return_document=ReturnDocument.BEFORE
+    )
+    await guilds.update_one({'_id': 1}, {'$pop': {'next_tracks': 1}})
+    await guilds.update_one({'_id': 1}, {'$pop': {'previous_tracks': -1, 'missing': 1}})
+    guild = await guilds.find_one({'_id': 1})
+
+    assert before['next_tracks'][0] == track('1')
+    assert guild == {'_id': 1, 'next_tracks': [track('2')], 'previous_tracks': []}
+
+async def test_pull(guilds: SQLiteCollection) -> None:
+    await guilds.insert_one({'_id': 1, 'next_tracks': [track('1', 'a'), track('1', 'b'), track('2', 'c')]})
+
+    before = await guilds.find_one_and_update(
+        {'_id': 1},
+        {'$pull': {'next_tracks': {'entry_id': 'b'}}},
+        projection={'next_tracks': {'$elemMatch': {'entry_id': 'b'}}},
+        return_document=ReturnDocument.BEFORE
+    )
+    missing = await guilds.find_one_and_update(
+        {'_id': 1},
+        {'$pull': {'next_tracks': {'entry_id': 'x'}}},
+        projection={'next_tracks': {'$elemMatch': {'entry_id': 'x'}}},
+        return_document=ReturnDocument.BEFORE
+    )
+    guild = await guilds.find_one({'_id': 1})
+
+    assert before == {'_id': 1, 'next_tracks': [track('1', 'b')]}
+    assert missing == {'_id': 1}
+    assert [item['entry_id'] for item in guild['next_tracks']] == ['a', 'c']
+
+async def test_add_to_set_and_pull_scalars(backend: SQLiteBackend) -> None:
+    votes = backend.collection('votes')
+    await votes.insert_one({'_id': 1, 'positive_votes': [], 'negative_votes': []})
+
+    await votes.find_one_and_update({'_id': 1}, {'$addToSet': {'positive_votes': 10}})
+    await votes.find_one_and_update({'_id': 1}, {'$addToSet': {'positive_votes': 10}})
+    vote = await votes.find_one_and_update({'_id': 1}, {'$addToSet': {'positive_votes': 20}}, return_document=ReturnDocument.AFTER)
+    assert vote['positive_votes'] == [10, 20]
+
+    vote = await votes.find_one_and_update({'_id': 1}, {'$pull': {'positive_votes': 10}}, return_document=ReturnDocument.AFTER)
+    assert vote['positive_votes'] == [20]
+    assert await votes.find_one_and_update({'_id': 2}, {'$addToSet': {'positive_votes': 10}}) is None
+
+async def test_update_on_non_array_fails(guilds: SQLiteCollection) -> None:
+    await guilds.insert_one({'_id': 1, 'next_tracks': 'oops'})
+
+    with pytest.raises(OperationFailure):
+        await guilds.update_one({'_id': 1}, {'$push': {'next_tracks': track('1')}})
+
+async def test_id_is_immutable(guilds: SQLiteCollection) -> None:
+    await guilds.insert_one({'_id': 1})
+
+    with pytest.raises(OperationFailure):
+        await guilds.update_one({'_id': 1}, {'$set': {'_id': 2}})
+
+async def test_unsupported_update_operator(guilds: SQLiteCollection) -> None:
+    await guilds.insert_one({'_id': 1, 'count': 1})
+
+    with pytest.raises(OperationFailure):
+        await guilds.update_one({'_id': 1}, {'$inc': {'count': 1}})
+    assert await guilds.find_one({'_id': 1}) == {'_id': 1, 'count': 1}
+
+async def test_update_results(guilds: SQLiteCollection) -> None:
+    await guilds.insert_many([{'_id': 1, 'last_activity': None}, {'_id': 2}, {'_id': 3, 'last_activity': 1}])
+
+    result = await guilds.update_many({'last_activity': None}, {'$set': {'last_activity': 0}})
+    assert (result.matched_count, result.modified_count) == (2, 2)
+
+    result = await guilds.update_one({'_id': 1}, {'$set': {'last_activity': 0}})
+    assert (result.matched_count, result.modified_count) == (1, 0)
+
+    result = await guilds.update_one({'_id': 4}, {'$set': {'last_activity': 0}}, upsert=True)
+    assert result.upserted_id == 4
+
+async def test_insert_duplicate_key(guilds: SQLiteCollection) -> None:
+    await guilds.insert_one({'_id': 1})
+
+    with pytest.raises(DuplicateKeyError):
+        await guilds.insert_one({'_id': 1})
+
+async def test_find_one_and_delete(backend: SQLiteBackend) -> None:
+    votes = backend.collection('votes')
+    await votes.insert_one({'_id': 1, 'gid': 1})
+
+    assert await votes.find_one_and_delete({'_id': 1}) == {'_id': 1, 'gid': 1}
+    assert await votes.find_one_and_delete({'_id': 1}) is None
+
+
+# Bulk writes
+
+async def test_bulk_write(guilds: SQLiteCollection) -> None:
+    await guilds.insert_one({'_id': 1, 'next_tracks': [], 'shuffle_order': []})
+
+    result = await guilds.bulk_write([
+        UpdateOne({'_id': 1}, {'$push': {'next_tracks': {'$each': [track('1', 'a')]}}}),
+        # Only applies when the shuffle order was generated
+        UpdateOne({'_id': 1, 'shuffle_order.0': {'$exists': True}}, {'$push': {'shuffle_order': {'$each': ['a']}}}),
+        UpdateOne({'_id': 2}, {'$set': {'next_tracks': []}}, upsert=True),
+        InsertOne({'_id': 3}),
+    ], ordered=False)
+
+    assert (result.matched_count, result.modified_count, result.upserted_count, result.inserted_count) == (1, 1, 1, 1)
+    assert result.upserted_ids == {2: 2}
+    assert await guilds.find_one({'_id': 1}) == {'_id': 1, 'next_tracks': [track('1', 'a')], 'shuffle_order': []}
+
+async def test_bulk_write_is_atomic(guilds: SQLiteCollection) -> None:
+    await guilds.insert_one({'_id': 1})
+
+    with pytest.raises(DuplicateKeyError):
+        await guilds.bulk_write([UpdateOne({'_id': 1}, {'$set': {'a': 1}}), InsertOne({'_id': 1})])
+    assert await guilds.find_one({'_id': 1}) == {'_id': 1}
+
+    await guilds.bulk_write([DeleteMany({})])
+    assert await guilds.find_one({}) is None
+
+
+# Projections and cursors
+
+async def test_projections(guilds: SQLiteCollection) -> None:
+    await guilds.insert_one({
+        '_id': 1,
+        'next_tracks': [track('1', 'a'), track('2', 'b'), track('3', 'c')],
+        'shuffle_order': ['c', 'a', 'b'],
+        'shuffle': True,
+    })
+
+    assert await guilds.find_one({'_id': 1}, {'shuffle': 1}) == {'_id': 1, 'shuffle': True}
+    assert await guilds.find_one({'_id': 1}, {'_id': 1}) == {'_id': 1}
+    assert await guilds.find_one({'_id': 1}, {'shuffle': 1, '_id': 0}) == {'shuffle': True}
+    assert await guilds.find_one({'_id': 1}, ['shuffle']) == {'_id': 1, 'shuffle': True}
+    assert await guilds.find_one({'_id': 1}, {'next_tracks': 0, 'shuffle_order': 0}) == {'_id': 1, 'shuffle': True}
+    assert await guilds.find_one({'_id': 1}, {'next_tracks.entry_id': 1}) == {
+        '_id': 1, 'next_tracks': [{'entry_id': 'a'}, {'entry_id': 'b'}, {'entry_id': 'c'}]
+    }
+    assert await guilds.find_one({'_id': 1}, {'shuffle_order': {'$slice': 1}, 'shuffle': 1}) == {
+        '_id': 1, 'shuffle_order': ['c'], 'shuffle': True
+    }
+    assert (await guilds.find_one({'_id': 1}, {'next_tracks': {'$slice': -1}, 'shuffle': 1}))['next_tracks'] == [track('3', 'c')]
+
+    # $slice alone excludes nothing else
+    assert set(await guilds.find_one({'_id': 1}, {'next_tracks': {'$slice': 1}})) == {'_id', 'next_tracks', 'shuffle_order', 'shuffle'}
+
+    with pytest.raises(OperationFailure):
+        await guilds.find_one({'_id': 1}, {'shuffle': 1, 'next_tracks': 0})
+
+async def test_cursor(guilds: SQLiteCollection) -> None:
+    await guilds.insert_many([{'_id': index, 'vibing': index % 2 == 0} for index in range(10)])
+
+    assert await ids(guilds, {'vibing': True}) == [0, 2, 4, 6, 8]
+    assert [guild['_id'] for guild in await guilds.find({'vibing': True}).limit(2).to_list()] == [0, 2]
+    assert [guild async for guild in guilds.find({'vibing': False}, {'_id': 1}).batch_size(3)] == [{'_id': i} for i in (1, 3, 5, 7, 9)]
+    assert [guild async for guild in guilds.find({}).batch_size(4).limit(5)] == [{'_id': i, 'vibing': i % 2 == 0} for i in range(5)]
+
+
+async def test_cursor_uses_ids_and_indexes(backend: SQLiteBackend) -> None:
+    tracks = backend.collection('tracks_cache')
+    await tracks.create_index([('album', 1)], name='album')
+    await tracks.insert_many([{'_id': str(index), 'album': index % 3} for index in range(20)])
+
+    statements: list[str] = []
+    await backend.run(lambda conn: conn.set_trace_callback(statements.append), connection=True)
+
+    found = [track['_id'] async for track in tracks.find({'_id': {'$in': ['3', '7', '30']}}).batch_size(1)]
+    assert found == ['3', '7']
+    assert statements and all('id IN' in statement for statement in statements if statement.startswith('SELECT'))
+
+    statements.clear()
+    assert [track['_id'] async for track in tracks.find({'album': 1}).batch_size(2)] == sorted(str(index) for index in range(1, 20, 3))
+    assert all('json_extract' in statement for statement in statements if statement.startswith('SELECT'))
+
+    await backend.run(lambda conn: conn.set_trace_callback(None), connection=True)
+
+
+# TTL
+
+async def test_ttl_expiry(backend: SQLiteBackend, monkeypatch: pytest.MonkeyPatch) -> None:
+    votes = backend.collection('votes')
+    now = datetime.now(timezone.utc)
+    await votes.insert_many([
+        {'_id': 1, 'created_at': now - timedelta(hours=2)},
+        {'_id': 2, 'created_at': now},
+        {'_id': 3},
+    ])
+    await votes.create_index([('created_at', 1)], name='created_at_ttl', expireAfterSeconds=3600)
+
+    assert await ids(votes, {}) == [2, 3]
+
+    # Expired documents are purged at most once per interval
+    await votes.update_one({'_id': 2}, {'$set': {'created_at': now - timedelta(hours=2)}})
+    assert await ids(votes, {}) == [2, 3]
+
+    monkeypatch.setattr(votes, '_last_purge', 0.0)
+    assert await ids(votes, {}) == [3]
+
+    await votes.drop_index('created_at_ttl')
+    await votes.insert_one({'_id': 4, 'created_at': now - timedelta(hours=2)})
+    monkeypatch.setattr(votes, '_last_purge', 0.0)
+    assert await ids(votes, {}) == [3, 4]
@@ -0,0 +1,100 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+import pytest
+from aiohttp import web
+from yandex_music.exceptions import UnauthorizedError
+
+from MusicBot.cogs.utils import gateway, ym_client
+from MusicBot.cogs.utils.http import ym_session
+from MusicBot.cogs.utils.tracks import TrackCache, TrackResolver
+from MusicBot.cogs.utils.ym_client import YMClientRegistry
+from MusicBot.devtools import Fixtures, StandInServer
+from MusicBot.devtools.fixtures import ACCOUNT_UID, MP3_FRAME
+
+@asynccontextmanager
+async def standin(monkeypatch: pytest.MonkeyPatch) -> AsyncIterator[StandInServer]:
+    """Run the stand-in server on a free port and point the clients of the bot to it."""
+    server = StandInServer(Fixtures(duration=1))
+    runner = web.AppRunner(server.create_app())
+    await runner.setup()
+    await web.TCPSite(runner, '127.0.0.1', 0).start()
+
+    host, port = runner.addresses[0][:2]
+    monkeypatch.setattr(ym_client, 'YM_BASE_URL', f'http://{host}:{port}')
+    monkeypatch.setattr(ym_client, 'API_HOST', host)
+    monkeypatch.setattr(gateway, 'API_HOST', host)
+
+    try:
+        yield server
+    finally:
+        await ym_session.close()
+        await runner.cleanup()
+
+async def test_account_and_invalid_token(monkeypatch: pytest.MonkeyPatch) -> None:
+    async with standin(monkeypatch):
+        registry = YMClientRegistry()
+        client = await registry.client('token')
+
+        assert client.me and client.me.account and client.me.account.uid == ACCOUNT_UID
+        assert (await client.account_status()).account.login == 'standin'  # type: ignore
+
+        with pytest.raises(UnauthorizedError):
+            await registry.client('invalid')
+        assert 'invalid' not in registry
+
+async def test_tracks_by_ids(monkeypatch: pytest.MonkeyPatch) -> None:
+    async with standin(monkeypatch) as server:
+        client = await YMClientRegistry().client('token')
+        track_ids = list(server.fixtures.tracks)[:5]
+
+        tracks = await client.tracks([f'{track_id}:{track_id[:3]}' for track_id in track_ids])
+        assert [str(track.id) for track in tracks] == track_ids
+
+async def test_likes_resolve_in_batches(monkeypatch: pytest.MonkeyPatch) -> None:
+    async with standin(monkeypatch) as server:
+        client = await YMClientRegistry().client('token')
+        likes = await client.users_likes_tracks()
+        assert likes is not None and len(likes.tracks) == len(server.fixtures.likes)
+
+        resolver = TrackResolver(batch_size=10, cache=TrackCache(persist=False))
+        tracks = await resolver.resolve(client, likes.tracks)
+        assert [str(track.id) for track in tracks] == server.fixtures.likes
+        assert all(track.client is client for track in tracks)
+
+        # Second resolution is served from the cache
+        requests = server.requests
+        assert len(await resolver.resolve(client, likes.tracks)) == len(server.fixtures.likes)
+        assert server.requests == requests
+
+async def test_list_arguments(monkeypatch: pytest.MonkeyPatch) -> None:
+    async with standin(monkeypatch) as server:
+        client = await YMClientRegistry().client('token')
+
+        kinds = list(server.fixtures.playlists)
+        assert [playlist.kind for playlist in await client.users_playlists(kinds)] == kinds  # type: ignore
+
+        track_ids = [track_id for track_id in server.fixtures.tracks if track_id not in server.fixtures.likes][:3]
+        assert await client.users_likes_tracks_add(track_ids)
+        assert server.fixtures.likes[:3] == track_ids[::-1]
+
+        assert await client.users_likes_tracks_remove(track_ids)
+        assert not set(track_ids) & set(server.fixtures.likes)
+
+async def test_rotor_and_download(monkeypatch: pytest.MonkeyPatch) -> None:
+    async with standin(monkeypatch) as server:
+        client = await YMClientRegistry().client('token')
+
+        first = await client.rotor_station_tracks('genre:rock')
+        second = await client.rotor_station_tracks('genre:rock', queue=first.sequence[-1].track.id)  # type: ignore
+        assert first and second and len(first.sequence) == len(second.sequence) == 5
+        assert first.batch_id != second.batch_id
+
+        track = first.sequence[0].track
+        assert track is not None
+
+        assert await client.rotor_station_feedback('genre:rock', 'trackStarted', track_id=track.id, batch_id=first.batch_id)
+        assert server.feedback[-1]['station'] == 'genre:rock'
+
+        audio = await track.download_bytes_async()
+        assert audio == server.silence and audio.startswith(MP3_FRAME)